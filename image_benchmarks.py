@@ -0,0 +1,561 @@
+# pylint: disable=line-too-long
+# pylint: disable=E1101
+"""System module."""
+import sys  # USE CASE: Running the benchmarks with the current interpreter.
+import json  # USE CASE: Reading measurements back from the benchmark subprocesses.
+import io  # USE CASE: Encoding and decoding the encoder profile benchmarks in memory.
+import time  # USE CASE: Measuring wall-clock times.
+import statistics  # USE CASE: Median of repeated measurements.
+import subprocess  # USE CASE: Measuring startup in a fresh interpreter.
+import os  # USE CASE: Listing the benchmark corpus.
+import tempfile  # USE CASE: Writing the large synthetic inputs of the resizing benchmarks.
+import cv2  # USE CASE: Reading the benchmark corpus for the colorization benchmarks.
+import numpy as np  # USE CASE: Comparing benchmark outputs (PSNR).
+from PIL import Image  # USE CASE: Decoding the corpus for the resizing benchmarks.
+import image_colorization  # USE CASE: Colorization benchmarks.
+import image_resizing  # USE CASE: Resizing benchmarks.
+import image_encoder_profiles  # USE CASE: Encoder profile benchmarks.
+
+
+# The sample images shipped with the repository.
+BLACK_AND_WHITE_CORPUS = "./test/blackAndWhite"
+COLORED_CORPUS = "./test/coloredConversion"
+
+# Startup budget for "import main" in a fresh interpreter, in seconds.
+STARTUP_TIME_BUDGET = 0.5
+
+# Modules that must never be loaded just by starting the program.
+HEAVY_STARTUP_MODULES = ("cv2", "numpy", "image_colorization", "PIL")
+
+# Modules that a conversion-only run must never load.
+HEAVY_CONVERSION_MODULES = ("cv2", "numpy", "image_colorization")
+
+STARTUP_PROBE = """
+import io, json, sys, time, contextlib
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import main
+import_time = time.perf_counter() - start
+loaded_heavy_modules = [name for name in %r if name in sys.modules]
+import image_conversion
+tk_roots = [getattr(sys.modules.get(name), "root", None) for name in main.APPLICATION_MODULES.values()]
+print(json.dumps({
+    "import_time": import_time,
+    "loaded_heavy_modules": loaded_heavy_modules + [name for name in %r if name in sys.modules],
+    "tk_created": any(tk_root is not None for tk_root in tk_roots),
+}))
+"""
+
+
+def benchmark_startup_time(runs=5, budget=STARTUP_TIME_BUDGET):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Starts a fresh interpreter "runs" times and imports main.py in it.
+    [2] Measures the median import time and the median process wall time.
+    [3] Checks that no heavy module (cv2, numpy, Pillow, the colorization model) and
+    no tkinter root were loaded at startup, and that importing image_conversion
+    does not pull in cv2, numpy or the colorization model either.
+    [4] Returns the measurements and whether they are within the budget. [Output Format > Dictionary]
+
+    """
+    # Time complexity : O(runs)
+    import_times = []
+    wall_times = []
+    loaded_heavy_modules = set()
+    tk_created = False
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE % (HEAVY_STARTUP_MODULES, HEAVY_CONVERSION_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        wall_times.append(time.perf_counter() - start)
+        measurement = json.loads(output.strip().splitlines()[-1])
+        import_times.append(measurement["import_time"])
+        loaded_heavy_modules.update(measurement["loaded_heavy_modules"])
+        tk_created = tk_created or measurement["tk_created"]
+
+    results = {
+        "import_time": statistics.median(import_times),
+        "wall_time": statistics.median(wall_times),
+        "loaded_heavy_modules": sorted(loaded_heavy_modules),
+        "tk_created": tk_created,
+    }
+    results["passed"] = (
+        results["import_time"] <= budget
+        and not results["loaded_heavy_modules"]
+        and not results["tk_created"]
+    )
+
+    print("-" * 70)
+    print(f"Startup : import main {results['import_time'] * 1000:.1f} ms, process {results['wall_time'] * 1000:.1f} ms (budget {budget * 1000:.0f} ms)")
+    print(f"Heavy modules loaded at startup : {results['loaded_heavy_modules'] or 'none'}")
+    print(f"Tk root created at startup : {results['tk_created']}")
+    print("PASSED" if results["passed"] else "FAILED")
+    print("-" * 70)
+    return results
+
+
+def get_corpus_file_paths(corpus_dir_path, number_of_files=None):
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Returns the image files of the corpus, repeated until "number_of_files"
+    files are listed when a number is given. [Output Format > List]
+
+    """
+    # Time complexity : O(n)
+    corpus_file_paths = sorted(
+        os.path.join(corpus_dir_path, file_name)
+        for file_name in os.listdir(corpus_dir_path)
+        if file_name.lower().endswith((".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp", ".bmp"))
+    )
+    if number_of_files is None:
+        return corpus_file_paths
+    return [corpus_file_paths[idx % len(corpus_file_paths)] for idx in range(number_of_files)]
+
+
+def benchmark_colorization_batch_size(batch_sizes=(1, 2, 4, 8, 16), number_of_images=32, corpus_dir_path=BLACK_AND_WHITE_CORPUS):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Preprocesses "number_of_images" images of the black and white corpus once.
+    [2] Runs the colorization net over them for every batch size, one blob per batch.
+    [3] Reports the inference throughput (images per second) and latency per batch.
+
+    """
+    # Time complexity : O(len(batch_sizes) * number_of_images)
+    try:
+        net = image_colorization.get_colorization_net()
+    except FileNotFoundError as error:
+        print(f"Colorization batch benchmark skipped : {error}")
+        return {"skipped": str(error)}
+
+    net_inputs = [
+        image_colorization.preprocess_bw_image(cv2.imread(path))[1]
+        for path in get_corpus_file_paths(corpus_dir_path, number_of_images)
+    ]
+
+    # Untimed pass, so the one-time layer initialization is not measured.
+    image_colorization.colorization_model.warm_up()
+
+    results = {}
+    print("-" * 70)
+    print(f"{'Batch size':>10} | {'Images/s':>10} | {'ms/batch':>10}")
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for batch_start in range(0, number_of_images, batch_size):
+            net.setInput(cv2.dnn.blobFromImages(net_inputs[batch_start:batch_start + batch_size]))
+            net.forward()
+        elapsed_time = time.perf_counter() - start
+        number_of_batches = -(-number_of_images // batch_size)
+        results[batch_size] = {
+            "images_per_second": number_of_images / elapsed_time,
+            "ms_per_batch": 1000 * elapsed_time / number_of_batches,
+        }
+        print(f"{batch_size:>10} | {results[batch_size]['images_per_second']:>10.2f} | {results[batch_size]['ms_per_batch']:>10.1f}")
+    print("-" * 70)
+    return results
+
+
+def get_psnr(reference_image, image):
+    """
+    This function returns the peak signal-to-noise ratio (in dB) of an 8 bit image against
+    a reference, infinite for identical images. [Output Format > Float]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    # Summed over blocks of rows, so large images do not need full size float64 copies.
+    squared_error = 0.0
+    for start in range(0, len(reference_image), 256):
+        difference = reference_image[start : start + 256].astype("float64") - image[start : start + 256].astype("float64")
+        squared_error += float(np.sum(difference ** 2))
+    mean_squared_error = squared_error / reference_image.size
+    if mean_squared_error == 0:
+        return float("inf")
+    return float(10 * np.log10(255.0 ** 2 / mean_squared_error))
+
+
+def benchmark_colorization_backends(backends=None, corpus_dir_path=BLACK_AND_WHITE_CORPUS, repeats=3):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Colorizes the black and white corpus with the reference backend ("opencv", float32).
+    [2] Colorizes it again with every available backend (see image_colorization.get_available_backends()).
+    [3] Reports the median forward latency, the end-to-end throughput (images per second)
+    and the PSNR of every output against the reference output.
+
+    """
+    # Time complexity : O(len(backends) * repeats * n)
+    backends = backends or image_colorization.get_available_backends()
+    corpus_images = [cv2.imread(path) for path in get_corpus_file_paths(corpus_dir_path)]
+
+    def colorize_corpus(model):
+        net = model.get_net()
+        latencies = []
+        colorized_images = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            colorized_images = []
+            for image in corpus_images:
+                lab, L = image_colorization.preprocess_bw_image(image)
+                forward_start = time.perf_counter()
+                ab = image_colorization.forward_colorization_batch(net, [L])[0]
+                latencies.append(time.perf_counter() - forward_start)
+                colorized_images.append(image_colorization.postprocess_colorized_image(lab, ab))
+        return colorized_images, latencies, time.perf_counter() - start
+
+    results = {}
+    try:
+        reference_model = image_colorization.ColorizationModel(
+            image_colorization.prototx_path, image_colorization.model_path, image_colorization.kernel_path, "opencv"
+        )
+        reference_model.warm_up()
+        reference_images, _, _ = colorize_corpus(reference_model)
+    except FileNotFoundError as error:
+        print(f"Colorization backend benchmark skipped : {error}")
+        return {"skipped": str(error)}
+
+    print("-" * 70)
+    print(f"{'Backend':>18} | {'Latency ms':>10} | {'Images/s':>10} | {'PSNR dB':>8}")
+    for backend in backends:
+        try:
+            model = image_colorization.ColorizationModel(
+                image_colorization.prototx_path, image_colorization.model_path, image_colorization.kernel_path, backend
+            )
+            model.warm_up()
+            colorized_images, latencies, elapsed_time = colorize_corpus(model)
+        except (FileNotFoundError, ImportError, ValueError, cv2.error) as error:
+            print(f"{backend:>18} | skipped : {error}")
+            results[backend] = {"skipped": str(error)}
+            continue
+
+        results[backend] = {
+            "latency_ms": 1000 * statistics.median(latencies),
+            "images_per_second": repeats * len(corpus_images) / elapsed_time,
+            "psnr": min(
+                get_psnr(reference_image, colorized_image)
+                for reference_image, colorized_image in zip(reference_images, colorized_images)
+            ),
+        }
+        print(
+            f"{backend:>18} | {results[backend]['latency_ms']:>10.1f} | "
+            f"{results[backend]['images_per_second']:>10.2f} | {results[backend]['psnr']:>8.1f}"
+        )
+    print("-" * 70)
+    return results
+
+
+def benchmark_colorization_modes(corpus_dir_path=BLACK_AND_WHITE_CORPUS):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Colorizes the black and white corpus with every inference mode (see image_colorization.INFERENCE_MODES).
+    [2] Reports the time per image of every mode, and the PSNR of its output against the "standard" mode.
+
+    """
+    # Time complexity : O(len(INFERENCE_MODES) * n)
+    try:
+        net = image_colorization.get_colorization_net()
+    except FileNotFoundError as error:
+        print(f"Colorization mode benchmark skipped : {error}")
+        return {"skipped": str(error)}
+
+    image_colorization.colorization_model.warm_up()
+    corpus_labs = [
+        cv2.cvtColor(cv2.imread(path).astype("float32") / 255.0, cv2.COLOR_BGR2LAB)
+        for path in get_corpus_file_paths(corpus_dir_path)
+    ]
+
+    results = {}
+    standard_images = [image_colorization.colorize_lab_image(net, lab, "standard") for lab in corpus_labs]
+    print("-" * 70)
+    print(f"{'Mode':>12} | {'ms/image':>10} | {'PSNR dB':>8}")
+    for inference_mode in image_colorization.INFERENCE_MODES:
+        start = time.perf_counter()
+        colorized_images = [image_colorization.colorize_lab_image(net, lab, inference_mode) for lab in corpus_labs]
+        elapsed_time = time.perf_counter() - start
+        results[inference_mode] = {
+            "ms_per_image": 1000 * elapsed_time / len(corpus_labs),
+            "psnr": min(
+                get_psnr(standard_image, colorized_image)
+                for standard_image, colorized_image in zip(standard_images, colorized_images)
+            ),
+        }
+        print(f"{inference_mode:>12} | {results[inference_mode]['ms_per_image']:>10.1f} | {results[inference_mode]['psnr']:>8.1f}")
+    print("-" * 70)
+    return results
+
+
+def benchmark_shrink_on_load(corpus_dir_paths=(COLORED_CORPUS, BLACK_AND_WHITE_CORPUS), target_width=400, repeats=3):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Resizes every corpus image wider than 2 * target_width down to target_width,
+    once with a full decode and a direct LANCZOS resample (the old path),
+    and once with shrink-on-load (see image_resizing.resize_image()).
+    [2] Reports the median time of both paths, the speedup and the PSNR of the new output against the old one.
+
+    """
+    # Time complexity : O(repeats * n)
+
+    def resize_corpus_file(path, img_size, reducing_gap):
+        start = time.perf_counter()
+        with Image.open(path) as img:
+            resized_img = image_resizing.resize_image(img, img_size, reducing_gap).convert("RGB")
+        return time.perf_counter() - start, np.asarray(resized_img)
+
+    results = {}
+    print("-" * 70)
+    print(f"{'File':>30} | {'Old ms':>8} | {'New ms':>8} | {'Speedup':>7} | {'PSNR dB':>8}")
+    corpus_file_paths = [path for corpus_dir_path in corpus_dir_paths for path in get_corpus_file_paths(corpus_dir_path)]
+    for path in corpus_file_paths:
+        with Image.open(path) as img:
+            width, height = img.size
+        if width < 2 * target_width:
+            continue
+        img_size = (target_width, max(1, round(height * target_width / width)))
+
+        old_times, new_times = [], []
+        for _ in range(repeats):
+            old_time, old_image = resize_corpus_file(path, img_size, None)
+            new_time, new_image = resize_corpus_file(path, img_size, image_resizing.DEFAULT_REDUCING_GAP)
+            old_times.append(old_time)
+            new_times.append(new_time)
+
+        file_name = os.path.basename(path)
+        results[file_name] = {
+            "old_ms": 1000 * statistics.median(old_times),
+            "new_ms": 1000 * statistics.median(new_times),
+            "psnr": get_psnr(old_image, new_image),
+        }
+        results[file_name]["speedup"] = results[file_name]["old_ms"] / results[file_name]["new_ms"]
+        print(f"{file_name[-30:]:>30} | {results[file_name]['old_ms']:>8.1f} | {results[file_name]['new_ms']:>8.1f} | {results[file_name]['speedup']:>6.2f}x | {results[file_name]['psnr']:>8.1f}")
+    print("-" * 70)
+    return results
+
+
+# Minimum PSNR (in dB) of the tiled resize engine against the in-memory resize.
+TILED_RESIZE_MIN_PSNR = 40.0
+
+
+def benchmark_tiled_resize(
+    corpus_dir_path=BLACK_AND_WHITE_CORPUS,
+    tile_repeats=2,
+    target_width=2000,
+    memory_budget=32 * 1024 ** 2,
+):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Builds an uncompressed TIFF from the largest corpus image repeated tile_repeats x tile_repeats times.
+    [2] Resizes it to target_width with the tiled engine (see image_resizing.resize_image_file_tiled())
+    within the memory budget, and with the in-memory path (see image_resizing.resize_image()).
+    [3] Reports the time of both, the peak memory of the tiled engine and the PSNR of its output against the in-memory one.
+    [4] Passes when the peak memory is within the budget and the PSNR is at least TILED_RESIZE_MIN_PSNR.
+
+    """
+    # Time complexity : O(n), where n is the number of pixels of the synthetic image
+
+    def get_number_of_pixels(path):
+        with Image.open(path) as img:
+            return img.width * img.height
+
+    largest_file_path = max(get_corpus_file_paths(corpus_dir_path), key=get_number_of_pixels)
+    with tempfile.TemporaryDirectory() as temporary_dir_path:
+        input_path = os.path.join(temporary_dir_path, "large.tif")
+        with Image.open(largest_file_path) as img:
+            img = img.convert("RGB")
+            large_img = Image.new("RGB", (img.width * tile_repeats, img.height * tile_repeats))
+            for column in range(tile_repeats):
+                for row in range(tile_repeats):
+                    large_img.paste(img, (column * img.width, row * img.height))
+        large_img.save(input_path)
+        source_size = large_img.size
+        img_size = image_resizing.get_fitted_image_size(source_size, (0, target_width))
+        del large_img
+
+        start = time.perf_counter()
+        peak_memory = image_resizing.resize_image_file_tiled(
+            input_path, os.path.join(temporary_dir_path, "tiled.tif"), img_size, memory_budget
+        )
+        tiled_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with Image.open(input_path) as img:
+            image_resizing.resize_image(img, img_size).save(os.path.join(temporary_dir_path, "in_memory.tif"))
+        in_memory_time = time.perf_counter() - start
+
+        with Image.open(os.path.join(temporary_dir_path, "tiled.tif")) as tiled_img, Image.open(
+            os.path.join(temporary_dir_path, "in_memory.tif")
+        ) as in_memory_img:
+            psnr = get_psnr(np.asarray(in_memory_img), np.asarray(tiled_img))
+
+    results = {
+        "source_size": list(source_size),
+        "tiled_ms": 1000 * tiled_time,
+        "in_memory_ms": 1000 * in_memory_time,
+        "peak_memory": peak_memory,
+        "memory_budget": memory_budget,
+        "psnr": psnr,
+    }
+    results["passed"] = peak_memory <= memory_budget and psnr >= TILED_RESIZE_MIN_PSNR
+    print("-" * 70)
+    print(f"Tiled resize of a {results['source_size'][0]}x{results['source_size'][1]} image to {img_size[0]}x{img_size[1]} :")
+    print(f"Tiled : {results['tiled_ms']:.0f} ms, peak memory {peak_memory / 1024 ** 2:.1f} MB (budget {memory_budget / 1024 ** 2:.1f} MB)")
+    print(f"In memory : {results['in_memory_ms']:.0f} ms")
+    print(f"PSNR : {psnr:.1f} dB (minimum {TILED_RESIZE_MIN_PSNR:.1f} dB)")
+    print("Passed" if results["passed"] else "Failed")
+    print("-" * 70)
+    return results
+
+
+def benchmark_resize_backends(
+    corpus_dir_paths=(COLORED_CORPUS, BLACK_AND_WHITE_CORPUS),
+    scale_factors=(0.125, 0.25, 0.5, 2.0),
+    repeats=3,
+):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Decodes every corpus image once (as RGB).
+    [2] Resizes it by every scale factor with every backend and filter (see image_resizing.RESIZE_FILTERS),
+    without shrink-on-load, so only the resampling is measured.
+    [3] Reports the median time per image, and the PSNR against Pillow's LANCZOS, for every
+    backend x filter x scale factor, to choose image_resizing.DEFAULT_RESIZE_FILTERS from data.
+
+    """
+    # Time complexity : O(backends * filters * len(scale_factors) * repeats * n)
+    corpus_images = []
+    for corpus_dir_path in corpus_dir_paths:
+        for path in get_corpus_file_paths(corpus_dir_path):
+            with Image.open(path) as img:
+                corpus_images.append(img.convert("RGB"))
+
+    results = {}
+    print("-" * 70)
+    print(f"{'Backend':>8} | {'Filter':>8} | {'Scale':>6} | {'ms/image':>10} | {'PSNR dB':>8}")
+    for scale_factor in scale_factors:
+        for backend, resize_filters in image_resizing.RESIZE_FILTERS.items():
+            for resize_filter in resize_filters:
+                total_time = 0.0
+                psnrs = []
+                # One image at a time, as the upscaled corpus does not fit in memory at once.
+                for img in corpus_images:
+                    img_size = (max(1, round(img.width * scale_factor)), max(1, round(img.height * scale_factor)))
+                    times = []
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        resized_img = image_resizing.resize_image(img, img_size, None, backend, resize_filter)
+                        times.append(time.perf_counter() - start)
+                    total_time += statistics.median(times)
+                    reference_img = image_resizing.resize_image(img, img_size, None, "pillow", "lanczos")
+                    psnrs.append(get_psnr(np.asarray(reference_img), np.asarray(resized_img)))
+                    del resized_img, reference_img
+                result = {
+                    "ms_per_image": 1000 * total_time / len(corpus_images),
+                    "psnr": min(psnrs),
+                }
+                results[f"{backend}/{resize_filter}/{scale_factor}"] = result
+                print(f"{backend:>8} | {resize_filter:>8} | {scale_factor:>6} | {result['ms_per_image']:>10.1f} | {result['psnr']:>8.1f}")
+    print("-" * 70)
+    return results
+
+
+def benchmark_encoder_profiles(
+    corpus_dir_paths=(COLORED_CORPUS, BLACK_AND_WHITE_CORPUS),
+    image_file_types=image_encoder_profiles.ENCODER_PROFILE_FORMATS,
+    quality=75,
+    repeats=3,
+):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Decodes every corpus image once (as RGB).
+    [2] Encodes it in memory with every encoder profile (see image_encoder_profiles.ENCODER_PROFILES) and format,
+    at "quality" unless the profile fixes it, and decodes the result again.
+    [3] Reports the total bytes, the median encode and decode time per image and the lowest PSNR
+    against the source, for every profile x format.
+
+    """
+    # Time complexity : O(profiles * formats * repeats * n)
+    totals = {
+        (encoder_profile, image_file_type): {"bytes": 0, "encode_time": 0.0, "decode_time": 0.0, "psnrs": []}
+        for encoder_profile in image_encoder_profiles.ENCODER_PROFILES
+        for image_file_type in image_file_types
+    }
+    corpus_file_paths = [path for corpus_dir_path in corpus_dir_paths for path in get_corpus_file_paths(corpus_dir_path)]
+    # One image at a time, so the large corpus images are not all in memory at once.
+    for path in corpus_file_paths:
+        with Image.open(path) as img:
+            source_img = img.convert("RGB")
+        for (encoder_profile, image_file_type), total in totals.items():
+            profile_quality = quality if image_encoder_profiles.has_quality_setting(encoder_profile, image_file_type) else None
+            encode_times, decode_times = [], []
+            for _ in range(repeats):
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                image_encoder_profiles.save_image(source_img, buffer, image_file_type, encoder_profile, profile_quality)
+                encode_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                with Image.open(io.BytesIO(buffer.getvalue())) as encoded_img:
+                    encoded_img.load()
+                    decode_times.append(time.perf_counter() - start)
+                    decoded_image = np.asarray(encoded_img.convert("RGB"))
+            total["bytes"] += len(buffer.getvalue())
+            total["encode_time"] += statistics.median(encode_times)
+            total["decode_time"] += statistics.median(decode_times)
+            total["psnrs"].append(get_psnr(np.asarray(source_img), decoded_image))
+            del decoded_image
+
+    results = {}
+    print("-" * 70)
+    print(f"{'Profile':>14} | {'Format':>6} | {'KB':>8} | {'Encode ms':>9} | {'Decode ms':>9} | {'PSNR dB':>8}")
+    for (encoder_profile, image_file_type), total in totals.items():
+        result = {
+            "bytes": total["bytes"],
+            "encode_ms_per_image": 1000 * total["encode_time"] / len(corpus_file_paths),
+            "decode_ms_per_image": 1000 * total["decode_time"] / len(corpus_file_paths),
+            "psnr": min(total["psnrs"]),
+        }
+        results[f"{encoder_profile}/{image_file_type}"] = result
+        print(
+            f"{encoder_profile:>14} | {image_file_type:>6} | {result['bytes'] / 1024:>8.1f} | "
+            f"{result['encode_ms_per_image']:>9.1f} | {result['decode_ms_per_image']:>9.1f} | {result['psnr']:>8.1f}"
+        )
+    print("-" * 70)
+    return results
+
+
+BENCHMARKS = {
+    "startup": benchmark_startup_time,
+    "colorization_batch_size": benchmark_colorization_batch_size,
+    "colorization_backends": benchmark_colorization_backends,
+    "colorization_modes": benchmark_colorization_modes,
+    "shrink_on_load": benchmark_shrink_on_load,
+    "tiled_resize": benchmark_tiled_resize,
+    "resize_backends": benchmark_resize_backends,
+    "encoder_profiles": benchmark_encoder_profiles,
+}
+
+
+if __name__ == "__main__":
+    # Usage : python image_benchmarks.py [benchmark ...]
+    # Exits with status 1 when a benchmark with a pass/fail budget fails, so it can guard against regressions.
+    SELECTED_BENCHMARKS = sys.argv[1:] or list(BENCHMARKS)
+    FAILED = False
+    for benchmark_name in SELECTED_BENCHMARKS:
+        benchmark_results = BENCHMARKS[benchmark_name]()
+        FAILED = FAILED or not benchmark_results.get("passed", True)
+    sys.exit(1 if FAILED else 0)
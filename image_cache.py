@@ -0,0 +1,307 @@
+# pylint: disable=line-too-long
+"""System module."""
+import os  # USE CASE: Reading file sizes and access times of cached results.
+import json  # USE CASE: Serializing operation parameters into the cache key.
+import time  # USE CASE: Marking cached results as recently used.
+import shutil  # USE CASE: Copying cached results to the output path.
+import hashlib  # USE CASE: Building the content-addressed cache key.
+import tempfile  # USE CASE: Unique temporary files while storing results from several threads.
+import threading  # USE CASE: Guarding the cache size bookkeeping of threads storing results.
+import image_manifest  # USE CASE: Hashing the content of input files.
+
+
+# Setting IFAMMS_CACHE_DIR enables the cache for every module (and every batch worker process).
+# IFAMMS_CACHE_MAX_BYTES bounds its total size, 1 GiB by default.
+CACHE_DIR_ENVIRONMENT_VARIABLE = "IFAMMS_CACHE_DIR"
+CACHE_MAX_BYTES_ENVIRONMENT_VARIABLE = "IFAMMS_CACHE_MAX_BYTES"
+DEFAULT_CACHE_MAX_BYTES = 1024 ** 3
+
+# Eviction goes down to this share of the maximum size, so the cache directory is only walked
+# once every (1 - CACHE_LOW_WATER_RATIO) * max_bytes stored, not on every store of a full cache.
+CACHE_LOW_WATER_RATIO = 0.9
+
+result_cache = None
+
+
+class ImageResultCache:
+    """
+    This class creates a cache object that requires the following parameters
+    to function:
+    --------------------------------------------------------------------------------
+    [1] Cache Directory Path
+    [2] Maximum Cache Size (in bytes)
+    [3] Use Hardlinks (instead of copies) when a result is served from the cache
+
+    Results are stored under the hash of the input file bytes plus the operation
+    and its parameters, so the same asset reached under another name or path is
+    served from the cache. The least recently used results are evicted once the
+    total size goes above the maximum, down to CACHE_LOW_WATER_RATIO of it.
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] get_key
+    [2] fetch
+    [3] store
+    [4] get_statistics
+    """
+
+    def __init__(self, cache_dir_path, max_bytes=DEFAULT_CACHE_MAX_BYTES, use_hardlinks=False):
+        self.cache_dir_path = cache_dir_path
+        self.max_bytes = max_bytes
+        # Hardlinks are opt-in : an output overwritten in place later on would also overwrite the cached result.
+        self.use_hardlinks = use_hardlinks
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.content_hashes = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir_path, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self.get_cached_results())
+
+    def get_cached_results(self):
+        """
+        This function returns every cached result as (Path, Size, Last Used Time). [Output Format > List]
+        """
+        # Time complexity : O(n), where n is the number of cached results
+        cached_results = []
+        for directory_path, _, file_names in os.walk(self.cache_dir_path):
+            for file_name in file_names:
+                if file_name.endswith(".tmp"):
+                    continue
+                cached_result_path = os.path.join(directory_path, file_name)
+                try:
+                    file_stat = os.stat(cached_result_path)
+                except FileNotFoundError:
+                    continue
+                cached_results.append((cached_result_path, file_stat.st_size, file_stat.st_mtime))
+        return cached_results
+
+    def get_cached_result_path(self, key):
+        """
+        This function returns the path a result is cached at. [Output Format > String]
+        """
+        # Time complexity : O(1)
+        return os.path.join(self.cache_dir_path, key[:2], key)
+
+    def get_key(self, image_input_file_path, operation, parameters):
+        """
+        This function does the following tasks:
+        ---------------------------------------------
+
+        [1] Hashes the content of the input file (once per unchanged file and process).
+        [2] Returns the hash of the content hash, the operation and its parameters. [Output Format > String]
+
+        """
+        # Time complexity : O(n), where n is the size of the input file
+        file_stat = os.stat(image_input_file_path)
+        file_signature = (os.path.abspath(image_input_file_path), file_stat.st_size, file_stat.st_mtime_ns)
+        if file_signature not in self.content_hashes:
+            self.content_hashes[file_signature] = image_manifest.get_file_content_hash(image_input_file_path)
+
+        key_data = json.dumps(
+            [self.content_hashes[file_signature], operation, parameters], sort_keys=True
+        )
+        return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+    def fetch(self, key, output_path):
+        """
+        This function does the following tasks:
+        ---------------------------------------------
+
+        [1] Copies (or hardlinks) the cached result to the output path, copying when
+        the hardlink cannot be made.
+        [2] Marks the cached result as recently used.
+        [3] Returns True on a cache hit and False on a cache miss. [Output Format > Boolean]
+
+        """
+        # Time complexity : O(n), where n is the size of the cached result
+        cached_result_path = self.get_cached_result_path(key)
+        try:
+            if self.use_hardlinks:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                try:
+                    os.link(cached_result_path, output_path)
+                except FileNotFoundError:
+                    raise
+                # Hardlinks fail across devices and on file systems without them : the output was
+                # already removed, so the cached result is copied instead.
+                except OSError:
+                    shutil.copyfile(cached_result_path, output_path)
+            else:
+                shutil.copyfile(cached_result_path, output_path)
+            os.utime(cached_result_path, (time.time(), time.time()))
+
+        # The result is not cached (or was evicted by another process in between).
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def store(self, key, output_path):
+        """
+        This function does the following tasks:
+        ---------------------------------------------
+
+        [1] Copies a freshly written output file into the cache.
+        [2] Evicts the least recently used results once the cache is above its maximum size.
+
+        """
+        # Time complexity : O(n) on eviction, where n is the number of cached results
+        cached_result_path = self.get_cached_result_path(key)
+        os.makedirs(os.path.dirname(cached_result_path), exist_ok=True)
+        # Copied to a temporary file first, so other processes never read a partially written result.
+        # Its name is unique to this call, as threads of a process may store the same key at once.
+        file_descriptor, temporary_cached_result_path = tempfile.mkstemp(
+            prefix=f"{key}.", suffix=".tmp", dir=os.path.dirname(cached_result_path)
+        )
+        os.close(file_descriptor)
+        try:
+            shutil.copyfile(output_path, temporary_cached_result_path)
+            os.replace(temporary_cached_result_path, cached_result_path)
+        except BaseException:
+            os.remove(temporary_cached_result_path)
+            raise
+
+        with self.lock:
+            self.total_bytes += os.path.getsize(cached_result_path)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """
+        This function removes the least recently used results until the cache fits CACHE_LOW_WATER_RATIO
+        of its maximum size. It also recounts the size, which store() only adds to.
+        """
+        # Time complexity : O(n log n), where n is the number of cached results
+        cached_results = sorted(self.get_cached_results(), key=lambda cached_result: cached_result[2])
+        self.total_bytes = sum(size for _, size, _ in cached_results)
+        if self.total_bytes <= self.max_bytes:
+            return
+        for cached_result_path, size, _ in cached_results:
+            if self.total_bytes <= self.max_bytes * CACHE_LOW_WATER_RATIO:
+                break
+            try:
+                os.remove(cached_result_path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def get_statistics(self):
+        """
+        This function returns the hit/miss counters and the size of the cache. [Output Format > Dictionary]
+        """
+        # Time complexity : O(1)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def enable_result_cache(cache_dir_path, max_bytes=DEFAULT_CACHE_MAX_BYTES, use_hardlinks=False):
+    """
+    This function enables the result cache for every image operation of this process.
+    """
+    # Time complexity : O(n), where n is the number of cached results
+    global result_cache  # pylint: disable=global-statement
+    result_cache = ImageResultCache(cache_dir_path, max_bytes, use_hardlinks)
+    return result_cache
+
+
+def get_result_cache():
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Returns the enabled result cache, creating it from IFAMMS_CACHE_DIR on first use.
+    [2] Returns None when the cache is not enabled.
+
+    """
+    # Time complexity : O(1)
+    if result_cache is None and os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE):
+        enable_result_cache(
+            os.environ[CACHE_DIR_ENVIRONMENT_VARIABLE],
+            int(os.environ.get(CACHE_MAX_BYTES_ENVIRONMENT_VARIABLE, DEFAULT_CACHE_MAX_BYTES)),
+        )
+    return result_cache
+
+
+def run_cached(image_input_file_path, operation, parameters, output_path, run):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Serves the output from the result cache when the same input bytes already
+    went through the same operation with the same parameters.
+    [2] Otherwise calls run() (which writes the output path) and caches its result.
+
+    Without an enabled cache, run() is simply called.
+    """
+    # Time complexity : O(1) on a cache hit, the cost of run() otherwise
+    cache = get_result_cache()
+    if cache is None:
+        run()
+        return
+
+    key = cache.get_key(image_input_file_path, operation, parameters)
+    if fetch_cached(cache, key, image_input_file_path, output_path):
+        return
+
+    run()
+    cache.store(key, output_path)
+
+
+def fetch_cached(cache, key, image_input_file_path, output_path):
+    """
+    This function fetches a cached result to the output path and reports it, returning True on a cache hit.
+    """
+    # Time complexity : O(1)
+    if not cache.fetch(key, output_path):
+        return False
+
+    print("-" * 70)
+    print(f"Saved {os.path.basename(image_input_file_path)} to {output_path} (from cache).")
+    print("-" * 70)
+    return True
+
+
+def get_cache_counters():
+    """
+    This function returns the (hits, misses, evictions) counters of the result cache of this
+    process, or (0, 0, 0) when it is not enabled. [Output Format > Tuple]
+    """
+    # Time complexity : O(1)
+    cache = get_result_cache()
+    if cache is None:
+        return (0, 0, 0)
+    return (cache.hits, cache.misses, cache.evictions)
+
+
+def print_cache_statistics(counters=None):
+    """
+    This function prints the hit/miss counters of the result cache, when it is enabled.
+
+    Batch runs pass the (hits, misses, evictions) counters summed over their worker
+    processes, since every worker has a cache of its own.
+    """
+    # Time complexity : O(1)
+    cache = get_result_cache()
+    if cache is None:
+        return
+
+    statistics = cache.get_statistics()
+    if counters is not None:
+        statistics["hits"], statistics["misses"], statistics["evictions"] = counters
+    print("-" * 70)
+    print(
+        f"Cache : {statistics['hits']} hit(s), {statistics['misses']} miss(es), "
+        f"{statistics['evictions']} eviction(s), "
+        f"{statistics['total_bytes'] / 1024 ** 2:.1f} of {statistics['max_bytes'] / 1024 ** 2:.1f} MB used."
+    )
+    print("-" * 70)
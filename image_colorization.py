@@ -7,13 +7,285 @@
 """System module."""
 import sys
 import os
+import threading
+import queue
+import tracemalloc
+import time
+import shutil
+import importlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 import tkinter as tk
 from tkinter import filedialog
 import numpy as np
 import cv2
+from PIL import Image
+from PIL import UnidentifiedImageError
+import image_cache
+
+# The tkinter root is only created once a file dialog is opened, so headless runs never need a display.
+root = None
+
+
+def get_gui_root():
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Creates the hidden tkinter root window on first use and returns it.
+
+    """
+    # Time complexity : O(1)
+    global root  # pylint: disable=global-statement
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+    return root
+
+
+# Number of images stacked into one blob by colorize_images_in_batches().
+DEFAULT_BATCH_SIZE = 8
+
+# The speed/quality knob of the colorization :
+# "preview" runs the net on a smaller input, "standard" is the original 224x224 path,
+# "tiled" runs the net on overlapping tiles of the full resolution image and blends them,
+# "multiscale" averages the tiled result with the whole image result for consistent colors.
+INFERENCE_MODES = {
+    "preview": {"inference_size": 128, "tiled": False, "multiscale": False},
+    "standard": {"inference_size": 224, "tiled": False, "multiscale": False},
+    "tiled": {"inference_size": 224, "tiled": True, "multiscale": False},
+    "multiscale": {"inference_size": 224, "tiled": True, "multiscale": True},
+}
+DEFAULT_INFERENCE_MODE = "standard"
+
+# Side of a tile (in source pixels) and the share of it overlapping the next tile.
+TILE_SIZE = 1024
+TILE_OVERLAP = 0.25
+
+# Number of images waiting between two stages of colorize_images_pipelined().
+DEFAULT_QUEUE_SIZE = 8
+
+# Seconds a blocked stage of colorize_images_pipelined() waits before checking whether the pipeline was stopped.
+QUEUE_POLL_INTERVAL = 0.1
+
+# Memory budget of the low memory colorization, in bytes.
+DEFAULT_MEMORY_BUDGET = 512 * 1024 ** 2
+
+# Bytes per full resolution pixel always held by the low memory colorization :
+# the uint8 grayscale input and the uint8 BGR output.
+LOW_MEMORY_BYTES_PER_PIXEL = 4
+
+# Bytes per pixel of the float32 working buffers of one strip (L, ab, LAB, BGR and temporaries).
+LOW_MEMORY_STRIP_BYTES_PER_PIXEL = 64
+
+# Bytes per column of the ab channels interpolated along the full width : the float32 rows of the
+# 224x224 net output and the temporary interpolated with them (2 buffers x 224 rows x 2 channels x 4 bytes).
+LOW_MEMORY_AB_BYTES_PER_COLUMN = 2 * 224 * 2 * 4
+
+# Bytes of the copies of the net input (1 x 1 x 224 x 224) and output (at most 1 x 2 x 224 x 224) blobs
+# held by the net itself, which tracemalloc does not see.
+LOW_MEMORY_NET_BLOB_BYTES = (224 * 224 + 2 * 224 * 224) * 4
+
+# Default number of OpenCV threads given to each colorization worker process.
+DEFAULT_THREADS_PER_WORKER = 2
+
+# Longest side of the thumbnail used to detect inputs that are already in color.
+GRAYSCALE_THUMBNAIL_SIZE = 64
+
+# An image is grayscale (or sepia, i.e. one uniform tint) when 95% of its thumbnail pixels
+# stay within this chroma distance (8 bit LAB units) of the mean chroma of the image.
+GRAYSCALE_CHROMA_THRESHOLD = 8.0
+
+
+def preprocess_bw_image(image, inference_size=224):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Converts the BGR image to LAB.
+    [2] Resizes it to the input of the net (224x224 by default) and centers its L channel.
+    [3] Returns the full size LAB image and the net input. [Output Format > Tuple]
+    """
+    # Time complexity : O(1)
+    scaled = image.astype("float32") / 255.0
+    lab = cv2.cvtColor(scaled, cv2.COLOR_BGR2LAB)
+
+    return lab, get_net_input(lab, inference_size)
+
+
+def get_net_input(lab, inference_size=224):
+    """
+    This function resizes a LAB image (or tile) to the input size of the net and
+    returns its centered L channel. [Output Format > float32 Array]
+    """
+    # Time complexity : O(1)
+    resized = cv2.resize(lab, (inference_size, inference_size))
+    L = cv2.split(resized)[0]
+    L -= 50
+    return L
+
+
+def get_tile_origins(length, tile_size=TILE_SIZE, overlap=TILE_OVERLAP):
+    """
+    This function returns the start of every tile along one side of the image, tiles of
+    "tile_size" evenly spread so that neighbours overlap by at least "overlap". [Output Format > List]
+    """
+    # Time complexity : O(length / tile_size)
+    if length <= tile_size:
+        return [0]
+    stride = tile_size * (1 - overlap)
+    number_of_tiles = int(np.ceil((length - tile_size) / stride)) + 1
+    return [int(origin) for origin in np.linspace(0, length - tile_size, number_of_tiles).round()]
+
+
+def get_tile_weights(tile_height, tile_width, feather):
+    """
+    This function returns the blending weights of a tile : 1 in its center, fading linearly
+    to (almost) 0 over "feather" pixels on every side. [Output Format > float32 Array]
+    """
+    # Time complexity : O(tile_height * tile_width)
+    def ramp(length):
+        positions = np.arange(length, dtype="float32") + 0.5
+        return np.clip(np.minimum(positions, length - positions) / max(1.0, feather), 1e-3, 1.0)
+
+    return np.outer(ramp(tile_height), ramp(tile_width)).astype("float32")
+
+
+def predict_tiled_ab(net, lab, inference_size=224, tile_size=TILE_SIZE, batch_size=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Cuts the full resolution LAB image into overlapping tiles.
+    [2] Runs the net on the tiles, "batch_size" tiles per forward pass.
+    [3] Resizes the ab prediction of every tile to the tile size and blends the
+    overlapping tiles with feathered weights.
+    [4] Returns the full resolution ab channels (H x W x 2). [Output Format > float32 Array]
+    """
+    # Time complexity : O(number of tiles / batch_size) forward passes
+    height, width = lab.shape[:2]
+    tile_regions = [
+        (top, left, min(tile_size, height), min(tile_size, width))
+        for top in get_tile_origins(height, tile_size)
+        for left in get_tile_origins(width, tile_size)
+    ]
+    tile_inputs = [
+        get_net_input(lab[top:top + tile_height, left:left + tile_width], inference_size)
+        for top, left, tile_height, tile_width in tile_regions
+    ]
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    tile_abs = []
+    for batch_start in range(0, len(tile_inputs), batch_size):
+        tile_abs += forward_colorization_batch(net, tile_inputs[batch_start:batch_start + batch_size])
+
+    ab = np.zeros((height, width, 2), dtype="float32")
+    total_weights = np.zeros((height, width), dtype="float32")
+    feather = tile_size * TILE_OVERLAP / 2
+    for (top, left, tile_height, tile_width), tile_ab in zip(tile_regions, tile_abs):
+        weights = get_tile_weights(tile_height, tile_width, feather)
+        tile_ab = cv2.resize(tile_ab, (tile_width, tile_height))
+        ab[top:top + tile_height, left:left + tile_width] += tile_ab * weights[:, :, np.newaxis]
+        total_weights[top:top + tile_height, left:left + tile_width] += weights
+    ab /= total_weights[:, :, np.newaxis]
+    return ab
+
+
+def colorize_lab_image(net, lab, inference_mode=DEFAULT_INFERENCE_MODE):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Predicts the ab channels of a full size LAB image with the given inference
+    mode (see INFERENCE_MODES).
+    [2] Returns the colorized image. [Output Format > uint8 Array]
+    """
+    # Time complexity : O(1) forward passes, O(number of tiles) for tiled modes
+    mode = INFERENCE_MODES[inference_mode]
+    if not mode["tiled"]:
+        ab = forward_colorization_batch(net, [get_net_input(lab, mode["inference_size"])])[0]
+        return postprocess_colorized_image(lab, ab)
+
+    ab = predict_tiled_ab(net, lab, mode["inference_size"])
+    if mode["multiscale"]:
+        whole_image_ab = forward_colorization_batch(net, [get_net_input(lab, mode["inference_size"])])[0]
+        ab += cv2.resize(whole_image_ab, (lab.shape[1], lab.shape[0]))
+        ab *= 0.5
+    return postprocess_colorized_image(lab, ab)
+
+
+def postprocess_colorized_image(lab, ab):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Resizes the predicted ab channels (H x W x 2) back to the full image size.
+    [2] Joins them with the original L channel and converts back to BGR.
+    [3] Returns the colorized image. [Output Format > uint8 Array]
+    """
+    # Time complexity : O(1)
+    ab = cv2.resize(ab, (lab.shape[1], lab.shape[0]))
+
+    L = cv2.split(lab)[0]
+    colorized = np.concatenate((L[:, :, np.newaxis], ab), axis=2)
+
+    colorized = cv2.cvtColor(colorized, cv2.COLOR_LAB2BGR)
+    colorized = np.clip(colorized, 0, 1)
+
+    return (255 * colorized).astype("uint8")
+
+
+def is_grayscale_image(image_input_file_path):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads a downsampled thumbnail of the image (JPEG files are decoded at 1/8 scale).
+    [2] Measures how far the chroma (a, b) of every pixel is from the mean chroma of the image.
+    [3] Returns True for grayscale and sepia images, False for images already in color. [Output Format > Boolean]
+
+    Unreadable files return True, so they still reach (and are reported by) the colorization.
+    """
+    # Time complexity : O(1)
+    thumbnail = cv2.imread(image_input_file_path, cv2.IMREAD_REDUCED_COLOR_8)
+    if thumbnail is None:
+        return True
+
+    scale = min(1.0, GRAYSCALE_THUMBNAIL_SIZE / max(thumbnail.shape[:2]))
+    thumbnail = cv2.resize(
+        thumbnail,
+        (max(1, round(thumbnail.shape[1] * scale)), max(1, round(thumbnail.shape[0] * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+    lab = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2LAB).astype("float32")
+    a = lab[:, :, 1] - lab[:, :, 1].mean()
+    b = lab[:, :, 2] - lab[:, :, 2].mean()
+    return float(np.percentile(np.hypot(a, b), 95)) <= GRAYSCALE_CHROMA_THRESHOLD
+
+
+def get_lightness_lookup_table():
+    """
+    This function returns the L channel (as computed by preprocess_bw_image()) of
+    every gray level, so the L channel of a grayscale image is a table lookup. [Output Format > float32 Array]
+    """
+    # Time complexity : O(1)
+    gray_levels = np.arange(256, dtype="float32") / 255.0
+    gray_pixels = np.repeat(gray_levels[np.newaxis, :, np.newaxis], 3, axis=2)
+    return cv2.cvtColor(gray_pixels, cv2.COLOR_BGR2LAB)[0, :, 0].copy()
+
+
+def get_bilinear_weights(source_size, destination_size):
+    """
+    This function returns, for every destination index, the two source indices and the
+    weight of the second one, exactly as cv2.resize() interpolates (INTER_LINEAR). [Output Format > Tuple]
+    """
+    # Time complexity : O(destination_size)
+    coordinates = (np.arange(destination_size, dtype="float32") + 0.5) * (source_size / destination_size) - 0.5
+    coordinates = np.clip(coordinates, 0, source_size - 1)
+    first_indices = np.floor(coordinates).astype("int32")
+    second_indices = np.minimum(first_indices + 1, source_size - 1)
+    return first_indices, second_indices, (coordinates - first_indices).astype("float32")
 
-root = tk.Tk()
-root.withdraw()
 
 class ImageColorization:
     """
@@ -48,32 +320,464 @@ class ImageColorization:
 
         # Time complexity : O(1)
         image = cv2.imread(self.image_input_file_path)
-        scaled = image.astype("float32") / 255.0
-        lab = cv2.cvtColor(scaled, cv2.COLOR_BGR2LAB)
-
-        resized = cv2.resize(lab, (224, 224))
-        L = cv2.split(resized)[0]
-        L -= 50
+        # cv2.imread returns None for corrupted or unsupported files.
+        if image is None:
+            raise UnidentifiedImageError(f"cannot identify image file {self.image_input_file_path!r}")
+        lab, L = preprocess_bw_image(image)
 
+        net = get_colorization_net()
         net.setInput(cv2.dnn.blobFromImage(L))
         ab = net.forward()[0, :, :, :].transpose((1, 2, 0))
-        ab = cv2.resize(ab, (image.shape[1], image.shape[0]))
 
-        L = cv2.split(lab)[0]
-        colorized = np.concatenate((L[:, :, np.newaxis], ab), axis=2)
+        colorized = postprocess_colorized_image(lab, ab)
+
+        output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
+
+        # cv2.imwrite returns False instead of raising when the file cannot be written.
+        if not cv2.imwrite(output_path,colorized):
+            raise OSError(f"cannot write {output_path!r}")
 
-        colorized = cv2.cvtColor(colorized, cv2.COLOR_LAB2BGR)
-        colorized = np.clip(colorized, 0, 1)
+        print("-" * 70)
+        print(f"Saved {self.image_file_name} to {output_path}.")
+        print("-" * 70)
 
-        colorized = (255 * colorized).astype("uint8")
+    def convert_bw_to_colorized_with_mode(self, inference_mode=DEFAULT_INFERENCE_MODE):
+        """
+        This function does the following task:
+        -----------------------------------------------
+
+        [1] Reads the input image file.
+        [2] Colorizes it with the given inference mode : "preview" (fast, smaller net input),
+        "standard", "tiled" or "multiscale" (slower, more detail on large prints).
+        [3] Saves it and reports the colorization time of the mode.
+        [4] Returns the colorization time in seconds. [Output Format > Float]
+        """
+        # Time complexity : O(1)
+        image = cv2.imread(self.image_input_file_path)
+        # cv2.imread returns None for corrupted or unsupported files.
+        if image is None:
+            raise UnidentifiedImageError(f"cannot identify image file {self.image_input_file_path!r}")
+
+        net = get_colorization_net()
+        start = time.perf_counter()
+        lab = cv2.cvtColor(image.astype("float32") / 255.0, cv2.COLOR_BGR2LAB)
+        colorized = colorize_lab_image(net, lab, inference_mode)
+        elapsed_time = time.perf_counter() - start
 
         output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
+        cv2.imwrite(output_path, colorized)
 
         print("-" * 70)
         print(f"Saved {self.image_file_name} to {output_path}.")
+        print(f"Colorized in {1000 * elapsed_time:.1f} ms ({inference_mode} mode).")
         print("-" * 70)
-        
-        cv2.imwrite(output_path,colorized)
+        return elapsed_time
+
+    def convert_bw_to_colorized_low_memory(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """
+        This function does the following task:
+        -----------------------------------------------
+
+        [1] Checks from the file header that the image fits the memory budget.
+        [2] Reads the image as 8 bit grayscale and gets the net input from a 224x224 copy.
+        [3] Builds the colorized image strip by strip : the L channel comes from a lookup
+        table, the ab channels are interpolated for the rows of the strip only, and the
+        strip is converted to BGR straight into the 8 bit output image.
+        [4] Reports the peak memory and returns it in bytes. [Output Format > Integer]
+
+        Only the 8 bit input and output are held at full resolution (4 bytes per pixel
+        instead of several float32 copies), plus the ab rows of the net output interpolated
+        to the full width. The strip height follows the memory budget.
+        Intended for black and white scans : the input is read as grayscale.
+
+        The peak memory is the tracemalloc peak (every numpy array, including the ones
+        returned by OpenCV) plus the net's own copies of its input and output blobs.
+        It is not the process RSS : the net weights, the intermediate layer buffers of
+        the forward pass and the scratch buffers inside cv2.imread(), cv2.cvtColor() and
+        cv2.imwrite() are not included.
+        """
+        # Time complexity : O(1)
+        with Image.open(self.image_input_file_path) as img:
+            width, height = img.size
+
+        full_resolution_bytes = (
+            width * height * LOW_MEMORY_BYTES_PER_PIXEL + width * LOW_MEMORY_AB_BYTES_PER_COLUMN + LOW_MEMORY_NET_BLOB_BYTES
+        )
+        strip_bytes_per_row = width * LOW_MEMORY_STRIP_BYTES_PER_PIXEL
+        if full_resolution_bytes + strip_bytes_per_row > memory_budget:
+            raise MemoryError(
+                f"{self.image_file_name} needs at least {(full_resolution_bytes + strip_bytes_per_row) / 1024 ** 2:.1f} MB, "
+                f"above the memory budget of {memory_budget / 1024 ** 2:.1f} MB."
+            )
+        strip_height = max(1, min(height, (memory_budget - full_resolution_bytes) // strip_bytes_per_row))
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        lightness = get_lightness_lookup_table()
+        gray = cv2.imread(self.image_input_file_path, cv2.IMREAD_GRAYSCALE)
+
+        L = lightness[cv2.resize(gray, (224, 224))]
+        L -= 50
+        net = get_colorization_net()
+        blob = cv2.dnn.blobFromImage(L)
+        net.setInput(blob)
+        ab_blob = net.forward()
+        # The net keeps its own copies of the input and output blobs, outside of tracemalloc.
+        net_blob_bytes = blob.nbytes + ab_blob.nbytes
+        ab = ab_blob[0, :, :, :].transpose((1, 2, 0))
+
+        # The ab channels are interpolated along the width once (small, one row per net output row),
+        # then along the height for the rows of each strip only.
+        # Weighted in place, so no more than two 224 x width x 2 buffers are alive at once.
+        first_columns, second_columns, column_weights = get_bilinear_weights(ab.shape[1], width)
+        ab_rows = ab[:, first_columns]
+        ab_rows *= (1 - column_weights)[np.newaxis, :, np.newaxis]
+        second_ab_rows = ab[:, second_columns]
+        second_ab_rows *= column_weights[np.newaxis, :, np.newaxis]
+        ab_rows += second_ab_rows
+        del second_ab_rows
+        first_rows, second_rows, row_weights = get_bilinear_weights(ab.shape[0], height)
+
+        colorized = np.empty((height, width, 3), dtype="uint8")
+        for strip_start in range(0, height, strip_height):
+            strip = slice(strip_start, min(height, strip_start + strip_height))
+            weights = row_weights[strip][:, np.newaxis, np.newaxis]
+            lab_strip = np.empty((weights.shape[0], width, 3), dtype="float32")
+            lab_strip[:, :, 0] = lightness[gray[strip]]
+            lab_strip[:, :, 1:] = ab_rows[first_rows[strip]] * (1 - weights) + ab_rows[second_rows[strip]] * weights
+
+            bgr_strip = cv2.cvtColor(lab_strip, cv2.COLOR_LAB2BGR)
+            np.clip(bgr_strip, 0, 1, out=bgr_strip)
+            bgr_strip *= 255
+            colorized[strip] = bgr_strip
+
+        output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
+        written = cv2.imwrite(output_path, colorized)
+
+        _, peak_memory = tracemalloc.get_traced_memory()
+        peak_memory += net_blob_bytes
+        if started_tracing:
+            tracemalloc.stop()
+        if not written:
+            raise OSError(f"cannot write {output_path!r}")
+
+        print("-" * 70)
+        print(f"Saved {self.image_file_name} to {output_path}.")
+        print(f"Peak memory : {peak_memory / 1024 ** 2:.1f} MB (budget {memory_budget / 1024 ** 2:.1f} MB, traced and estimated, not RSS).")
+        print("-" * 70)
+        return peak_memory
+
+def colorize_images_in_batches(image_input_file_paths, image_output_dir_path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads and preprocesses "batch_size" images at a time.
+    [2] Stacks their L channels into one blob and runs a single forward pass.
+    [3] Splits the predicted ab channels back per image, postprocesses and saves them.
+
+    Gives the same output as ImageColorization.convert_bw_to_colorized() for every image.
+    """
+    # Time complexity : O(n / batch_size) forward passes
+    net = get_colorization_net()
+    for batch_start in range(0, len(image_input_file_paths), batch_size):
+        batch_paths = image_input_file_paths[batch_start:batch_start + batch_size]
+        batch_labs = []
+        batch_inputs = []
+        for path in batch_paths:
+            lab, L = preprocess_bw_image(cv2.imread(path))
+            batch_labs.append(lab)
+            batch_inputs.append(L)
+
+        for path, lab, ab in zip(batch_paths, batch_labs, forward_colorization_batch(net, batch_inputs)):
+            save_colorized_image(path, image_output_dir_path, postprocess_colorized_image(lab, ab))
+
+
+def forward_colorization_batch(net, batch_inputs):
+    """
+    This function stacks the net inputs of several images into one blob, runs a single
+    forward pass and returns the predicted ab channels (H x W x 2) of every image. [Output Format > List]
+    """
+    # Time complexity : O(1)
+    net.setInput(cv2.dnn.blobFromImages(batch_inputs))
+    return [ab.transpose((1, 2, 0)) for ab in net.forward()]
+
+
+def save_colorized_image(image_input_file_path, image_output_dir_path, colorized):
+    """
+    This function saves a colorized image under its original file name in the output directory,
+    and returns whether it was written. [Output Format > Boolean]
+    """
+    # Time complexity : O(1)
+    image_file_name = os.path.basename(image_input_file_path)
+    output_path = f"{image_output_dir_path}/{image_file_name}"
+    written = cv2.imwrite(output_path, colorized)
+    print("-" * 70)
+    print(f"Saved {image_file_name} to {output_path}." if written else f"{image_file_name} failed to save.")
+    print("-" * 70)
+    return written
+
+
+def put_unless_stopped(item_queue, item, stop_event):
+    """
+    This function puts an item on a bounded queue, waiting for room unless stop_event is set,
+    and returns whether the item was put. [Output Format > Boolean]
+    """
+    # Time complexity : O(1)
+    while not stop_event.is_set():
+        try:
+            item_queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def get_unless_stopped(item_queue, stop_event):
+    """
+    This function gets an item from a queue, waiting for one unless stop_event is set,
+    and returns (Got An Item, Item). [Output Format > Tuple]
+    """
+    # Time complexity : O(1)
+    while not stop_event.is_set():
+        try:
+            return True, item_queue.get(timeout=QUEUE_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return False, None
+
+
+def colorize_images_pipelined(
+    image_input_file_paths,
+    image_output_dir_path,
+    batch_size=1,
+    preprocess_workers=None,
+    postprocess_workers=None,
+    queue_size=DEFAULT_QUEUE_SIZE,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads and preprocesses the images on a pool of threads.
+    [2] Runs the net on the calling thread, as soon as a batch of inputs is ready.
+    [3] Postprocesses (LAB to BGR) and writes the images on another pool of threads.
+
+    [4] Returns the input paths whose colorized image was written. [Output Format > List]
+
+    The stages are connected by bounded queues, so reading, inference and encoding
+    overlap without ever holding more than "queue_size" images per stage in memory.
+    OpenCV releases the GIL in imread, cvtColor, resize, forward and imwrite, so the
+    threads run in parallel. Gives the same output as convert_bw_to_colorized().
+
+    An error in any stage (or a KeyboardInterrupt) stops every stage, instead of leaving
+    the others blocked on a queue, and is raised again once the threads have exited.
+    """
+    # Time complexity : O(n / batch_size) forward passes
+    net = get_colorization_net()
+    preprocess_workers = preprocess_workers or max(1, (os.cpu_count() or 2) // 2)
+    postprocess_workers = postprocess_workers or max(1, (os.cpu_count() or 2) // 2)
+
+    path_queue = queue.Queue()
+    for path in image_input_file_paths:
+        path_queue.put(path)
+    preprocessed_queue = queue.Queue(maxsize=queue_size)
+    colorized_queue = queue.Queue(maxsize=queue_size)
+    # Set when a stage fails, so the other stages stop instead of waiting on their queues.
+    stop_event = threading.Event()
+    errors = []
+    colorized_image_paths = []
+
+    def preprocess_worker():
+        try:
+            while not stop_event.is_set():
+                try:
+                    path = path_queue.get_nowait()
+                except queue.Empty:
+                    break
+                image = cv2.imread(path)
+                # cv2.imread returns None for corrupted or unsupported files.
+                if image is None:
+                    print("-" * 70)
+                    print(f"{os.path.basename(path)} failed to colorize.")
+                    print("This could be because the file is corrupted.")
+                    print("-" * 70)
+                    continue
+                lab, L = preprocess_bw_image(image)
+                put_unless_stopped(preprocessed_queue, (path, lab, L), stop_event)
+        except BaseException as error:  # pylint: disable=broad-except
+            errors.append(error)
+            stop_event.set()
+        finally:
+            # Tells the inference stage that this worker is done.
+            put_unless_stopped(preprocessed_queue, None, stop_event)
+
+    def postprocess_worker():
+        try:
+            while True:
+                got_item, item = get_unless_stopped(colorized_queue, stop_event)
+                if not got_item or item is None:
+                    break
+                path, lab, ab = item
+                if save_colorized_image(path, image_output_dir_path, postprocess_colorized_image(lab, ab)):
+                    colorized_image_paths.append(path)
+        except BaseException as error:  # pylint: disable=broad-except
+            errors.append(error)
+            stop_event.set()
+
+    def run_batch(batch):
+        batch_ab = forward_colorization_batch(net, [L for _, _, L in batch])
+        for (path, lab, _), ab in zip(batch, batch_ab):
+            put_unless_stopped(colorized_queue, (path, lab, ab), stop_event)
+
+    threads = [threading.Thread(target=preprocess_worker) for _ in range(preprocess_workers)]
+    threads += [threading.Thread(target=postprocess_worker) for _ in range(postprocess_workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        finished_preprocess_workers = 0
+        batch = []
+        while finished_preprocess_workers < preprocess_workers:
+            got_item, item = get_unless_stopped(preprocessed_queue, stop_event)
+            if not got_item:
+                break
+            if item is None:
+                finished_preprocess_workers += 1
+                continue
+            batch.append(item)
+            if len(batch) == batch_size:
+                run_batch(batch)
+                batch = []
+        if batch and not stop_event.is_set():
+            run_batch(batch)
+        for _ in range(postprocess_workers):
+            put_unless_stopped(colorized_queue, None, stop_event)
+
+    except BaseException:
+        stop_event.set()
+        raise
+
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return colorized_image_paths
+
+
+def get_worker_thread_split(workers=None, cpu_count=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Picks the number of worker processes (one per DEFAULT_THREADS_PER_WORKER cores by default).
+    [2] Gives each worker an equal share of the cores for OpenCV's own threads, so that
+    workers x threads never exceeds the number of cores.
+    [3] Returns (Workers, Threads Per Worker). [Output Format > Tuple]
+
+    OpenCV's DNN forward doesn't scale linearly with threads, several processes with a
+    few threads each keep more cores busy than one process with all of them.
+    """
+    # Time complexity : O(1)
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cpu_count // DEFAULT_THREADS_PER_WORKER)
+    workers = max(1, min(workers, cpu_count))
+    return workers, max(1, cpu_count // workers)
+
+
+def init_colorization_worker(threads_per_worker, backend=None):
+    """
+    This function sets up a colorization worker process : it limits OpenCV to its share
+    of the cores and loads the worker's own net (with the backend of the parent process)
+    once, before the first image arrives.
+    """
+    # Time complexity : O(1)
+    cv2.setNumThreads(threads_per_worker)
+    if backend is not None and colorization_model.backend != backend:
+        set_inference_backend(backend)
+    colorization_model.warm_up()
+
+
+def colorize_image_file(image_input_file_path, image_output_dir_path):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Colorizes a single image file with the net of the current worker process.
+    [2] Returns (Image File Name, Error Message) where the error message is
+    None on success. [Output Format > Tuple]
+
+    Errors are returned instead of raised, so one failed file does not abort the whole pool.
+    """
+    # Time complexity : O(1)
+    image_file_name = os.path.basename(image_input_file_path)
+    try:
+        ImageColorization(image_input_file_path, image_output_dir_path, image_file_name).convert_bw_to_colorized()
+
+    # This error is raised when file is corrupted.
+    except UnidentifiedImageError:
+        return image_file_name, "This could be because the file is corrupted."
+
+    # This error is raised when the input image file is modified or deleted while the program is running.
+    except FileNotFoundError:
+        return image_file_name, "This could be because the file was modified during colorization."
+
+    # These errors are raised when the output cannot be written, or OpenCV rejects the image (e.g. an unsupported size).
+    except (OSError, ValueError, cv2.error) as error:
+        return image_file_name, str(error)
+
+    return image_file_name, None
+
+
+def colorize_images_in_process_pool(image_input_file_paths, image_output_dir_path, workers=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Splits the cores between worker processes and OpenCV threads (see get_worker_thread_split()).
+    [2] Starts the workers, each one loading its own net once.
+    [3] Hands out the images one by one from the shared queue of the pool, every worker
+    writing its results directly to the output directory.
+    [4] Prints every failed file and returns them as (Image File Name, Error Message). [Output Format > List]
+    """
+    # Time complexity : O(n / workers)
+    # Fails early, instead of in every worker, when the model is missing.
+    colorization_model.check_model_files()
+    workers, threads_per_worker = get_worker_thread_split(workers)
+
+    failed_image_files = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_colorization_worker,
+        initargs=(threads_per_worker, colorization_model.backend),
+    ) as executor:
+        results = executor.map(
+            colorize_image_file,
+            image_input_file_paths,
+            [image_output_dir_path] * len(image_input_file_paths),
+        )
+        for image_file_name, error_message in results:
+            if error_message is not None:
+                failed_image_files.append((image_file_name, error_message))
+                print("-" * 70)
+                print(f"{image_file_name} failed to colorize.")
+                print(error_message)
+                print("-" * 70)
+
+    print("-" * 70)
+    print(
+        f"Colorized {len(image_input_file_paths) - len(failed_image_files)} of {len(image_input_file_paths)} file(s) "
+        f"on {workers} worker(s) x {threads_per_worker} thread(s)."
+    )
+    print("-" * 70)
+    return failed_image_files
+
 
 def open_gui_for_individual_file_paths():
     """
@@ -98,6 +802,7 @@ def open_gui_for_individual_file_paths():
     ]
 
     filetypes_displayed_in_gui = (("Image Files", filetypes),)
+    get_gui_root()
     image_input_file_paths = list(
         filedialog.askopenfilenames(
             title="Select Image File/Files", filetypes=filetypes_displayed_in_gui
@@ -122,6 +827,7 @@ def open_gui_for_output_directory_path():
 
     """
     # Time complexity : O(1)
+    get_gui_root()
     output_image_directory_path =   filedialog.askdirectory(title="Save To")
 
     # The following code checks if the user selected an output path,
@@ -143,17 +849,237 @@ def open_gui_for_output_directory_path():
 prototx_path = './models/colorization_deploy_v2.prototxt'
 model_path = './models/colorization_release_v2.caffemodel'
 kernel_path = './models/pts_in_hull.npy'
+# The Caffe model exported to ONNX, with the "class8_ab" and "conv8_313_rh" blobs already patched in.
+onnx_model_path = './models/colorization_release_v2.onnx'
+
+# Setting IFAMMS_COLORIZATION_BACKEND selects the inference backend of every process (and worker).
+BACKEND_ENVIRONMENT_VARIABLE = "IFAMMS_COLORIZATION_BACKEND"
+
+# The CPU inference backends : OpenCV DNN (backend, target) combinations, and ONNX Runtime.
+# "opencv" (float32) is the reference path.
+INFERENCE_BACKENDS = {
+    "opencv": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    "opencv_fp16": (cv2.dnn.DNN_BACKEND_OPENCV, getattr(cv2.dnn, "DNN_TARGET_CPU_FP16", None)),
+    "inference_engine": (cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE, cv2.dnn.DNN_TARGET_CPU),
+    "onnxruntime": (None, None),
+}
+DEFAULT_INFERENCE_BACKEND = "opencv"
+# ONNX Runtime is optional, it is only imported once the "onnxruntime" inference backend is used.
+ONNXRUNTIME_MODULE_NAME = "onnxruntime"
+
+
+def import_onnxruntime():
+    """
+    This function imports ONNX Runtime on first use and returns the module,
+    or raises an ImportError naming the backend that needs it.
+    """
+    # Time complexity : O(1)
+    try:
+        return importlib.import_module(ONNXRUNTIME_MODULE_NAME)
+    except ImportError as error:
+        raise ImportError("The onnxruntime backend needs the onnxruntime package.") from error
+
+
+def get_available_backends():
+    """
+    This function returns the names of the inference backends usable with this OpenCV
+    build and the installed packages. [Output Format > List]
+    """
+    # Time complexity : O(1)
+    available_backends = []
+    for backend_name, (backend, target) in INFERENCE_BACKENDS.items():
+        if backend_name == "onnxruntime":
+            # find_spec() only looks the package up, it does not import it.
+            if importlib.util.find_spec(ONNXRUNTIME_MODULE_NAME) is not None:
+                available_backends.append(backend_name)
+        elif target is not None and target in cv2.dnn.getAvailableTargets(backend):
+            available_backends.append(backend_name)
+    return available_backends
+
+
+class OnnxColorizationNet:
+    """
+    This class gives an ONNX Runtime CPU session the setInput()/forward() interface
+    of a cv2.dnn net, so the rest of the colorization code works with either.
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] setInput
+    [2] forward
+    """
+    def __init__(self, onnx_file_path):
+
+        onnxruntime = import_onnxruntime()
+        self.session = onnxruntime.InferenceSession(onnx_file_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.blob = None
+
+    def setInput(self, blob):
+        """
+        This function stores the input blob (N x 1 x 224 x 224) of the next forward pass.
+        """
+        # Time complexity : O(1)
+        self.blob = blob
+
+    def forward(self):
+        """
+        This function runs the session and returns the ab output blob (N x 2 x 56 x 56). [Output Format > Array]
+        """
+        # Time complexity : O(1)
+        return self.session.run(None, {self.input_name: self.blob})[0]
+
+
+class ColorizationModel:
+    """
+    This class creates a model holder that requires the following parameters
+    to function:
+    --------------------------------------------------------------------------------
+    [1] Prototxt Path
+    [2] Caffe Model Path
+    [3] Cluster Centers (pts_in_hull) Path
+    [4] Inference Backend (a key of INFERENCE_BACKENDS)
+    [5] ONNX Model Path (only for the "onnxruntime" backend)
 
-net = cv2.dnn.readNetFromCaffe(prototx_path, model_path)
-pts = np.load(kernel_path)
+    The net is read and configured on first use, then kept for the life of the
+    process, so every colorization (and every worker process) pays the load cost once.
+    The backend is also only checked on first use, so a wrong IFAMMS_COLORIZATION_BACKEND
+    does not make importing this module fail.
 
-class8 = net.getLayerId("class8_ab")
-conv8 = net.getLayerId("conv8_313_rh")
-pts = pts.transpose().reshape(2, 313, 1, 1)
-net.getLayer(class8).blobs = [pts.astype("float32")]
-net.getLayer(conv8).blobs = [np.full([1, 313], 2.606, dtype="float32")]
+    The following are the methods that can be performed on an instance of this class:
 
-def main():
+    [1] get_net
+    [2] check_backend
+    [3] check_model_files
+    [4] warm_up
+    [5] is_loaded
+    """
+    def __init__(
+        self,
+        prototxt_path,
+        caffe_model_path,
+        cluster_centers_path,
+        backend=DEFAULT_INFERENCE_BACKEND,
+        onnx_file_path=onnx_model_path,
+    ):
+        self.prototxt_path = prototxt_path
+        self.caffe_model_path = caffe_model_path
+        self.cluster_centers_path = cluster_centers_path
+        self.backend = backend
+        self.onnx_file_path = onnx_file_path
+        self.net = None
+        self.lock = threading.Lock()
+
+    def get_net(self):
+        """
+        This function does the following task:
+        --------------------------------------------------
+
+        [1] Reads the Caffe colorization model and patches the "class8_ab" and
+        "conv8_313_rh" blobs with the cluster centers, on first use only.
+        [2] Selects the OpenCV DNN backend and target of the inference backend,
+        or opens the exported ONNX model for the "onnxruntime" backend.
+        [3] Returns the same net for every following call.
+
+        """
+        # Time complexity : O(1)
+        with self.lock:
+            if self.net is None:
+                self.check_model_files()
+                if self.backend == "onnxruntime":
+                    self.net = OnnxColorizationNet(self.onnx_file_path)
+                    return self.net
+
+                net = cv2.dnn.readNetFromCaffe(self.prototxt_path, self.caffe_model_path)
+                pts = np.load(self.cluster_centers_path)
+
+                class8 = net.getLayerId("class8_ab")
+                conv8 = net.getLayerId("conv8_313_rh")
+                pts = pts.transpose().reshape(2, 313, 1, 1)
+                net.getLayer(class8).blobs = [pts.astype("float32")]
+                net.getLayer(conv8).blobs = [np.full([1, 313], 2.606, dtype="float32")]
+
+                backend, target = INFERENCE_BACKENDS[self.backend]
+                if target is None:
+                    raise ValueError(f"The {self.backend} backend is not supported by this OpenCV build.")
+                net.setPreferableBackend(backend)
+                net.setPreferableTarget(target)
+                self.net = net
+        return self.net
+
+    def check_backend(self):
+        """
+        This function raises a ValueError when the backend is not a key of INFERENCE_BACKENDS.
+        """
+        # Time complexity : O(1)
+        if self.backend not in INFERENCE_BACKENDS:
+            raise ValueError(
+                f"Unknown inference backend : {self.backend}, the backends are : {', '.join(INFERENCE_BACKENDS)}."
+            )
+
+    def check_model_files(self):
+        """
+        This function raises a ValueError for an unknown backend (see check_backend()),
+        and a FileNotFoundError naming the first model file that is missing.
+        """
+        # Time complexity : O(1)
+        self.check_backend()
+        if self.backend == "onnxruntime":
+            model_file_paths = (self.onnx_file_path,)
+        else:
+            model_file_paths = (self.prototxt_path, self.caffe_model_path, self.cluster_centers_path)
+        for path in model_file_paths:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Colorization model file not found : {path}")
+
+    def warm_up(self):
+        """
+        This function loads the net and runs one forward pass on a blank input,
+        so OpenCV's one-time layer initialization is not paid by the first real image.
+        """
+        # Time complexity : O(1)
+        net = self.get_net()
+        net.setInput(cv2.dnn.blobFromImage(np.zeros((224, 224), dtype="float32")))
+        net.forward()
+
+    def is_loaded(self):
+        """
+        This function returns True once the net has been read. [Output Format > Boolean]
+        """
+        # Time complexity : O(1)
+        return self.net is not None
+
+
+# The process-wide model holder. Importing this module never reads the model,
+# so it no longer fails when ./models/ is missing.
+colorization_model = ColorizationModel(
+    prototx_path,
+    model_path,
+    kernel_path,
+    os.environ.get(BACKEND_ENVIRONMENT_VARIABLE, DEFAULT_INFERENCE_BACKEND),
+)
+
+
+def set_inference_backend(backend):
+    """
+    This function replaces the model holder of this process with one using the given
+    inference backend, the net is read again on next use. Unknown backends raise a ValueError here already.
+    """
+    # Time complexity : O(1)
+    global colorization_model  # pylint: disable=global-statement
+    model = ColorizationModel(prototx_path, model_path, kernel_path, backend)
+    model.check_backend()
+    colorization_model = model
+    return colorization_model
+
+
+def get_colorization_net():
+    """
+    This function returns the colorization net of this process, loading it on first use.
+    """
+    # Time complexity : O(1)
+    return colorization_model.get_net()
+
+def main(pass_through_color_images=False):
     """
     This function does the following tasks :
     --------------------------------------------------
@@ -161,28 +1087,63 @@ def main():
     [1] Gets the image input file path/paths [format > List]
     [2] Reads the output directory path [format > String]
 
-    [3] Uses a for loop to extract the path from the image input file path list.
-    [4] Gets the filename from the path.
-    [5] Uses the ImageColorization class to create an instance.
-    [6] Converts the black and white image to colored and saves it.
+    [3] Leaves out the images that are already in color (see is_grayscale_image()),
+    or copies them unchanged to the output directory when pass_through_color_images is True.
+    [4] Copies the images already colorized with this model from the result cache.
+    [5] Colorizes the remaining images with the staged pipeline
+    (reading, inference and writing overlap, see colorize_images_pipelined()).
+    [6] Adds the newly colorized images to the result cache.
+    [7] Prints how many inputs were skipped for being in color.
     
     """
     # Time complexity : O(n + 1)
     image_paths = open_gui_for_individual_file_paths()
     image_output_dir_path = open_gui_for_output_directory_path()
 
+    color_image_paths = [path for path in image_paths if not is_grayscale_image(path)]
+    for path in color_image_paths:
+        if pass_through_color_images:
+            shutil.copyfile(path, f"{image_output_dir_path}/{os.path.basename(path)}")
+        print(f"Skipped {os.path.basename(path)}, already in color.")
+    image_paths = [path for path in image_paths if path not in color_image_paths]
+
+    cache = image_cache.get_result_cache()
+    cache_parameters = {"model": os.path.basename(model_path), "backend": colorization_model.backend}
+    cache_keys = {}
+    pending_image_paths = []
     for path in image_paths:
-        image_file_name = os.path.basename(path)
-        image_file = ImageColorization(path,image_output_dir_path,image_file_name)
-        image_file.convert_bw_to_colorized()
+        output_path = f"{image_output_dir_path}/{os.path.basename(path)}"
+        # Served from the result cache instead, when the same bytes were already colorized with this model.
+        if cache is not None:
+            cache_keys[path] = cache.get_key(path, "colorization", cache_parameters)
+            if image_cache.fetch_cached(cache, cache_keys[path], path, output_path):
+                continue
+        pending_image_paths.append(path)
+
+    colorized_image_paths = colorize_images_pipelined(pending_image_paths, image_output_dir_path)
+
+    # Only the outputs written by this run are stored, not older files left in the output directory.
+    if cache is not None:
+        for path in colorized_image_paths:
+            cache.store(cache_keys[path], f"{image_output_dir_path}/{os.path.basename(path)}")
+
+    number_of_inputs = len(image_paths) + len(color_image_paths)
+    print("-" * 70)
+    print(
+        f"Skipped {len(color_image_paths)} of {number_of_inputs} input(s) already in color "
+        f"({100 * len(color_image_paths) / max(1, number_of_inputs):.1f}%)"
+        + (", copied unchanged." if pass_through_color_images else ".")
+    )
+    print("-" * 70)
+    image_cache.print_cache_statistics()
 
-def execute():
+def execute(pass_through_color_images=False):
     """
     This function executes the entire program.
     """
     # Time complexity : O(1)
     try:
-        main()
+        main(pass_through_color_images)
     # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
     except KeyboardInterrupt:
         sys.exit()
@@ -4,12 +4,36 @@ import sys  # USE CASE: Forcefully exiting the program while in use.
 import tkinter as tk  # USE CASE: GUI for users preferred I/O Paths.
 from tkinter import filedialog  # USE CASE: GUI for users preferred I/O Paths.
 import os  # USE CASE: Read file names.
+import io  # USE CASE: Encoding candidate qualities in memory for target file size and visual quality compression.
+import time  # USE CASE: Measuring encode times for compression dry runs.
+from concurrent.futures import ThreadPoolExecutor  # USE CASE: Compressing files to a target size in parallel.
 from PIL import Image  # USE CASE: Performing image conversions for majority formats.
 from PIL import UnidentifiedImageError  # USE CASE: Error handling for corrupted files.
+import numpy as np  # USE CASE: Computing the SSIM and PSNR of candidate qualities.
+import image_manifest  # USE CASE: Skipping unchanged files on incremental re-runs.
+import image_cache  # USE CASE: Serving repeated requests from the content-addressed result cache.
+import image_png_optimization  # USE CASE: Lossless optimization of PNG files, which have no quality setting.
+import image_encoder_profiles  # USE CASE: Encoder options of the JPEG and WebP delivery profiles.
 
 
-root = tk.Tk()
-root.withdraw()
+# The tkinter root is only created once a file dialog is opened, so headless runs never need a display.
+root = None
+
+
+def get_gui_root():
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Creates the hidden tkinter root window on first use and returns it.
+
+    """
+    # Time complexity : O(1)
+    global root  # pylint: disable=global-statement
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+    return root
 
 
 def validate_input(func):
@@ -44,12 +68,16 @@ Please select the amount of compression you want to apply
 
 [5] Custom 
 
+[6] Target File Size (Highest quality under a file size, JPEG and WebP only)
+
+[7] Target Visual Quality (Smallest file above an SSIM or PSNR floor, JPEG and WebP only)
+
 
 Select from the above options: """
                 ).strip()
             )
 
-            while compression_amount_input not in [1, 2, 3, 4,5]:
+            while compression_amount_input not in [1, 2, 3, 4, 5, TARGET_FILE_SIZE_OPTION, QUALITY_FLOOR_OPTION]:
                 print(header)
                 print("Please try again with a valid input")
                 print(header)
@@ -72,7 +100,11 @@ Select from the above options: """
     return user_preferred_image_compression_input
 
 
-@validate_input
+# Menu options of validate_input() for compressing to a target file size, and above a visual quality floor.
+TARGET_FILE_SIZE_OPTION = 6
+QUALITY_FLOOR_OPTION = 7
+
+
 def get_compression_quality(compression_quality=None):
     """
     This function does the following task:
@@ -110,6 +142,137 @@ def get_compression_quality(compression_quality=None):
     return compression_quality
 
 
+def get_target_file_size():
+    """
+    This function does the following task:
+    --------------------------------------------
+
+    It reads the user's target file size in KB and returns it in bytes. [Output Format > Integer]
+    """
+    # Time complexity : O(1)
+    header = "\n\n" + "-" * 70 + "\n\n"
+    try:
+        target_file_size = int(input("""
+\n\n
+Every image is saved with the highest quality that fits the target file size.
+------------------------------------------
+
+
+>> Add your target file size (in KB) : """).strip())
+        if target_file_size <= 0:
+            raise ValueError
+        return target_file_size * 1024
+
+    # Checks for value errors, i.e :
+    # >>> string input like : a,b,c,word,@,#,',"",etc.
+    except ValueError:
+        print(header)
+        print("Please try again with a valid input")
+        print(header)
+        return get_target_file_size()
+
+    # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
+    except KeyboardInterrupt:
+        sys.exit()
+
+
+def get_quality_floor():
+    """
+    This function does the following task:
+    --------------------------------------------
+
+    It reads the user's visual quality metric and its minimum value,
+    e.g. {"metric": "ssim", "floor": 0.95}. [Output Format > Dictionary]
+    """
+    # Time complexity : O(1)
+    header = "\n\n" + "-" * 70 + "\n\n"
+    try:
+        metric_input = int(input("""
+\n\n
+Every image is saved with the lowest quality that still looks close enough to the original.
+------------------------------------------
+
+[1] SSIM (Structural similarity, 1 is identical. Around 0.95 for web images, 0.98 and above for archives.)
+
+[2] PSNR (Peak signal-to-noise ratio in dB. Around 38 for web images, 45 and above for archives.)
+
+
+Select from the above options: """).strip())
+        metric = {1: "ssim", 2: "psnr"}[metric_input]
+        floor = float(input(f"""
+>> Add your minimum {metric.upper()} : """).strip())
+        if floor <= 0 or (metric == "ssim" and floor > 1):
+            raise ValueError
+        return {"metric": metric, "floor": floor}
+
+    # Checks for value errors, i.e :
+    # >>> string input like : a,b,c,word,@,#,',"",etc.
+    except (ValueError, KeyError):
+        print(header)
+        print("Please try again with a valid input")
+        print(header)
+        return get_quality_floor()
+
+    # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
+    except KeyboardInterrupt:
+        sys.exit()
+
+
+def get_encoder_profile():
+    """
+    This function does the following task:
+    --------------------------------------------
+
+    It reads the user's encoder profile for JPEG and WebP files (see image_encoder_profiles.py),
+    the default profile when nothing is entered. [Output Format > String]
+    """
+    # Time complexity : O(p), where p is the number of encoder profiles
+    header = "\n\n" + "-" * 70 + "\n\n"
+    encoder_profiles = list(image_encoder_profiles.ENCODER_PROFILES)
+    print("\n\nPlease select the encoder profile of JPEG and WebP files")
+    print("-" * 64 + "\n")
+    for count, encoder_profile in enumerate(encoder_profiles):
+        print(f"[{count + 1}] {encoder_profile} ({image_encoder_profiles.ENCODER_PROFILES[encoder_profile]['description']})\n")
+    try:
+        encoder_profile_input = input("\nSelect from the above options (Enter for default): ").strip()
+        if not encoder_profile_input:
+            return image_encoder_profiles.DEFAULT_ENCODER_PROFILE
+        if not 1 <= int(encoder_profile_input) <= len(encoder_profiles):
+            raise ValueError
+        return encoder_profiles[int(encoder_profile_input) - 1]
+
+    # Checks for value errors, i.e :
+    # >>> string input like : a,b,c,word,@,#,',"",etc.
+    except ValueError:
+        print(header)
+        print("Please try again with a valid input")
+        print(header)
+        return get_encoder_profile()
+
+    # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
+    except KeyboardInterrupt:
+        sys.exit()
+
+
+@validate_input
+def get_compression_parameters(compression_option=None):
+    """
+    This function does the following task:
+    --------------------------------------------
+
+    It reads the user's compression settings : {"quality": quality} for a fixed quality,
+    {"target_size": bytes} for the target file size option, or {"metric": metric, "floor": floor}
+    for the visual quality option. [Output Format > Dictionary]
+    These are also the parameters of the manifest and the result cache.
+    """
+    # Time complexity : O(1)
+    if compression_option == TARGET_FILE_SIZE_OPTION:
+        return {"target_size": get_target_file_size()}
+    if compression_option == QUALITY_FLOOR_OPTION:
+        return get_quality_floor()
+    return {"quality": get_compression_quality(compression_option)}
+
+
 def open_gui_for_individual_file_paths():
     """
     This function does the following tasks:
@@ -133,6 +296,7 @@ def open_gui_for_individual_file_paths():
     ]
 
     filetypes_displayed_in_gui = (("Image Files", filetypes),)
+    get_gui_root()
     image_input_file_paths = list(
         filedialog.askopenfilenames(
             title="Select Image File/Files", filetypes=filetypes_displayed_in_gui
@@ -158,6 +322,7 @@ def open_gui_for_output_directory_path():
 
     """
     # Time complexity : O(1)
+    get_gui_root()
     output_image_directory_path = filedialog.askdirectory(title="Save To")
 
     # The following code checks if the user selected an output path,
@@ -177,6 +342,182 @@ def open_gui_for_output_directory_path():
     return pictures_folder
 
 
+# Formats with a quality setting, which can be compressed to a target file size or visual quality.
+QUALITY_SEARCH_FORMATS = ("JPEG", "WEBP")
+
+# Qualities searched, above 95 JPEG files grow without a visible gain.
+QUALITY_SEARCH_RANGE = (1, 95)
+
+# Longest side of the luma plane the visual quality metrics are computed on, which keeps every step of the search cheap.
+METRIC_MAX_SIDE = 1024
+
+# Side of the square windows of the SSIM, in pixels of the luma plane.
+SSIM_WINDOW_SIZE = 7
+
+
+def encode_image(img, image_file_type, compression_quality, encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE):
+    """
+    This function encodes an already decoded image (prepared with image_encoder_profiles.prepare_image())
+    into memory with the encoder profile and returns the encoded bytes. [Output Format > Bytes]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    buffer = io.BytesIO()
+    img.save(
+        buffer,
+        image_file_type,
+        **image_encoder_profiles.get_encoder_save_options(img, image_file_type, encoder_profile, compression_quality),
+    )
+    return buffer.getvalue()
+
+
+def search_quality_for_target_size(
+    img,
+    image_file_type,
+    target_file_size,
+    quality_range=QUALITY_SEARCH_RANGE,
+    encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Binary searches the highest quality in quality_range whose encoding fits target_file_size,
+    encoding the same decoded image in memory at every step.
+    [2] Falls back to the lowest quality when even that does not fit.
+    [3] Returns the chosen quality, its encoded bytes and the number of encodes. [Output Format > Tuple]
+
+    """
+    # Time complexity : O(log q), where q is the number of qualities in quality_range
+    low_quality, high_quality = quality_range
+    encoded_images = {}
+    chosen_quality = None
+    while low_quality <= high_quality:
+        quality = (low_quality + high_quality) // 2
+        encoded_images[quality] = encode_image(img, image_file_type, quality, encoder_profile)
+        if len(encoded_images[quality]) <= target_file_size:
+            chosen_quality = quality
+            low_quality = quality + 1
+        else:
+            high_quality = quality - 1
+
+    if chosen_quality is None:
+        chosen_quality = quality_range[0]
+        if chosen_quality not in encoded_images:
+            encoded_images[chosen_quality] = encode_image(img, image_file_type, chosen_quality, encoder_profile)
+    return chosen_quality, encoded_images[chosen_quality], len(encoded_images)
+
+
+def get_luma_plane(img, max_side=METRIC_MAX_SIDE):
+    """
+    This function returns the luma (the "L" mode of Pillow) of an image as float32, reduced by an
+    integer factor until its longest side is at most max_side. [Output Format > NumPy Array]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    luma = img.convert("L")
+    factor = -(-max(luma.size) // max_side)
+    if factor > 1:
+        luma = luma.reduce(factor)
+    return np.asarray(luma, dtype="float32")
+
+
+def get_window_means(plane, window_size):
+    """
+    This function returns the mean of every window_size x window_size window of a plane
+    (without padding), from its integral image. [Output Format > NumPy Array]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    integral = np.pad(plane.astype("float64").cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    window_sums = (
+        integral[window_size:, window_size:]
+        - integral[:-window_size, window_size:]
+        - integral[window_size:, :-window_size]
+        + integral[:-window_size, :-window_size]
+    )
+    return window_sums / window_size ** 2
+
+
+def get_ssim(reference_luma, luma):
+    """
+    This function returns the mean structural similarity of two luma planes of the same size,
+    over square windows of SSIM_WINDOW_SIZE pixels, 1.0 for identical planes. [Output Format > Float]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    window_size = max(1, min(SSIM_WINDOW_SIZE, *reference_luma.shape))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mean_x = get_window_means(reference_luma, window_size)
+    mean_y = get_window_means(luma, window_size)
+    variance_x = get_window_means(reference_luma * reference_luma, window_size) - mean_x ** 2
+    variance_y = get_window_means(luma * luma, window_size) - mean_y ** 2
+    covariance = get_window_means(reference_luma * luma, window_size) - mean_x * mean_y
+    ssim_map = ((2 * mean_x * mean_y + c1) * (2 * covariance + c2)) / (
+        (mean_x ** 2 + mean_y ** 2 + c1) * (variance_x + variance_y + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def get_psnr(reference_luma, luma):
+    """
+    This function returns the peak signal-to-noise ratio (in dB) of two luma planes of the same size,
+    infinite for identical planes. [Output Format > Float]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    mean_squared_error = float(np.mean((reference_luma - luma) ** 2))
+    if mean_squared_error == 0:
+        return float("inf")
+    return 10 * float(np.log10(255.0 ** 2 / mean_squared_error))
+
+
+# Visual quality metrics of the quality floor option : higher is closer to the original.
+QUALITY_METRICS = {"ssim": get_ssim, "psnr": get_psnr}
+
+
+def search_quality_for_quality_floor(
+    img,
+    image_file_type,
+    metric,
+    floor,
+    quality_range=QUALITY_SEARCH_RANGE,
+    encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Binary searches the lowest quality in quality_range whose encoding scores at least floor
+    with the metric (a key of QUALITY_METRICS) against the decoded image, encoding and decoding
+    in memory at every step, and scoring on reduced luma planes (see get_luma_plane()).
+    [2] Falls back to the highest quality when even that is below the floor.
+    [3] Returns the chosen quality, its encoded bytes, the number of encodes and its score. [Output Format > Tuple]
+
+    """
+    # Time complexity : O(log q), where q is the number of qualities in quality_range
+    reference_luma = get_luma_plane(img)
+    low_quality, high_quality = quality_range
+    encoded_images = {}
+    scores = {}
+
+    def score_quality(quality):
+        encoded_images[quality] = encode_image(img, image_file_type, quality, encoder_profile)
+        with Image.open(io.BytesIO(encoded_images[quality])) as candidate_img:
+            scores[quality] = QUALITY_METRICS[metric](reference_luma, get_luma_plane(candidate_img))
+        return scores[quality]
+
+    chosen_quality = None
+    while low_quality <= high_quality:
+        quality = (low_quality + high_quality) // 2
+        if score_quality(quality) >= floor:
+            chosen_quality = quality
+            high_quality = quality - 1
+        else:
+            low_quality = quality + 1
+
+    if chosen_quality is None:
+        chosen_quality = quality_range[1]
+        if chosen_quality not in encoded_images:
+            score_quality(chosen_quality)
+    return chosen_quality, encoded_images[chosen_quality], len(encoded_images), scores[chosen_quality]
+
+
 class ImageCompression:
     """
     This class creates an image object that requires the following parameters
@@ -186,11 +527,14 @@ class ImageCompression:
     [2] Image Output Directory Path
     [3] Image Compression Quality
     [4] Image File Name
+    [5] Quality Search Parameters (optional, {"target_size": bytes} or {"metric": metric, "floor": floor})
+    [6] Encoder Profile (optional, a key of image_encoder_profiles.ENCODER_PROFILES)
 
     The following are the methods that can be performed on an instance of this class:
 
     [1] get_image_file_type
     [2] compress_image_file
+    [3] compress_image_file_with_quality_search
     """
 
     def __init__(
@@ -199,6 +543,8 @@ class ImageCompression:
         image_output_dir_path,
         compression_quality,
         image_file_name,
+        search_parameters=None,
+        encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE,
     ):
         self.image_input_file_path = image_input_file_path
         self.image_output_dir_path = image_output_dir_path
@@ -207,6 +553,9 @@ class ImageCompression:
         ].lower()
         self.image_file_name = image_file_name
         self.compression_quality = compression_quality
+        self.search_parameters = search_parameters
+        self.encoder_profile = encoder_profile
+        self.search_result = None
 
     def get_image_file_type(self):
         """
@@ -229,29 +578,449 @@ class ImageCompression:
 
         [1] Creates an output path for the compressed file.
         [2] Reads the compression quality from the get_compression_quality() function.
-        [3] Saves the compressed image file to the output path.
+        [3] Saves the compressed image file to the output path, JPEG and WebP files with the
+        options of the encoder profile (see image_encoder_profiles.py).
+
+        PNG files have no quality setting, they are optimized losslessly instead
+        (see image_png_optimization.optimize_png()) within the "png_time_budget" of the encoder
+        profile, or saved with the profile's Pillow options when it has none. The input file
+        is kept when neither makes it smaller.
         """
         # Time complexity : O(1)
         output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
 
         with Image.open(self.image_input_file_path) as img:
-            img.save(
-                output_path,
-                self.get_image_file_type(),
-                optimize=True,
-                quality=self.compression_quality,
+            # The format is read from the already opened image, instead of opening the file again in get_image_file_type().
+            image_file_type = str(img.format)
+            if image_file_type != "PNG":
+                image_encoder_profiles.save_image(
+                    img, output_path, image_file_type, self.encoder_profile, self.compression_quality
+                )
+                print("-" * 70)
+                print(f"Saved {self.image_file_name} to {output_path}.")
+                print("-" * 70)
+                return
+
+            png_options = image_encoder_profiles.get_encoder_profile(self.encoder_profile, "PNG")
+            # The optimizer reads the file itself, once it is closed here.
+            png_bytes = None
+            if "png_time_budget" not in png_options:
+                buffer = io.BytesIO()
+                image_encoder_profiles.save_image(img, buffer, "PNG", self.encoder_profile)
+                png_bytes = buffer.getvalue()
+
+        source_size = os.path.getsize(self.image_input_file_path)
+        if png_bytes is None:
+            best_candidate, png_bytes = image_png_optimization.optimize_png(
+                self.image_input_file_path, png_options["png_time_budget"]
             )
-            print("-" * 70)
-            print(f"Saved {self.image_file_name} to {output_path}.")
-            print("-" * 70)
+        elif len(png_bytes) >= source_size:
+            with open(self.image_input_file_path, "rb") as input_file:
+                best_candidate, png_bytes = "original", input_file.read()
+        else:
+            best_candidate = "Pillow"
+        with open(output_path, "wb") as output_file:
+            output_file.write(png_bytes)
+        print("-" * 70)
+        print(f"Saved {self.image_file_name} to {output_path}.")
+        print(f"Lossless PNG : {source_size / 1024:.1f} KB -> {len(png_bytes) / 1024:.1f} KB ({best_candidate}).")
+        print("-" * 70)
+
+    def compress_image_file_with_quality_search(self):
+        """
+        This function does the following task:
+        -----------------------------------------------
+
+        [1] Decodes the image once and searches its quality, encoding in memory only : the highest quality
+        that fits the target file size (see search_quality_for_target_size()), or the lowest quality
+        above the visual quality floor (see search_quality_for_quality_floor()).
+        [2] Writes only the chosen encoding to the output path.
+        [3] Keeps the chosen quality, the number of encodes, the score (for a quality floor),
+        and the file sizes before and after in search_result. [Output Format > Dictionary]
+        """
+        # Time complexity : O(log q), where q is the number of qualities searched
+        output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
 
+        with Image.open(self.image_input_file_path) as img:
+            image_file_type = str(img.format)
+            if image_file_type not in QUALITY_SEARCH_FORMATS:
+                raise ValueError(
+                    f"{self.image_file_name} is a {image_file_type} image, only {', '.join(QUALITY_SEARCH_FORMATS)} images have a quality to search."
+                )
+            if not image_encoder_profiles.has_quality_setting(self.encoder_profile, image_file_type):
+                raise ValueError(
+                    f"The {self.encoder_profile} encoder profile fixes the quality of {image_file_type} images, there is no quality to search."
+                )
+            img.load()
+            # Prepared once, every quality is then encoded from the same image.
+            img = image_encoder_profiles.prepare_image(img, image_file_type, self.encoder_profile)
+            score = None
+            if "target_size" in self.search_parameters:
+                quality, encoded_image, iterations = search_quality_for_target_size(
+                    img, image_file_type, self.search_parameters["target_size"], encoder_profile=self.encoder_profile
+                )
+            else:
+                quality, encoded_image, iterations, score = search_quality_for_quality_floor(
+                    img,
+                    image_file_type,
+                    self.search_parameters["metric"],
+                    self.search_parameters["floor"],
+                    encoder_profile=self.encoder_profile,
+                )
+
+        with open(output_path, "wb") as output_file:
+            output_file.write(encoded_image)
+        self.search_result = {
+            "quality": quality,
+            "iterations": iterations,
+            "score": score,
+            "source_size": os.path.getsize(self.image_input_file_path),
+            "size": len(encoded_image),
+        }
+        return self.search_result
+
+
+def compress_images_with_quality_search(
+    image_input_file_paths,
+    image_output_directory_path,
+    parameters,
+    workers=None,
+    manifest=None,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Compresses every file to a target file size ({"target_size": bytes}) or above a visual quality floor
+    ({"metric": "ssim" or "psnr", "floor": floor}) on a thread pool (Pillow releases the GIL while encoding),
+    skipping the files up to date in the manifest and serving repeated requests from the result cache.
+    [2] Reports the chosen quality, the number of encodes, the score and the bytes saved for every file.
+    [3] Returns the report of every file, None for skipped and cached files. [Output Format > Dictionary]
 
-def main():
+    """
+    # Time complexity : O(n log q / workers), where n is the number of files
+
+    def compress_file(path):
+        image_file_name = os.path.basename(path)
+        output_path = f"{image_output_directory_path}/{image_file_name}"
+        if manifest is not None and manifest.is_up_to_date(path, "compression", parameters, output_path):
+            return None
+        image_file = ImageCompression(
+            path,
+            image_output_directory_path,
+            None,
+            image_file_name,
+            parameters,
+            parameters.get("encoder_profile", image_encoder_profiles.DEFAULT_ENCODER_PROFILE),
+        )
+        try:
+            image_cache.run_cached(
+                path, "compression", parameters, output_path, image_file.compress_image_file_with_quality_search
+            )
+        except (UnidentifiedImageError, FileNotFoundError, ValueError) as error:
+            return {"error": str(error) or type(error).__name__}
+        if manifest is not None:
+            manifest.record(path, "compression", parameters, output_path)
+        return image_file.search_result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reports = dict(
+            zip(
+                [os.path.basename(path) for path in image_input_file_paths],
+                executor.map(compress_file, image_input_file_paths),
+            )
+        )
+
+    print("-" * 70)
+    if "target_size" in parameters:
+        print(f"Target file size : {parameters['target_size'] / 1024:.0f} KB")
+    else:
+        print(f"Minimum {parameters['metric'].upper()} : {parameters['floor']}")
+    saved_bytes = 0
+    for image_file_name, report in reports.items():
+        if report is None:
+            print(f"{image_file_name} : skipped, unchanged since the last run or served from the cache.")
+            continue
+        if "error" in report:
+            print(f"{image_file_name} : failed, {report['error']}")
+            continue
+
+        if "target_size" in parameters:
+            score = "" if report["size"] <= parameters["target_size"] else " (above the target at the lowest quality)"
+        else:
+            below_floor = " (below the floor at the highest quality)" if report["score"] < parameters["floor"] else ""
+            score = f", {parameters['metric'].upper()} {report['score']:.4g}{below_floor}"
+        saved_bytes += report["source_size"] - report["size"]
+        print(
+            f"{image_file_name} : quality {report['quality']} after {report['iterations']} encodes{score}, "
+            f"{report['source_size'] / 1024:.1f} KB -> {report['size'] / 1024:.1f} KB "
+            f"(saved {(report['source_size'] - report['size']) / 1024:.1f} KB, "
+            f"{100 * (1 - report['size'] / report['source_size']):.1f}%)"
+        )
+    print(f"Saved {saved_bytes / 1024:.1f} KB in total.")
+    print("-" * 70)
+    return reports
+
+
+# A dry run encodes bands of DRY_RUN_BAND_HEIGHT full rows, spread over the image, as one mosaic of about
+# DRY_RUN_SAMPLE_PIXELS pixels (at least DRY_RUN_MIN_BANDS bands). Full rows keep the horizontal redundancy that PNG's
+# deflate and the row-wise predictions of the encoders rely on, square tiles overestimated text and screenshots by 70%.
+# The band height is a multiple of 16, so the JPEG and WebP blocks are not split.
+DRY_RUN_BAND_HEIGHT = 64
+DRY_RUN_SAMPLE_PIXELS = 512 * 1024
+DRY_RUN_MIN_BANDS = 4
+
+# Number of files a dry run also compresses in full (in memory), to report the estimation error.
+DRY_RUN_VALIDATION_FILES = 10
+
+# Side of the image encoded to measure the fixed cost of a file (headers, tables, metadata).
+HEADER_PROBE_SIZE = 16
+
+
+def encode_compressed_image(img, image_file_type, compression_quality, encoder_profile, png_time_budget_scale=1.0):
+    """
+    This function encodes an already decoded image into memory with the encoder profile, the way
+    compress_image_file() saves it, with the PNG time budget of the profile scaled by png_time_budget_scale.
+    It returns the encoded bytes. [Output Format > Bytes]
+
+    A dry run already encodes one file per core, so the PNG optimizer runs on the calling thread here.
+    Its budget is multiplied by the number of cores instead, so it tries about as many candidates as
+    compress_image_file() does with one optimizer thread per core, and the measured time is the time on one core.
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    buffer = io.BytesIO()
+    image_encoder_profiles.save_image(
+        img,
+        buffer,
+        image_file_type,
+        encoder_profile,
+        compression_quality,
+        png_time_budget_scale * (os.cpu_count() or 1),
+        png_workers=1,
+    )
+    return buffer.getvalue()
+
+
+def is_png_file_kept_as_is(image_input_file_path, img):
+    """
+    This function returns whether compress_image_file() keeps an opened PNG file as it is,
+    animated or above 8 bits per sample (see image_png_optimization.is_kept_as_is()). [Output Format > Boolean]
+    """
+    # Time complexity : O(1)
+    with open(image_input_file_path, "rb") as input_file:
+        return image_png_optimization.is_kept_as_is(img, input_file.read(25))
+
+
+def get_kept_png_file_estimate(image_input_file_path):
+    """
+    This function returns the estimate of a PNG file kept as it is : its own size, and no encode time. [Output Format > Dictionary]
+    """
+    # Time complexity : O(1)
+    source_size = os.path.getsize(image_input_file_path)
+    return {"source_size": source_size, "size": source_size, "encode_time": 0.0}
+
+
+def get_sampled_band_mosaic(img, band_height=DRY_RUN_BAND_HEIGHT, sample_pixels=DRY_RUN_SAMPLE_PIXELS):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Splits the image into as many horizontal cells as bands of band_height rows fit in sample_pixels
+    (at least DRY_RUN_MIN_BANDS).
+    [2] Crops a band of full rows at the center of every cell, aligned to 16 rows.
+    [3] Stacks the bands into a mosaic with the mode, palette and metadata of the image.
+    [4] Returns the mosaic, or None when the mosaic would be more than a quarter of the image. [Output Format > PIL Image]
+
+    """
+    # Time complexity : O(s), where s is the number of pixels of the mosaic
+    number_of_bands = max(DRY_RUN_MIN_BANDS, sample_pixels // (band_height * img.width))
+    if 4 * number_of_bands * band_height > img.height:
+        return None
+    cell_height = img.height // number_of_bands
+    # Cropped from the image itself, so the mosaic keeps its mode, palette and info.
+    mosaic = img.crop((0, 0, img.width, number_of_bands * band_height))
+    for band in range(number_of_bands):
+        top = (band * cell_height + (cell_height - band_height) // 2) // 16 * 16
+        mosaic.paste(img.crop((0, top, img.width, top + band_height)), (0, band * band_height))
+    return mosaic
+
+
+def estimate_compressed_file(image_input_file_path, compression_quality, encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Decodes the image and encodes a mosaic of sampled bands (see get_sampled_band_mosaic()) in memory, the way
+    compress_image_file() encodes the whole image. The PNG time budget is scaled down to the mosaic.
+    [2] Encodes a HEADER_PROBE_SIZE image with the same options, which splits the fixed cost of a file
+    (headers, tables, metadata) from its cost per pixel.
+    [3] Extrapolates the size and the encode time of the whole image from the cost per pixel of the mosaic.
+    [4] Returns the source size, the estimated size and the estimated encode time in seconds. [Output Format > Dictionary]
+
+    Images too small to sample are encoded whole, their estimate is exact. Nothing is written.
+    """
+    # Time complexity : O(n), where n is the number of pixels (the decode, only the mosaic is encoded)
+    with Image.open(image_input_file_path) as img:
+        image_file_type = str(img.format)
+        if image_file_type == "PNG" and is_png_file_kept_as_is(image_input_file_path, img):
+            return get_kept_png_file_estimate(image_input_file_path)
+        img.load()
+        mosaic = get_sampled_band_mosaic(img)
+        if mosaic is None:
+            start = time.perf_counter()
+            size = len(encode_compressed_image(img, image_file_type, compression_quality, encoder_profile))
+            encode_time = time.perf_counter() - start
+        else:
+            scale = img.width * img.height / (mosaic.width * mosaic.height)
+            header_probe = img.crop((0, 0, HEADER_PROBE_SIZE, HEADER_PROBE_SIZE))
+            start = time.perf_counter()
+            header_size = len(encode_compressed_image(header_probe, image_file_type, compression_quality, encoder_profile))
+            header_time = time.perf_counter() - start
+            start = time.perf_counter()
+            mosaic_size = len(
+                encode_compressed_image(
+                    mosaic, image_file_type, compression_quality, encoder_profile, 1 / scale
+                )
+            )
+            mosaic_time = time.perf_counter() - start
+            size = round(header_size + max(0, mosaic_size - header_size) * scale)
+            encode_time = header_time + max(0.0, mosaic_time - header_time) * scale
+
+    source_size = os.path.getsize(image_input_file_path)
+    # The PNG optimizer keeps the input file when no candidate is smaller.
+    if image_file_type == "PNG":
+        size = min(size, source_size)
+    return {"source_size": source_size, "size": size, "encode_time": encode_time}
+
+
+def measure_compressed_file(image_input_file_path, compression_quality, encoder_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE):
+    """
+    This function compresses a whole image file in memory the way compress_image_file() does, without writing it,
+    and returns the source size, the size and the encode time in seconds (the decode excluded). [Output Format > Dictionary]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    with Image.open(image_input_file_path) as img:
+        image_file_type = str(img.format)
+        if image_file_type == "PNG" and is_png_file_kept_as_is(image_input_file_path, img):
+            return get_kept_png_file_estimate(image_input_file_path)
+        img.load()
+        start = time.perf_counter()
+        size = len(encode_compressed_image(img, image_file_type, compression_quality, encoder_profile))
+        encode_time = time.perf_counter() - start
+
+    source_size = os.path.getsize(image_input_file_path)
+    if image_file_type == "PNG":
+        size = min(size, source_size)
+    return {"source_size": source_size, "size": size, "encode_time": encode_time}
+
+
+def dry_run_compression(image_input_file_paths, parameters, validation_files=DRY_RUN_VALIDATION_FILES, workers=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Estimates the size and the encode time of every file at the quality and encoder profile of the parameters
+    ({"quality": quality, "encoder_profile": profile}, see estimate_compressed_file()), on a thread pool. Nothing is written.
+    [2] Compresses validation_files files, spread over the list, in full and in memory (see measure_compressed_file()).
+    [3] Reports the estimated totals (bytes before and after, bytes saved, encode time on one core and on every worker),
+    the estimation error of every validated file and on average, and the totals corrected by the ratio
+    of full to estimated bytes and encode time over the validated files.
+    [4] Returns the estimates, the validation and the totals. [Output Format > Dictionary]
+
+    """
+    # Time complexity : O(n / workers), where n is the number of pixels of every file
+    quality = parameters["quality"]
+    encoder_profile = parameters.get("encoder_profile", image_encoder_profiles.DEFAULT_ENCODER_PROFILE)
+    # One thread per core, more threads would inflate the measured encode times.
+    workers = workers or os.cpu_count() or 1
+
+    def run_safely(function, path):
+        try:
+            return function(path, quality, encoder_profile)
+        except (OSError, ValueError) as error:
+            return {"error": str(error) or type(error).__name__}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        estimates = dict(
+            zip(
+                image_input_file_paths,
+                executor.map(lambda path: run_safely(estimate_compressed_file, path), image_input_file_paths),
+            )
+        )
+        estimated_paths = [path for path, estimate in estimates.items() if "error" not in estimate]
+        number_of_validation_files = min(validation_files, len(estimated_paths))
+        validation_paths = [
+            estimated_paths[index * len(estimated_paths) // number_of_validation_files]
+            for index in range(number_of_validation_files)
+        ]
+        validation = dict(
+            zip(
+                validation_paths,
+                executor.map(lambda path: run_safely(measure_compressed_file, path), validation_paths),
+            )
+        )
+    validation = {path: measurement for path, measurement in validation.items() if "error" not in measurement}
+
+    source_size = sum(estimates[path]["source_size"] for path in estimated_paths)
+    size = sum(estimates[path]["size"] for path in estimated_paths)
+    encode_time = sum(estimates[path]["encode_time"] for path in estimated_paths)
+
+    print("-" * 70)
+    print(f"Dry run at quality {quality} with the {encoder_profile} encoder profile, nothing was written.")
+    for path, estimate in estimates.items():
+        if "error" in estimate:
+            print(f"{os.path.basename(path)} : failed, {estimate['error']}")
+    if not estimated_paths:
+        print("-" * 70)
+        return {"files": estimates, "validation": validation}
+    print(
+        f"Estimated for {len(estimated_paths)} file(s) : {source_size / 1024 ** 2:.1f} MB -> {size / 1024 ** 2:.1f} MB "
+        f"(saves {(source_size - size) / 1024 ** 2:.1f} MB, {100 * (1 - size / source_size):.1f}%), "
+        f"encode time {encode_time:.1f} s on one core, {encode_time / workers:.1f} s on {workers} worker(s)."
+    )
+
+    report = {"files": estimates, "validation": validation, "source_size": source_size, "size": size, "encode_time": encode_time}
+    if validation:
+        print(f"\n{'File':>30} | {'Est. KB':>9} | {'Full KB':>9} | {'Error':>7} | {'Est. ms':>8} | {'Full ms':>8} | {'Error':>7}")
+        size_errors, time_errors = [], []
+        for path, measurement in validation.items():
+            estimate = estimates[path]
+            size_errors.append(estimate["size"] / measurement["size"] - 1)
+            time_errors.append(estimate["encode_time"] / measurement["encode_time"] - 1)
+            print(
+                f"{os.path.basename(path)[-30:]:>30} | {estimate['size'] / 1024:>9.1f} | {measurement['size'] / 1024:>9.1f} | {100 * size_errors[-1]:>+6.1f}% | "
+                f"{1000 * estimate['encode_time']:>8.1f} | {1000 * measurement['encode_time']:>8.1f} | {100 * time_errors[-1]:>+6.1f}%"
+            )
+        # The validated files are a sample of the batch, their ratio of full to estimated values corrects the totals.
+        size_ratio = sum(measurement["size"] for measurement in validation.values()) / sum(estimates[path]["size"] for path in validation)
+        time_ratio = sum(measurement["encode_time"] for measurement in validation.values()) / sum(estimates[path]["encode_time"] for path in validation)
+        report.update(
+            {
+                "size_error": sum(abs(error) for error in size_errors) / len(size_errors),
+                "time_error": sum(abs(error) for error in time_errors) / len(time_errors),
+                "corrected_size": round(size * size_ratio),
+                "corrected_encode_time": encode_time * time_ratio,
+            }
+        )
+        print(
+            f"\nMean absolute error over {len(validation)} full encode(s) : size {100 * report['size_error']:.1f}%, "
+            f"encode time {100 * report['time_error']:.1f}%."
+        )
+        print(
+            f"Corrected : {report['corrected_size'] / 1024 ** 2:.1f} MB "
+            f"(saves {(source_size - report['corrected_size']) / 1024 ** 2:.1f} MB), "
+            f"encode time {report['corrected_encode_time']:.1f} s on one core."
+        )
+    print("-" * 70)
+    return report
+
+
+def main(incremental=False, dry_run=False):
     """
     This function does the following tasks :
     --------------------------------------------------
 
-    [1] Reads the compression quality input [format > Integer]
+    [1] Reads the compression quality (or target file size) and encoder profile input [format > Dictionary]
     [2] Gets the image input file path/paths [format > List]
     [3] Reads the output directory path [format > String]
 
@@ -259,18 +1028,67 @@ def main():
     [5] Gets the filename from the path.
     [6] Uses the ImageCompression class to create an instance.
     [7] Checks the image file type and performs the image compression.
+
+    With incremental=True, files already processed with the same parameters
+    and unchanged since are skipped, using the manifest in the output directory.
+    With dry_run=True, nothing is written : the output size and encode time of every
+    file are estimated instead (see dry_run_compression()).
     """
     # Time complexity : O(n + 1)
-    quality = get_compression_quality()
+    parameters = get_compression_parameters()
+    parameters["encoder_profile"] = get_encoder_profile()
+    # The resolved options are part of the manifest and cache parameters, so re-tuned profiles are encoded again.
+    parameters = image_encoder_profiles.get_key_parameters(parameters)
+    quality = parameters.get("quality")
     image_input_file_paths = open_gui_for_individual_file_paths()
+
+    # A dry run writes nothing, so it needs no output directory.
+    if dry_run:
+        if quality is None:
+            print("-" * 70)
+            print("A dry run estimates a fixed quality, target file size and visual quality compression search it for every file.")
+            print("-" * 70)
+        else:
+            dry_run_compression(image_input_file_paths, parameters)
+        return
+
     image_output_directory_path = open_gui_for_output_directory_path()
+    manifest = image_manifest.ImageManifest(image_output_directory_path) if incremental else None
+
+    # Target file size and visual quality compression search a quality per file, the files are compressed in parallel.
+    if quality is None:
+        try:
+            compress_images_with_quality_search(
+                image_input_file_paths, image_output_directory_path, parameters, manifest=manifest
+            )
+        finally:
+            if manifest is not None:
+                manifest.save()
+        image_cache.print_cache_statistics()
+        return
+
     for path in image_input_file_paths:
         image_file_name = os.path.basename(path)
         image_file = ImageCompression(
-            path, image_output_directory_path, quality, image_file_name
+            path, image_output_directory_path, quality, image_file_name, encoder_profile=parameters["encoder_profile"]
         )
+        output_path = f"{image_output_directory_path}/{image_file_name}"
+
+        # Skips the file when the same compression already ran on this unchanged source.
+        if manifest is not None and manifest.is_up_to_date(
+            path, "compression", parameters, output_path
+        ):
+            print(f"Skipped {image_file_name}, unchanged since the last run.")
+            continue
+
         try:
-            image_file.compress_image_file()
+            # Served from the result cache instead, when the same bytes were already compressed with these parameters.
+            image_cache.run_cached(
+                path, "compression", parameters, output_path, image_file.compress_image_file
+            )
+
+            if manifest is not None:
+                manifest.record(path, "compression", parameters, output_path)
 
         # This error is raised when file is corrupted.
         # It is also applicable to files with unknown extension (which is not likely since we handle that possibility early in the input file selection gui itself.)
@@ -289,16 +1107,27 @@ def main():
 
         # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
         except KeyboardInterrupt:
+            if manifest is not None:
+                manifest.save()
             sys.exit()
 
+    if manifest is not None:
+        manifest.save()
+    image_cache.print_cache_statistics()
 
-def execute():
+
+def execute(incremental=False, dry_run=False):
     """
     This function executes the entire program.
     """
     # Time complexity : O(1)
     try:
-        main()
+        main(incremental, dry_run)
     # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
     except KeyboardInterrupt:
         sys.exit()
+
+
+if __name__ == "__main__":
+    # Usage : python image_compression.py [--incremental] [--dry-run]
+    execute("--incremental" in sys.argv, "--dry-run" in sys.argv)
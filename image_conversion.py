@@ -5,6 +5,9 @@ import sys  # USE CASE: Forcefully exiting the program while in use.
 import tkinter as tk  # USE CASE: GUI for users preferred I/O Paths.
 from tkinter import filedialog  # USE CASE: GUI for users preferred I/O Paths.
 import os  # USE CASE: Read file names.
+import fnmatch  # USE CASE: Matching input files against the configuration filetypes in batch mode.
+from concurrent.futures import ProcessPoolExecutor  # USE CASE: Spreading batch conversions over all cores.
+from concurrent.futures import ThreadPoolExecutor  # USE CASE: Encoding several target formats in parallel.
 from PIL import Image  # USE CASE: Performing image conversions for majority formats.
 from PIL import UnidentifiedImageError  # USE CASE: Error handling for corrupted files.
 
@@ -15,10 +18,30 @@ from PIL import UnidentifiedImageError  # USE CASE: Error handling for corrupted
 # import rawpy  # USE CASE: Performing image conversions for RAW files
 #---------------------------------------------------------------------------------------------
 import image_file_configurations  # USE CASE: Contains all configurations for image_conversions.
+import image_manifest  # USE CASE: Skipping unchanged files on incremental re-runs.
+import image_cache  # USE CASE: Serving repeated requests from the content-addressed result cache.
+import image_encoder_profiles  # USE CASE: Encoding with the encoder profile of a configuration.
 
 
-root = tk.Tk()
-root.withdraw()
+# The tkinter root is only created once a file dialog is opened, so headless batch runs
+# (and the worker processes they spawn) never need a display.
+root = None
+
+
+def get_gui_root():
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Creates the hidden tkinter root window on first use and returns it.
+
+    """
+    # Time complexity : O(1)
+    global root  # pylint: disable=global-statement
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+    return root
 
 
 def validate_input(func):
@@ -114,6 +137,7 @@ def open_gui_for_input_file_path(image_file_configuration):
         (f"Image Files ({input_file_extension})", input_file_extension),
     )
 
+    get_gui_root()
     image_input_file_paths = list(
         filedialog.askopenfilenames(
             title="Select Image File/Files", filetypes=filetypes_displayed_in_gui
@@ -139,6 +163,7 @@ def open_gui_for_output_directory_path():
 
     """
     # Time complexity : O(1)
+    get_gui_root()
     output_image_directory_path = filedialog.askdirectory(title="Save To")
 
     # The following code checks if the user selected an output path,
@@ -158,6 +183,36 @@ def open_gui_for_output_directory_path():
     return pictures_folder
 
 
+def normalize_image(img):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Converts palette images to RGB.
+    [2] Merges images with an alpha channel onto a white background.
+    [3] Returns the image ready to be saved in any target format. [Output Format > PIL Image]
+
+    """
+    # Time complexity : O(1)
+    # Checks the image for alpha channel
+    if "P" in img.mode:
+        img = img.convert("RGB")
+    elif "A" in img.mode:
+        # Merges the alpha image with a white background.
+        # This is done, so any transparent parts are filled with white color before conversion
+        try:
+            background = Image.new("RGB", img.size, "white")
+            background.paste(img, mask=img)
+            img = background
+
+        # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
+        except KeyboardInterrupt:
+            print("Sorry there was an error")
+            sys.exit()
+
+    return img
+
+
 class ImageConversion:
     """
     This class creates an image object that requires the following parameters
@@ -254,27 +309,30 @@ class ImageConversion:
         """
         # Time complexity : O(1)
         with Image.open(self.image_input_file_path) as img:
-            # Checks the image for alpha channel
-            if "P" in img.mode:
-                img = img.convert("RGB")
-            elif "A" in img.mode:
-                # Merges the alpha image with a white background.
-                # This is done, so any transparent parts are filled with white color before conversion
-                try:
-                    background = Image.new("RGB", img.size, "white")
-                    background.paste(img, mask=img)
-                    img = background
-
-                # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
-                except KeyboardInterrupt:
-                    print("Sorry there was an error")
-                    sys.exit()                
+            self.save_converted_image(normalize_image(img))
+
+    def save_converted_image(self, img):
+        """
+        This method saves an already decoded (and normalized) image to the
+        output path of this instance, in the format of its image configuration.
 
+        This lets several target formats be encoded from one decoded image,
+        see multi_target_image_conversion().
 
+        Configurations with an "encoder_profile" are saved with the options of that
+        profile (see image_encoder_profiles.py), the others with Pillow's defaults.
+        """
+        # Time complexity : O(1)
+        encoder_profile = self.image_configuration.get("encoder_profile")
+        if encoder_profile is None:
             img.save(self.output_path_for_saving)
-            print("-" * 70)
-            print(f"Saved {self.image_file_name} to {self.output_path_for_saving}")
-            print("-" * 70)
+        else:
+            image_encoder_profiles.save_image(
+                img, self.output_path_for_saving, self.image_configuration["conversion_type"], encoder_profile
+            )
+        print("-" * 70)
+        print(f"Saved {self.image_file_name} to {self.output_path_for_saving}")
+        print("-" * 70)
 
     # def psd_image_conversion(self):
     #     """
@@ -344,8 +402,307 @@ class ImageConversion:
     #         print("Sorry there was an error")
     #         sys.exit()
 
+def multi_target_image_conversion(
+    image_input_file_path,
+    image_output_directory_path,
+    image_file_configuration_list,
+    workers=None,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Verifies that every image configuration shares the same source "filetype".
+    [2] Decodes and normalizes the input image once.
+    [3] Encodes every target format from that one in-memory image, on a thread pool
+    (one thread per target by default, Pillow releases the GIL while encoding).
+
+    e.g. configurations 1, 11 and 13 give PNG, ICO and WebP from a single JPEG decode.
 
-def main():
+    """
+    # Time complexity : O(k), where k is the number of target formats
+    source_filetypes = {
+        image_file_configuration["filetype"]
+        for image_file_configuration in image_file_configuration_list
+    }
+    if len(source_filetypes) != 1:
+        raise ValueError(
+            f"Multi-target conversion needs configurations with one source filetype, got {sorted(source_filetypes)}."
+        )
+
+    image_file_name = os.path.basename(image_input_file_path)
+    image_files = [
+        ImageConversion(
+            image_input_file_path,
+            image_output_directory_path,
+            image_file_name,
+            image_file_configuration,
+        )
+        for image_file_configuration in image_file_configuration_list
+    ]
+
+    # Targets already in the result cache are copied from it, only the others are encoded.
+    cache = image_cache.get_result_cache()
+    if cache is not None:
+        cache_keys = {
+            image_file.output_path_for_saving: cache.get_key(
+                image_input_file_path, "conversion", image_encoder_profiles.get_key_parameters(image_file.image_configuration)
+            )
+            for image_file in image_files
+        }
+        image_files = [
+            image_file
+            for image_file in image_files
+            if not image_cache.fetch_cached(
+                cache,
+                cache_keys[image_file.output_path_for_saving],
+                image_input_file_path,
+                image_file.output_path_for_saving,
+            )
+        ]
+        if not image_files:
+            return
+
+    with Image.open(image_input_file_path) as img:
+        img = normalize_image(img)
+        img.load()
+        # Every encoder gets its own copy, as Image.save() stores the encoder options on the image object.
+        with ThreadPoolExecutor(max_workers=workers or len(image_files)) as executor:
+            list(
+                executor.map(
+                    lambda image_file: image_file.save_converted_image(img.copy()),
+                    image_files,
+                )
+            )
+
+    if cache is not None:
+        for image_file in image_files:
+            cache.store(cache_keys[image_file.output_path_for_saving], image_file.output_path_for_saving)
+
+
+def get_output_path(image_input_file_path, image_output_directory_path, image_file_configuration):
+    """
+    This function returns the path ImageConversion saves the converted image to. [Output Format > String]
+    """
+    # Time complexity : O(1)
+    return ImageConversion(
+        image_input_file_path,
+        image_output_directory_path,
+        os.path.basename(image_input_file_path),
+        image_file_configuration,
+    ).output_path_for_saving
+
+
+def find_input_file_paths(image_input_directory_path, image_file_configuration):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Walks the input directory tree.
+    [2] Collects every file matching the "filetype" of the image configuration.
+    [3] Returns the matching paths in a stable order. [Output Format > List]
+
+    """
+    # Time complexity : O(n)
+    patterns = image_file_configuration["filetype"].split(";")
+    image_input_file_paths = []
+    for directory_path, _, file_names in os.walk(image_input_directory_path):
+        for file_name in file_names:
+            if any(fnmatch.fnmatch(file_name.lower(), pattern) for pattern in patterns):
+                image_input_file_paths.append(os.path.join(directory_path, file_name))
+    return sorted(image_input_file_paths)
+
+
+def convert_image_file(
+    image_input_file_path, image_output_directory_path, image_file_configuration_list
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Converts a single image file with the ImageConversion class, or to every
+    target format with multi_target_image_conversion() when several image
+    configurations are given.
+    [2] Catches the same per-file failures handled in main(), so a worker
+    process never takes the whole batch down.
+    [3] Returns (Image File Name, Error Message) where the error message is
+    None on success. [Output Format > Tuple]
+
+    """
+    # Time complexity : O(1)
+    image_file_name = os.path.basename(image_input_file_path)
+    try:
+        if len(image_file_configuration_list) == 1:
+            image_file = ImageConversion(
+                image_input_file_path,
+                image_output_directory_path,
+                image_file_name,
+                image_file_configuration_list[0],
+            )
+            image_cache.run_cached(
+                image_input_file_path,
+                "conversion",
+                image_encoder_profiles.get_key_parameters(image_file.image_configuration),
+                image_file.output_path_for_saving,
+                image_file.normal_image_conversion,
+            )
+        else:
+            # The batch already runs one process per core, so the encoders run one after another here.
+            multi_target_image_conversion(
+                image_input_file_path,
+                image_output_directory_path,
+                image_file_configuration_list,
+                workers=1,
+            )
+
+    # This error is raised when file is corrupted.
+    except UnidentifiedImageError:
+        return image_file_name, "This could be because the file is corrupted."
+
+    # This error is raised when the input image file is modified or deleted while the program is running.
+    except FileNotFoundError:
+        return image_file_name, "This could be because the file was modified during conversion."
+
+    # This error is raised when Pillow is unable to write the converted image (e.g. unsupported size for ICO).
+    except (OSError, ValueError) as error:
+        return image_file_name, str(error)
+
+    return image_file_name, None
+
+
+def convert_image_file_in_worker(
+    image_input_file_path, image_output_directory_path, image_file_configuration_list
+):
+    """
+    This function runs convert_image_file() in a batch worker process and returns
+    (Image File Name, Error Message, Cache Counters), where the cache counters are the
+    (hits, misses, evictions) of the worker's result cache for this file. [Output Format > Tuple]
+    """
+    # Time complexity : O(1)
+    counters_before = image_cache.get_cache_counters()
+    image_file_name, error_message = convert_image_file(
+        image_input_file_path, image_output_directory_path, image_file_configuration_list
+    )
+    counters_after = image_cache.get_cache_counters()
+    return (
+        image_file_name,
+        error_message,
+        tuple(after - before for before, after in zip(counters_before, counters_after)),
+    )
+
+
+def batch_image_conversion(
+    image_input_directory_path,
+    image_output_directory_path,
+    configuration_idx,
+    workers=None,
+    incremental=False,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads the image file configuration for the given configuration key, or
+    the configurations for a list of keys sharing one source filetype (multi-target mode).
+    [2] Finds every matching file in the input directory tree.
+    [3] Converts the files on a process pool (one worker per core by default),
+    mirroring the input sub-directories inside the output directory.
+    [4] Prints every failed file and a summary at the end of the batch, with the
+    result cache counters summed over the worker processes.
+    [5] Returns the failed files as (Image File Name, Error Message). [Output Format > List]
+
+    This is the non-interactive counterpart of main(), no GUI or input() is used.
+    With incremental=True, files whose source and configuration are unchanged since
+    the last run (see image_manifest.py) are skipped.
+
+    """
+    # Time complexity : O(n / workers)
+    if isinstance(configuration_idx, int):
+        configuration_idx = [configuration_idx]
+    image_file_configuration_list = [
+        image_file_configurations.configurations[idx] for idx in configuration_idx
+    ]
+    if len({configuration["filetype"] for configuration in image_file_configuration_list}) != 1:
+        raise ValueError("Multi-target conversion needs configurations with one source filetype.")
+
+    image_input_file_paths = find_input_file_paths(
+        image_input_directory_path, image_file_configuration_list[0]
+    )
+
+    manifest = image_manifest.ImageManifest(image_output_directory_path) if incremental else None
+    number_of_image_files = len(image_input_file_paths)
+
+    pending_image_input_file_paths = []
+    output_directory_paths = []
+    for path in image_input_file_paths:
+        relative_directory_path = os.path.relpath(
+            os.path.dirname(path), image_input_directory_path
+        )
+        output_directory_path = os.path.normpath(
+            os.path.join(image_output_directory_path, relative_directory_path)
+        ).replace("\\", "/")
+        if manifest is not None and all(
+            manifest.is_up_to_date(
+                path,
+                "conversion",
+                image_encoder_profiles.get_key_parameters(image_file_configuration),
+                get_output_path(path, output_directory_path, image_file_configuration),
+            )
+            for image_file_configuration in image_file_configuration_list
+        ):
+            continue
+        os.makedirs(output_directory_path, exist_ok=True)
+        pending_image_input_file_paths.append(path)
+        output_directory_paths.append(output_directory_path)
+    image_input_file_paths = pending_image_input_file_paths
+
+    # Hands out files in chunks, so tens of thousands of small files don't pay one IPC round trip each.
+    chunksize = max(1, len(image_input_file_paths) // (4 * (workers or os.cpu_count() or 1)))
+
+    failed_image_files = []
+    cache_counters = (0, 0, 0)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            convert_image_file_in_worker,
+            image_input_file_paths,
+            output_directory_paths,
+            [image_file_configuration_list] * len(image_input_file_paths),
+            chunksize=chunksize,
+        )
+        for path, output_directory_path, (image_file_name, error_message, file_cache_counters) in zip(
+            image_input_file_paths, output_directory_paths, results
+        ):
+            cache_counters = tuple(map(sum, zip(cache_counters, file_cache_counters)))
+            if error_message is not None:
+                failed_image_files.append((image_file_name, error_message))
+                print("-" * 70)
+                print(f"{image_file_name} failed to convert.")
+                print(error_message)
+                print("-" * 70)
+            elif manifest is not None:
+                for image_file_configuration in image_file_configuration_list:
+                    manifest.record(
+                        path,
+                        "conversion",
+                        image_encoder_profiles.get_key_parameters(image_file_configuration),
+                        get_output_path(path, output_directory_path, image_file_configuration),
+                    )
+
+    if manifest is not None:
+        manifest.save()
+
+    print("-" * 70)
+    print(
+        f"Converted {len(image_input_file_paths) - len(failed_image_files)} of "
+        f"{number_of_image_files} file(s), {len(failed_image_files)} failed, "
+        f"{number_of_image_files - len(image_input_file_paths)} unchanged."
+    )
+    print("-" * 70)
+    image_cache.print_cache_statistics(cache_counters)
+    return failed_image_files
+
+
+def main(incremental=False):
     """
     This function performs the following tasks:
     ------------------------------------------------------
@@ -359,13 +716,19 @@ def main():
     [6] Uses the ImageConversion class to create an instance.
     [7] Checks the image file type to perform the respective conversion.
 
+    With incremental=True, files already converted with the same configuration
+    and unchanged since are skipped, using the manifest in the output directory.
+
     """
 
     # Time complexity : O(n)
     # The following are the parameters required by the image_file class.
     image_file_configuration = read_file_configuration()
+    # The manifest and the result cache key the resolved options of the encoder profile, not only its name.
+    key_parameters = image_encoder_profiles.get_key_parameters(image_file_configuration)
     image_input_file_paths = open_gui_for_input_file_path(image_file_configuration)
     image_output_directory_path = open_gui_for_output_directory_path()
+    manifest = image_manifest.ImageManifest(image_output_directory_path) if incremental else None
 
     for path in image_input_file_paths:
         image_file_name = os.path.basename(
@@ -378,6 +741,13 @@ def main():
             image_file_configuration,
         )
 
+        # Skips the file when the same conversion already ran on this unchanged source.
+        if manifest is not None and manifest.is_up_to_date(
+            path, "conversion", key_parameters, image_file.output_path_for_saving
+        ):
+            print(f"Skipped {image_file_name}, unchanged since the last run.")
+            continue
+
         # The following conditional logic is to check the original image's filetype and checks if file is corrupted
         try:
             if image_file_configuration["filetype"] == "*.psd":
@@ -387,7 +757,19 @@ def main():
             elif image_file_configuration["filetype"] == "*.raw;*.arw;*.dng":
                 image_file.raw_image_conversion()
             else:
-                image_file.normal_image_conversion()
+                # Served from the result cache instead, when the same bytes were already converted with this configuration.
+                image_cache.run_cached(
+                    path,
+                    "conversion",
+                    key_parameters,
+                    image_file.output_path_for_saving,
+                    image_file.normal_image_conversion,
+                )
+
+            if manifest is not None:
+                manifest.record(
+                    path, "conversion", key_parameters, image_file.output_path_for_saving
+                )
 
         # This error is raised when file is corrupted.
         # It is also applicable to files with unknown extension (which is not likely since we handle that possibility early in the input file selection gui itself.)
@@ -406,17 +788,39 @@ def main():
 
         # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
         except KeyboardInterrupt:
+            if manifest is not None:
+                manifest.save()
             sys.exit()
 
+    if manifest is not None:
+        manifest.save()
+    image_cache.print_cache_statistics()
+
 
-def execute():
+def execute(incremental=False):
     """
     This function executes the entire program.
     """
     # Time complexity : O(1)
     try:
-        main()
+        main(incremental)
 
     # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
     except KeyboardInterrupt:
         sys.exit()
+
+
+if __name__ == "__main__":
+    # Headless batch mode : python image_conversion.py <input_dir> <output_dir> <configuration_key[,key...]> [workers] [--incremental]
+    INCREMENTAL = "--incremental" in sys.argv
+    ARGUMENTS = [argument for argument in sys.argv[1:] if argument != "--incremental"]
+    if len(ARGUMENTS) in (3, 4):
+        batch_image_conversion(
+            ARGUMENTS[0],
+            ARGUMENTS[1],
+            [int(idx) for idx in ARGUMENTS[2].split(",")],
+            int(ARGUMENTS[3]) if len(ARGUMENTS) == 4 else None,
+            incremental=INCREMENTAL,
+        )
+    else:
+        execute(INCREMENTAL)
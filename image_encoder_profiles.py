@@ -0,0 +1,274 @@
+# pylint: disable=line-too-long
+"""System module."""
+import os  # USE CASE: Reading the path of the tuned encoder profiles from the environment.
+import json  # USE CASE: Loading tuned encoder profiles (see image_encoder_tuning.py).
+from PIL import ImageOps  # USE CASE: Applying the EXIF orientation before the metadata is dropped.
+
+
+# Encoder profiles for JPEG and WebP delivery, selectable in image_compression.py and through the
+# "encoder_profile" key of image_file_configurations.py. Every format maps to Pillow save options, plus :
+# "metadata"        -> "strip" (nothing), "icc" (ICC color profile only) or "keep" (ICC, EXIF and XMP).
+# "qtables"         -> name of a QUANTIZATION_TABLES entry, scaled by the quality like the libjpeg tables.
+# "near_lossless"   -> 0 - 100, the lower the more low bits are rounded off before a lossless WebP encode.
+# "png_time_budget" -> PNG only, encodes with the lossless optimizer of image_png_optimization.py within
+#                      this many seconds (None for no budget), instead of Pillow's encoder.
+# A "quality" in a profile is fixed, the profile then has no quality to choose or search.
+# Formats missing from a profile use DEFAULT_FORMAT_OPTIONS.
+ENCODER_PROFILES = {
+    "default": {
+        "description": "Baseline JPEG with optimized Huffman tables and the default WebP method, without metadata.",
+        "JPEG": {"optimize": True, "metadata": "strip"},
+        "WEBP": {"metadata": "strip"},
+    },
+    "web": {
+        "description": "Progressive 4:2:0 JPEG and the slowest (smallest) WebP method, keeps the ICC profile.",
+        "JPEG": {"optimize": True, "progressive": True, "subsampling": "4:2:0", "metadata": "icc"},
+        "WEBP": {"method": 6, "metadata": "icc"},
+    },
+    "web_small": {
+        "description": "Like web, with flatter JPEG quantization tables and without any metadata.",
+        "JPEG": {"optimize": True, "progressive": True, "subsampling": "4:2:0", "qtables": "robidoux", "metadata": "strip"},
+        "WEBP": {"method": 6, "metadata": "strip"},
+    },
+    "high_fidelity": {
+        "description": "4:4:4 JPEG without chroma subsampling and full quality WebP alpha, keeps all metadata.",
+        "JPEG": {"optimize": True, "subsampling": "4:4:4", "metadata": "keep"},
+        "WEBP": {"method": 6, "alpha_quality": 100, "metadata": "keep"},
+    },
+    "near_lossless": {
+        "description": "Near lossless WebP (at most 2 levels off per sample), JPEG at quality 95 and 4:4:4.",
+        "JPEG": {"optimize": True, "quality": 95, "subsampling": "4:4:4", "metadata": "icc"},
+        "WEBP": {"lossless": True, "near_lossless": 60, "quality": 75, "method": 4, "metadata": "icc"},
+    },
+    "lossless": {
+        "description": "Lossless WebP, JPEG (which has no lossless mode) at quality 100 and 4:4:4.",
+        "JPEG": {"optimize": True, "quality": 100, "subsampling": "4:4:4", "metadata": "keep"},
+        "WEBP": {"lossless": True, "quality": 75, "method": 4, "metadata": "keep"},
+    },
+}
+
+DEFAULT_ENCODER_PROFILE = "default"
+
+# Formats the built-in profiles are written for.
+ENCODER_PROFILE_FORMATS = ("JPEG", "WEBP")
+
+# Time budget of the lossless PNG optimization of every file, in seconds (None tries every candidate).
+DEFAULT_PNG_TIME_BUDGET = 10.0
+
+# Encoder options of the formats missing from a profile : PNG files are optimized losslessly, the others
+# are saved with optimized encoder tables where the format has them.
+DEFAULT_FORMAT_OPTIONS = {"PNG": {"png_time_budget": DEFAULT_PNG_TIME_BUDGET}}
+
+# Setting IFAMMS_ENCODER_PROFILES to a JSON file of {name: profile} adds those profiles in every process,
+# e.g. the profile written by image_encoder_tuning.py.
+ENCODER_PROFILES_ENVIRONMENT_VARIABLE = "IFAMMS_ENCODER_PROFILES"
+
+METADATA_POLICIES = ("strip", "icc", "keep")
+
+# Quality the JPEG quantization tables of a profile are scaled to, when no quality is given (Pillow's default).
+DEFAULT_JPEG_QUALITY = 75
+
+# Custom JPEG quantization tables in natural (row-major) order, for the luma and the chroma planes.
+# "robidoux" is N. Robidoux's table from ImageMagick (also a mozjpeg table), flatter than the libjpeg tables :
+# coarser on the fine details the eye misses, finer on the smooth gradients that would show blocks.
+ROBIDOUX_QUANTIZATION_TABLE = [
+    16, 16, 16, 18, 25, 37, 56, 85,
+    16, 17, 20, 27, 34, 40, 53, 75,
+    16, 20, 24, 31, 43, 62, 91, 135,
+    18, 27, 31, 40, 53, 74, 106, 156,
+    25, 34, 43, 53, 69, 94, 131, 189,
+    37, 40, 62, 74, 94, 124, 169, 238,
+    56, 53, 91, 106, 131, 169, 226, 311,
+    85, 75, 135, 156, 189, 238, 311, 418,
+]
+QUANTIZATION_TABLES = {"robidoux": [ROBIDOUX_QUANTIZATION_TABLE, ROBIDOUX_QUANTIZATION_TABLE]}
+
+
+def load_encoder_profiles(encoder_profiles_file_path):
+    """
+    This function adds the encoder profiles of a JSON file of {name: profile} to ENCODER_PROFILES,
+    replacing the profiles of the same name, and returns their names. [Output Format > List]
+    """
+    # Time complexity : O(p), where p is the number of profiles in the file
+    with open(encoder_profiles_file_path, encoding="utf-8") as encoder_profiles_file:
+        encoder_profiles = json.load(encoder_profiles_file)
+    ENCODER_PROFILES.update(encoder_profiles)
+    return list(encoder_profiles)
+
+
+def get_encoder_profile(encoder_profile, image_file_type):
+    """
+    This function returns a copy of the options of an encoder profile (a key of ENCODER_PROFILES, or a profile
+    dictionary) for one image format, DEFAULT_FORMAT_OPTIONS for formats missing from the profile. [Output Format > Dictionary]
+    """
+    # Time complexity : O(1)
+    if isinstance(encoder_profile, dict):
+        profile = encoder_profile
+    elif encoder_profile in ENCODER_PROFILES:
+        profile = ENCODER_PROFILES[encoder_profile]
+    else:
+        raise ValueError(f"Unknown encoder profile {encoder_profile!r}, the profiles are : {', '.join(ENCODER_PROFILES)}.")
+    image_file_type = image_file_type.upper()
+    return dict(profile.get(image_file_type, DEFAULT_FORMAT_OPTIONS.get(image_file_type, {"optimize": True})))
+
+
+def get_key_parameters(parameters):
+    """
+    This function returns the parameters of an operation as the manifest and the result cache key them :
+    with an "encoder_profile", a copy with the resolved options of the profile (see get_encoder_profile())
+    added under "encoder_options", for the "conversion_type" of a conversion or for every format of a compression.
+    [Output Format > Dictionary]
+
+    A profile name alone would keep serving outputs encoded with older options, once a profile of the same name
+    is tuned again (see image_encoder_tuning.py) or DEFAULT_PNG_TIME_BUDGET changes.
+    """
+    # Time complexity : O(1)
+    encoder_profile = parameters.get("encoder_profile")
+    if encoder_profile is None:
+        return parameters
+    if "conversion_type" in parameters:
+        image_file_types = [parameters["conversion_type"].upper()]
+    else:
+        profile = encoder_profile if isinstance(encoder_profile, dict) else ENCODER_PROFILES.get(encoder_profile, {})
+        image_file_types = sorted(
+            set(ENCODER_PROFILE_FORMATS) | set(DEFAULT_FORMAT_OPTIONS) | {key for key in profile if key != "description"}
+        )
+    return dict(
+        parameters,
+        encoder_options={image_file_type: get_encoder_profile(encoder_profile, image_file_type) for image_file_type in image_file_types},
+    )
+
+
+def has_quality_setting(encoder_profile, image_file_type):
+    """
+    This function returns whether the quality of an image format can be chosen with an encoder profile,
+    i.e. the profile is lossy and does not fix the quality. [Output Format > Boolean]
+    """
+    # Time complexity : O(1)
+    options = get_encoder_profile(encoder_profile, image_file_type)
+    return not options.get("lossless") and "quality" not in options
+
+
+def get_scaled_quantization_tables(quantization_tables, quality):
+    """
+    This function scales quantization tables to a quality the way libjpeg scales its own tables,
+    clipped to 1 - 255 so the JPEG stays baseline. [Output Format > List]
+
+    Pillow uses custom tables as they are and ignores the quality, so they are scaled here.
+    """
+    # Time complexity : O(1)
+    quality = min(100, max(1, quality))
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return [
+        [min(255, max(1, (value * scale + 50) // 100)) for value in quantization_table]
+        for quantization_table in quantization_tables
+    ]
+
+
+def round_off_low_bits(img, near_lossless):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Gets the number of low bits to round off from the near lossless level, like libwebp : 5 - level // 20.
+    [2] Rounds every color sample to the nearest multiple of 2 ** bits, the alpha channel is kept exact.
+    [3] Returns the image, which then compresses better losslessly. [Output Format > PIL Image]
+
+    Pillow does not expose libwebp's near lossless option, so the rounding is done here, on every pixel.
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    bits = 5 - min(100, max(0, near_lossless)) // 20
+    if bits == 0 or img.mode not in ("L", "LA", "RGB", "RGBA"):
+        return img
+    rounded_values = [min(255, ((value + (1 << (bits - 1))) >> bits) << bits) for value in range(256)]
+    lookup_table = []
+    for band in img.getbands():
+        lookup_table += list(range(256)) if band == "A" else rounded_values
+    return img.point(lookup_table)
+
+
+def prepare_image(img, image_file_type, encoder_profile=DEFAULT_ENCODER_PROFILE):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Applies the EXIF orientation to the pixels when the profile drops the EXIF data,
+    so the image is not shown rotated without it.
+    [2] Rounds off the low bits of the image for near lossless profiles (see round_off_low_bits()).
+    [3] Returns the image ready to be encoded, as is when nothing changed. [Output Format > PIL Image]
+
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    options = get_encoder_profile(encoder_profile, image_file_type)
+    if options.get("metadata", "strip") != "keep" and img.getexif().get(0x0112, 1) != 1:
+        img = ImageOps.exif_transpose(img)
+    if options.get("near_lossless") is not None:
+        img = round_off_low_bits(img, options["near_lossless"])
+    return img
+
+
+def get_encoder_save_options(img, image_file_type, encoder_profile=DEFAULT_ENCODER_PROFILE, quality=None):
+    """
+    This function does the following tasks:
+    ---------------------------------------------
+
+    [1] Reads the options of the encoder profile for the image format.
+    [2] Adds the quality, unless the profile fixes it, and scales the custom quantization tables to it.
+    [3] Adds the metadata of the image the profile keeps.
+    [4] Returns the options for Image.save(). [Output Format > Dictionary]
+
+    """
+    # Time complexity : O(1)
+    options = get_encoder_profile(encoder_profile, image_file_type)
+    metadata = options.pop("metadata", "strip")
+    if metadata not in METADATA_POLICIES:
+        raise ValueError(f"Unknown metadata policy {metadata!r}, the policies are : {', '.join(METADATA_POLICIES)}.")
+    options.pop("near_lossless", None)
+    options.pop("png_time_budget", None)
+    if quality is not None:
+        options.setdefault("quality", quality)
+
+    if "qtables" in options:
+        options["qtables"] = get_scaled_quantization_tables(
+            QUANTIZATION_TABLES[options["qtables"]], options.pop("quality", DEFAULT_JPEG_QUALITY)
+        )
+
+    if metadata != "strip" and img.info.get("icc_profile"):
+        options["icc_profile"] = img.info["icc_profile"]
+    if metadata == "keep":
+        for key in ("exif", "xmp"):
+            if img.info.get(key):
+                options[key] = img.info[key]
+    return options
+
+
+def save_image(img, fp, image_file_type, encoder_profile=DEFAULT_ENCODER_PROFILE, quality=None, png_time_budget_scale=1.0, png_workers=None):
+    """
+    This function prepares an image for an encoder profile (see prepare_image()) and saves it
+    to a path or a file object with the options of the profile (see get_encoder_save_options()).
+
+    PNG options with a "png_time_budget" use the lossless optimizer instead, within the budget
+    times png_time_budget_scale, on png_workers threads (see image_png_optimization.optimize_png_image()).
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    img = prepare_image(img, image_file_type, encoder_profile)
+    options = get_encoder_profile(encoder_profile, image_file_type)
+    if image_file_type.upper() == "PNG" and "png_time_budget" in options:
+        # Imported on first use, as the optimizer loads NumPy, which conversions otherwise never need.
+        import image_png_optimization  # pylint: disable=import-outside-toplevel
+
+        png_time_budget = options["png_time_budget"]
+        png_bytes = image_png_optimization.optimize_png_image(
+            img, None if png_time_budget is None else png_time_budget * png_time_budget_scale, png_workers
+        )[1]
+        if hasattr(fp, "write"):
+            fp.write(png_bytes)
+        else:
+            with open(fp, "wb") as output_file:
+                output_file.write(png_bytes)
+        return
+    img.save(fp, image_file_type, **get_encoder_save_options(img, image_file_type, encoder_profile, quality))
+
+
+if os.environ.get(ENCODER_PROFILES_ENVIRONMENT_VARIABLE):
+    load_encoder_profiles(os.environ[ENCODER_PROFILES_ENVIRONMENT_VARIABLE])
@@ -0,0 +1,226 @@
+# pylint: disable=line-too-long
+"""System module."""
+import sys  # USE CASE: Reading the command line arguments.
+import os  # USE CASE: Listing the corpus files.
+import io  # USE CASE: Encoding every setting in memory.
+import json  # USE CASE: Writing the tuned encoder profile.
+import time  # USE CASE: Measuring the CPU time of every encode.
+from concurrent.futures import ProcessPoolExecutor  # USE CASE: Measuring the corpus files in parallel, one process per core.
+from PIL import Image  # USE CASE: Decoding the corpus files.
+import image_conversion  # USE CASE: Flattening alpha and palette images before they are encoded as JPEG.
+import image_encoder_profiles  # USE CASE: Encoding with the swept settings on top of a base encoder profile.
+
+
+# Settings swept for every format : the encoder options that trade CPU time for bytes without changing the
+# decoded image (JPEG and WebP at a fixed quality) or at all (PNG). JPEG and WebP settings are applied on top of
+# the base encoder profile, PNG settings replace its PNG options and keep the ICC profile, as the optimizer does.
+TUNING_SETTINGS = {
+    "JPEG": {
+        "baseline": {"optimize": False, "progressive": False},
+        "optimize": {"optimize": True, "progressive": False},
+        "progressive": {"optimize": False, "progressive": True},
+        "progressive + optimize": {"optimize": True, "progressive": True},
+    },
+    "WEBP": {f"method {method}": {"method": method} for method in range(7)},
+    "PNG": {
+        **{f"compress_level {level}": {"compress_level": level, "metadata": "icc"} for level in (1, 3, 6, 9)},
+        "optimize": {"optimize": True, "metadata": "icc"},
+        **{f"optimizer {png_time_budget:g} s": {"png_time_budget": png_time_budget} for png_time_budget in (0.0, 1.0, 10.0)},
+    },
+}
+
+TUNING_FILE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp", ".bmp")
+
+# Number of corpus files the settings are measured on, spread over the whole corpus.
+DEFAULT_TUNING_SAMPLE_SIZE = 32
+
+# Quality of the JPEG and WebP encodes, the settings are compared at one quality.
+DEFAULT_TUNING_QUALITY = 75
+
+DEFAULT_TUNED_PROFILE_NAME = "tuned"
+
+
+def get_tuning_options(image_file_type, setting, base_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE):
+    """
+    This function returns the encoder options of a swept setting of an image format, on top of the
+    options of the base encoder profile for JPEG and WebP. [Output Format > Dictionary]
+    """
+    # Time complexity : O(1)
+    if image_file_type == "PNG":
+        return dict(setting)
+    return {**image_encoder_profiles.get_encoder_profile(base_profile, image_file_type), **setting}
+
+
+def measure_encoder_settings(image_input_file_path, quality=DEFAULT_TUNING_QUALITY, base_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Decodes the image file once (flattened onto white for JPEG, see image_conversion.normalize_image()).
+    [2] Encodes it in memory with every setting of every format (see TUNING_SETTINGS) at "quality".
+    [3] Returns {format: {setting: (bytes, CPU seconds)}}, the CPU time of the process (every thread of the
+    PNG optimizer included) being the cost on one core. A format the image cannot be encoded in is left out. [Output Format > Dictionary]
+
+    """
+    # Time complexity : O(s * n), where s is the number of settings and n the number of pixels
+    measurements = {}
+    with Image.open(image_input_file_path) as img:
+        img.load()
+        for image_file_type, settings in TUNING_SETTINGS.items():
+            source_img = image_conversion.normalize_image(img) if image_file_type == "JPEG" else img
+            measurements[image_file_type] = {}
+            try:
+                for setting_name, setting in settings.items():
+                    encoder_profile = {image_file_type: get_tuning_options(image_file_type, setting, base_profile)}
+                    setting_quality = quality if image_encoder_profiles.has_quality_setting(encoder_profile, image_file_type) else None
+                    buffer = io.BytesIO()
+                    start = time.process_time()
+                    image_encoder_profiles.save_image(source_img, buffer, image_file_type, encoder_profile, setting_quality)
+                    measurements[image_file_type][setting_name] = (len(buffer.getvalue()), time.process_time() - start)
+            except (OSError, ValueError):
+                del measurements[image_file_type]
+    return measurements
+
+
+def get_pareto_front(results):
+    """
+    This function returns the settings on the Pareto front of {setting: {"bytes": bytes, "cpu_time": seconds}},
+    i.e. no other setting is both faster and smaller, from the fastest to the smallest. [Output Format > List]
+    """
+    # Time complexity : O(s log s), where s is the number of settings
+    pareto_front = []
+    for setting_name in sorted(results, key=lambda name: (results[name]["cpu_time"], results[name]["bytes"])):
+        if not pareto_front or results[setting_name]["bytes"] < results[pareto_front[-1]]["bytes"]:
+            pareto_front.append(setting_name)
+    return pareto_front
+
+
+def choose_setting(results, files_per_second_per_core):
+    """
+    This function returns the smallest setting of the Pareto front whose mean CPU time per file fits the throughput target,
+    and whether one does, the fastest setting otherwise. [Output Format > Tuple]
+    """
+    # Time complexity : O(s log s), where s is the number of settings
+    pareto_front = get_pareto_front(results)
+    fitting_settings = [name for name in pareto_front if results[name]["cpu_time"] <= 1 / files_per_second_per_core]
+    if fitting_settings:
+        return fitting_settings[-1], True
+    return pareto_front[0], False
+
+
+def find_corpus_file_paths(corpus_dir_path, sample_size=DEFAULT_TUNING_SAMPLE_SIZE):
+    """
+    This function returns sample_size image files spread over the corpus directory tree,
+    every file of the corpus when it has fewer. [Output Format > List]
+    """
+    # Time complexity : O(n), where n is the number of files in the corpus
+    corpus_file_paths = sorted(
+        os.path.join(directory_path, file_name)
+        for directory_path, _, file_names in os.walk(corpus_dir_path)
+        for file_name in file_names
+        if file_name.lower().endswith(TUNING_FILE_EXTENSIONS)
+    )
+    number_of_files = min(sample_size, len(corpus_file_paths))
+    return [corpus_file_paths[index * len(corpus_file_paths) // number_of_files] for index in range(number_of_files)]
+
+
+def tune_encoder_settings(
+    corpus_dir_path,
+    files_per_second_per_core,
+    sample_size=DEFAULT_TUNING_SAMPLE_SIZE,
+    quality=DEFAULT_TUNING_QUALITY,
+    base_profile=image_encoder_profiles.DEFAULT_ENCODER_PROFILE,
+    workers=None,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Measures every setting of TUNING_SETTINGS on sample_size files of the corpus (see measure_encoder_settings()),
+    on a process pool (one process per core by default).
+    [2] Prints, for every format, the mean CPU time per file, the files per second per core and the total bytes
+    of every setting, marking the Pareto front of CPU time against bytes and the chosen setting.
+    [3] Chooses, for every format, the smallest setting within the throughput target (see choose_setting()).
+    [4] Returns the encoder profile of the chosen settings (see image_encoder_profiles.py) and the results. [Output Format > Tuple]
+
+    """
+    # Time complexity : O(s * n / workers), where s is the number of settings and n the number of sampled pixels
+    corpus_file_paths = find_corpus_file_paths(corpus_dir_path, sample_size)
+    if not corpus_file_paths:
+        raise ValueError(f"No image files found in {corpus_dir_path}.")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        file_measurements = list(
+            executor.map(
+                measure_encoder_settings,
+                corpus_file_paths,
+                [quality] * len(corpus_file_paths),
+                [base_profile] * len(corpus_file_paths),
+            )
+        )
+
+    encoder_profile = {
+        "description": f"Tuned for {files_per_second_per_core:g} files per second per core at quality {quality}, on {len(corpus_file_paths)} files of {corpus_dir_path}.",
+    }
+    results = {}
+    print("-" * 70)
+    print(f"Throughput target : {files_per_second_per_core:g} files per second per core ({1000 / files_per_second_per_core:.1f} ms of CPU per file).")
+    for image_file_type, settings in TUNING_SETTINGS.items():
+        measurements = [measurement[image_file_type] for measurement in file_measurements if image_file_type in measurement]
+        if not measurements:
+            continue
+        format_results = results[image_file_type] = {
+            setting_name: {
+                "bytes": sum(measurement[setting_name][0] for measurement in measurements),
+                "cpu_time": sum(measurement[setting_name][1] for measurement in measurements) / len(measurements),
+            }
+            for setting_name in settings
+        }
+        pareto_front = get_pareto_front(format_results)
+        chosen_setting, fits_target = choose_setting(format_results, files_per_second_per_core)
+        encoder_profile[image_file_type] = get_tuning_options(image_file_type, settings[chosen_setting], base_profile)
+
+        print(f"\n{image_file_type} ({len(measurements)} files, * Pareto front, < chosen)")
+        print(f"{'Setting':>24} | {'CPU ms/file':>11} | {'Files/s/core':>12} | {'KB':>9}")
+        for setting_name, result in sorted(format_results.items(), key=lambda item: item[1]["cpu_time"]):
+            marks = ("*" if setting_name in pareto_front else " ") + ("<" if setting_name == chosen_setting else " ")
+            print(
+                f"{setting_name:>24} | {1000 * result['cpu_time']:>11.1f} | {1 / max(result['cpu_time'], 1e-9):>12.1f} | "
+                f"{result['bytes'] / 1024:>9.1f} {marks}"
+            )
+        if not fits_target:
+            print(f"No {image_file_type} setting reaches the throughput target, the fastest one was chosen.")
+    print("-" * 70)
+    return encoder_profile, results
+
+
+def save_encoder_profile(encoder_profile, encoder_profiles_file_path, profile_name=DEFAULT_TUNED_PROFILE_NAME):
+    """
+    This function adds an encoder profile to a JSON file of {name: profile}, which
+    image_encoder_profiles.load_encoder_profiles() reads, keeping the other profiles of the file.
+    """
+    # Time complexity : O(p), where p is the number of profiles in the file
+    encoder_profiles = {}
+    if os.path.isfile(encoder_profiles_file_path):
+        with open(encoder_profiles_file_path, encoding="utf-8") as encoder_profiles_file:
+            encoder_profiles = json.load(encoder_profiles_file)
+    encoder_profiles[profile_name] = encoder_profile
+    with open(encoder_profiles_file_path, "w", encoding="utf-8") as encoder_profiles_file:
+        json.dump(encoder_profiles, encoder_profiles_file, indent=4)
+
+
+if __name__ == "__main__":
+    # Usage : python image_encoder_tuning.py <corpus_dir> <files_per_second_per_core> [profiles_json_file] [sample_size]
+    if len(sys.argv) not in (3, 4, 5):
+        print("Usage : python image_encoder_tuning.py <corpus_dir> <files_per_second_per_core> [profiles_json_file] [sample_size]")
+        sys.exit(1)
+    TUNED_PROFILE, _ = tune_encoder_settings(
+        sys.argv[1],
+        float(sys.argv[2]),
+        int(sys.argv[4]) if len(sys.argv) == 5 else DEFAULT_TUNING_SAMPLE_SIZE,
+    )
+    if len(sys.argv) >= 4:
+        save_encoder_profile(TUNED_PROFILE, sys.argv[3])
+        print(f'Saved the "{DEFAULT_TUNED_PROFILE_NAME}" encoder profile to {sys.argv[3]}.')
+        print(f"Set {image_encoder_profiles.ENCODER_PROFILES_ENVIRONMENT_VARIABLE}={sys.argv[3]} to select it in image_compression.py and image_file_configurations.py.")
+    else:
+        print(json.dumps({DEFAULT_TUNED_PROFILE_NAME: TUNED_PROFILE}, indent=4))
@@ -118,4 +118,33 @@ configurations = {
         "conversion_extension": ".webp",
         "conversion_type": "WebP",
     },
+    # The following configurations encode with an encoder profile of image_encoder_profiles.py.
+    14: {
+        "conversion_title": "PNG to JPEG (progressive, for the web)",
+        "filetype": "*.png",
+        "conversion_extension": ".jpg",
+        "conversion_type": "JPEG",
+        "encoder_profile": "web",
+    },
+    15: {
+        "conversion_title": "JPEG to WebP (for the web)",
+        "filetype": "*.jpg;*.jpeg",
+        "conversion_extension": ".webp",
+        "conversion_type": "WebP",
+        "encoder_profile": "web",
+    },
+    16: {
+        "conversion_title": "PNG to WebP (near lossless)",
+        "filetype": "*.png",
+        "conversion_extension": ".webp",
+        "conversion_type": "WebP",
+        "encoder_profile": "near_lossless",
+    },
+    17: {
+        "conversion_title": "PNG to WebP (lossless)",
+        "filetype": "*.png",
+        "conversion_extension": ".webp",
+        "conversion_type": "WebP",
+        "encoder_profile": "lossless",
+    },
 }
@@ -0,0 +1,130 @@
+# pylint: disable=line-too-long
+"""System module."""
+import os  # USE CASE: Reading file sizes and modification times.
+import json  # USE CASE: Reading and writing the manifest file.
+import hashlib  # USE CASE: Hashing the content of input files.
+
+
+# The manifest is stored inside the output directory, next to the files it describes.
+MANIFEST_FILE_NAME = ".ifamms_manifest.json"
+
+
+def get_file_content_hash(file_path):
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Reads the file in chunks and returns its SHA-256 content hash. [Output Format > String]
+
+    """
+    # Time complexity : O(n), where n is the file size
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class ImageManifest:
+    """
+    This class creates a manifest object that requires the following parameters
+    to function:
+    --------------------------------------------------------------------------------
+    [1] Image Output Directory Path
+
+    It maps (source path, operation, operation parameters) to the source size,
+    modification time and content hash, and to the output file written for it.
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] is_up_to_date
+    [2] record
+    [3] save
+    """
+
+    def __init__(self, image_output_dir_path):
+        self.image_output_dir_path = image_output_dir_path
+        self.manifest_path = os.path.join(image_output_dir_path, MANIFEST_FILE_NAME)
+        self.entries = {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                self.entries = json.load(manifest_file)
+
+        # A missing or unreadable manifest simply means every file is processed again.
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def get_entry_key(image_input_file_path, operation, parameters):
+        """
+        This function returns the manifest key of a source file and an operation with its parameters.
+        """
+        # Time complexity : O(1)
+        return json.dumps(
+            [os.path.abspath(image_input_file_path), operation, parameters],
+            sort_keys=True,
+        )
+
+    def is_up_to_date(self, image_input_file_path, operation, parameters, output_path):
+        """
+        This function does the following tasks:
+        ---------------------------------------------
+
+        [1] Checks that this source and operation were already recorded, and that
+        the output file recorded for it is still there, untouched.
+        [2] Compares the size and modification time of the source, which is enough
+        for the vast majority of unchanged files.
+        [3] Only hashes the source when its size matches but its modification time
+        changed (e.g. the file was copied), so touched-but-identical files are skipped too.
+        [4] Returns True when the work can be skipped. [Output Format > Boolean]
+
+        """
+        # Time complexity : O(1), O(n) only when the source has to be hashed
+        entry = self.entries.get(
+            self.get_entry_key(image_input_file_path, operation, parameters)
+        )
+        if entry is None or entry["output"] != output_path:
+            return False
+
+        try:
+            source_stat = os.stat(image_input_file_path)
+            output_stat = os.stat(output_path)
+        except FileNotFoundError:
+            return False
+
+        if [output_stat.st_size, output_stat.st_mtime_ns] != entry["output_stat"]:
+            return False
+        if source_stat.st_size != entry["size"]:
+            return False
+        if source_stat.st_mtime_ns == entry["mtime"]:
+            return True
+        if get_file_content_hash(image_input_file_path) == entry["hash"]:
+            entry["mtime"] = source_stat.st_mtime_ns
+            return True
+        return False
+
+    def record(self, image_input_file_path, operation, parameters, output_path):
+        """
+        This function records a processed source file, its operation and the output it produced.
+        """
+        # Time complexity : O(n), where n is the size of the source file
+        source_stat = os.stat(image_input_file_path)
+        output_stat = os.stat(output_path)
+        self.entries[self.get_entry_key(image_input_file_path, operation, parameters)] = {
+            "size": source_stat.st_size,
+            "mtime": source_stat.st_mtime_ns,
+            "hash": get_file_content_hash(image_input_file_path),
+            "output": output_path,
+            "output_stat": [output_stat.st_size, output_stat.st_mtime_ns],
+        }
+
+    def save(self):
+        """
+        This function writes the manifest to the output directory.
+        The file is replaced atomically, so an interrupted run never leaves a broken manifest.
+        """
+        # Time complexity : O(n), where n is the number of entries
+        temporary_manifest_path = f"{self.manifest_path}.tmp"
+        with open(temporary_manifest_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.entries, manifest_file)
+        os.replace(temporary_manifest_path, self.manifest_path)
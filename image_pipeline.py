@@ -0,0 +1,133 @@
+# pylint: disable=line-too-long
+"""System module."""
+import os  # USE CASE: Read file names.
+from PIL import Image  # USE CASE: Decoding the image once for every operation in the pipeline.
+from PIL import UnidentifiedImageError  # USE CASE: Error handling for corrupted files.
+import image_file_configurations  # USE CASE: Contains all configurations for image_conversions.
+import image_conversion  # USE CASE: Alpha/palette normalization before a format conversion.
+import image_resizing  # USE CASE: Resampling shared with ImageResize.
+import image_encoder_profiles  # USE CASE: Encoding with the encoder profile of a conversion configuration, or of a compression.
+
+
+# The operations understood by the pipeline and the parameter each one expects :
+# ("convert", configuration_idx)  -> key of image_file_configurations.configurations
+# ("resize", (height, width))     -> same dimensions as returned by image_resizing.get_image_dimensions()
+# ("compress", quality)           -> same quality as returned by image_compression.get_compression_quality()
+PIPELINE_OPERATIONS = ("convert", "resize", "compress")
+
+
+class ImagePipeline:
+    """
+    This class creates an image object that requires the following parameters
+    to function:
+    --------------------------------------------------------------------------------
+    [1] Image Input File Path
+    [2] Image Output Directory Path
+    [3] Image File Name
+    [4] Operations (ordered list of (operation, parameter) tuples)
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] run_image_pipeline
+
+    Unlike running ImageConversion, ImageResize and ImageCompression one after another,
+    the image is decoded once, every operation is applied in memory and the result
+    is encoded once, so no intermediate files are written.
+    """
+
+    def __init__(
+        self,
+        image_input_file_path,
+        image_output_dir_path,
+        image_file_name,
+        operations,
+    ):
+        for operation, _ in operations:
+            if operation not in PIPELINE_OPERATIONS:
+                raise ValueError(f"Unknown pipeline operation : {operation}")
+
+        self.image_input_file_path = image_input_file_path
+        self.image_output_dir_path = image_output_dir_path
+        self.image_file_name = image_file_name
+        self.operations = operations
+
+    def run_image_pipeline(self):
+        """
+        This function does the following task:
+        -----------------------------------------------
+
+        [1] Decodes the input image file once.
+        [2] Applies every operation in order on the in-memory image.
+        [3] Saves the result once, in the format of the last conversion
+        (or the original format when no conversion is requested), with the encoder
+        profile of that conversion configuration when it has one, or with the default
+        encoder profile when a compression is requested (as ImageCompression does).
+        [4] Returns the output path. [Output Format > String]
+        """
+        # Time complexity : O(k), where k is the number of operations
+        image_file_stem, image_file_extension = os.path.splitext(self.image_file_name)
+
+        with Image.open(self.image_input_file_path) as img:
+            image_file_type = str(img.format)
+            compression_quality = None
+            encoder_profile = None
+
+            for operation, parameter in self.operations:
+                if operation == "convert":
+                    image_file_configuration = image_file_configurations.configurations[parameter]
+                    img = image_conversion.normalize_image(img)
+                    image_file_type = image_file_configuration["conversion_type"]
+                    image_file_extension = image_file_configuration["conversion_extension"]
+                    encoder_profile = image_file_configuration.get("encoder_profile")
+                elif operation == "resize":
+                    img = image_resizing.resize_image(img, image_resizing.get_fitted_image_size(img.size, parameter))
+                elif operation == "compress":
+                    compression_quality = parameter
+
+            output_path = f"{self.image_output_dir_path}/{image_file_stem}{image_file_extension}"
+            if encoder_profile is None and compression_quality is not None:
+                encoder_profile = image_encoder_profiles.DEFAULT_ENCODER_PROFILE
+            if encoder_profile is None:
+                img.save(output_path, image_file_type)
+            else:
+                image_encoder_profiles.save_image(
+                    img, output_path, image_file_type, encoder_profile, compression_quality
+                )
+            print("-" * 70)
+            print(f"Saved {self.image_file_name} to {output_path}.")
+            print("-" * 70)
+
+        return output_path
+
+
+def run_image_pipeline_on_files(image_input_file_paths, image_output_dir_path, operations):
+    """
+    This function does the following tasks :
+    --------------------------------------------------
+
+    [1] Uses a for loop to extract the path from the image input file path list.
+    [2] Uses the ImagePipeline class to run the operations on every file.
+    [3] Reports files that failed, without stopping the remaining files.
+
+    e.g. run_image_pipeline_on_files(paths, "out", [("convert", 13), ("resize", (400, 300)), ("compress", 50)])
+    """
+    # Time complexity : O(n)
+    for path in image_input_file_paths:
+        image_file_name = os.path.basename(path)
+        image_file = ImagePipeline(path, image_output_dir_path, image_file_name, operations)
+        try:
+            image_file.run_image_pipeline()
+
+        # This error is raised when file is corrupted.
+        except UnidentifiedImageError:
+            print("-" * 70)
+            print(f"\n\n{image_file_name} failed to convert.")
+            print("This could be because the file is corrupted.\n\n")
+            print("-" * 70)
+
+        # This error is raised when the input image file is modified or deleted while the program is running.
+        except FileNotFoundError:
+            print("-" * 70)
+            print(f"{image_file_name} failed to convert.")
+            print("This could be because the file was modified during conversion.")
+            print("-" * 70)
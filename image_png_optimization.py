@@ -0,0 +1,376 @@
+# pylint: disable=line-too-long
+"""System module."""
+import io  # USE CASE: Encoding the Pillow candidate in memory.
+import os  # USE CASE: Sizing the thread pool to the number of cores.
+import time  # USE CASE: Enforcing the time budget of an optimization.
+import zlib  # USE CASE: Compressing the filtered image data with several levels and strategies.
+import struct  # USE CASE: Writing the PNG chunk headers.
+from concurrent.futures import ThreadPoolExecutor  # USE CASE: Evaluating candidates in parallel (zlib and NumPy release the GIL).
+import numpy as np  # USE CASE: Filtering rows, reducing bit depths and counting colors.
+from PIL import Image  # USE CASE: Decoding the input and encoding the Pillow candidate.
+from PIL import PngImagePlugin  # USE CASE: Passing the color chunks to the Pillow candidate.
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color types.
+GRAYSCALE_COLOR_TYPE = 0
+RGB_COLOR_TYPE = 2
+PALETTE_COLOR_TYPE = 3
+GRAYSCALE_ALPHA_COLOR_TYPE = 4
+RGBA_COLOR_TYPE = 6
+PNG_COLOR_TYPE_NAMES = {
+    GRAYSCALE_COLOR_TYPE: "grayscale",
+    RGB_COLOR_TYPE: "RGB",
+    PALETTE_COLOR_TYPE: "palette",
+    GRAYSCALE_ALPHA_COLOR_TYPE: "grayscale + alpha",
+    RGBA_COLOR_TYPE: "RGBA",
+}
+
+# Row filters of the PNG format by their type byte, "adaptive" picks one per row.
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+PNG_FILTER_CHOICES = ("adaptive", "none", "paeth", "sub", "up", "average")
+
+# (level, strategy) of the zlib compressions tried for every filter choice, most often the smallest first.
+PNG_ZLIB_CONFIGURATIONS = (
+    (9, zlib.Z_FILTERED),
+    (9, zlib.Z_DEFAULT_STRATEGY),
+    (9, zlib.Z_RLE),
+    (6, zlib.Z_DEFAULT_STRATEGY),
+    (9, zlib.Z_HUFFMAN_ONLY),
+)
+
+# The color count is first checked on every COLOR_SAMPLE_STRIDE-th pixel, so photos skip the full count.
+COLOR_SAMPLE_STRIDE = 97
+
+
+def get_png_chunk(chunk_type, data):
+    """
+    This function returns a PNG chunk : length, type, data and CRC. [Output Format > Bytes]
+    """
+    # Time complexity : O(n), where n is the length of the data
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+
+def get_png_bit_depth(png_bytes):
+    """
+    This function returns the bit depth of the IHDR chunk of a PNG file (from its first 25 bytes at least),
+    or None when the bytes are not a PNG file. [Output Format > Integer]
+    """
+    # Time complexity : O(1)
+    if not png_bytes.startswith(PNG_SIGNATURE) or png_bytes[12:16] != b"IHDR" or len(png_bytes) < 25:
+        return None
+    return png_bytes[24]
+
+
+def is_kept_as_is(img, png_bytes):
+    """
+    This function returns whether optimize_png() keeps a PNG file as it is, given the opened image
+    and the bytes of the file (its first 25 bytes at least). [Output Format > Boolean]
+    - Animated files : the candidates only hold the first frame.
+    - Above 8 bits per sample : Pillow decodes 16 bit RGB, RGBA and LA files to 8 bit modes,
+      so the candidates built from the decoded image would lose the low bits.
+    """
+    # Time complexity : O(1)
+    return getattr(img, "is_animated", False) or (get_png_bit_depth(png_bytes) or 0) > 8
+
+
+def pack_low_bit_depth_rows(samples, bit_depth):
+    """
+    This function packs rows of samples (below 2 ** bit_depth) into bytes, most significant bits first,
+    as PNG stores 1, 2 and 4 bit images. [Output Format > NumPy Array]
+    """
+    # Time complexity : O(n), where n is the number of samples
+    samples_per_byte = 8 // bit_depth
+    height, width = samples.shape
+    padded_samples = np.zeros((height, -(-width // samples_per_byte) * samples_per_byte), dtype="uint8")
+    padded_samples[:, :width] = samples
+    padded_samples = padded_samples.reshape(height, -1, samples_per_byte)
+    packed_rows = np.zeros(padded_samples.shape[:2], dtype="uint8")
+    for index in range(samples_per_byte):
+        packed_rows |= padded_samples[:, :, index] << (8 - bit_depth * (index + 1))
+    return packed_rows
+
+
+def get_png_representations(img):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Converts the image to RGBA, LA, RGB or L pixels without losing anything
+    (a transparent color key becomes an alpha channel).
+    [2] Drops the alpha channel when every pixel is opaque, and the color channels when every pixel is gray.
+    [3] Reduces grayscale images to 1, 2 or 4 bits when every value is a multiple of the lower bit depth.
+    [4] Builds an exact palette (with 1, 2, 4 or 8 bit indices) when there are 256 colors or less.
+    [5] Returns every exact representation as {"rows": uint8 array of packed rows, "bytes_per_pixel",
+    "bit_depth", "color_type", "palette", "transparency"}. [Output Format > List]
+
+    """
+    # Time complexity : O(n log n), where n is the number of pixels
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    is_gray = img.mode in ("1", "L", "LA") and "transparency" not in img.info
+    pixels = np.asarray(img.convert(("LA" if has_alpha else "L") if is_gray else ("RGBA" if has_alpha else "RGB")))
+    pixels = pixels.reshape(img.height, img.width, -1)
+
+    if has_alpha and np.all(pixels[:, :, -1] == 255):
+        has_alpha = False
+        pixels = pixels[:, :, :-1]
+    if not is_gray and np.all(pixels[:, :, 0] == pixels[:, :, 1]) and np.all(pixels[:, :, 1] == pixels[:, :, 2]):
+        is_gray = True
+        pixels = pixels[:, :, [0, 3]] if has_alpha else pixels[:, :, :1]
+
+    bands = pixels.shape[2]
+    color_type = {
+        (True, False): GRAYSCALE_COLOR_TYPE,
+        (True, True): GRAYSCALE_ALPHA_COLOR_TYPE,
+        (False, False): RGB_COLOR_TYPE,
+        (False, True): RGBA_COLOR_TYPE,
+    }[(is_gray, has_alpha)]
+
+    representations = []
+    # Gray images always have 256 values or less, a palette only helps when it needs fewer bits per pixel.
+    needs_palette = True
+    if color_type == GRAYSCALE_COLOR_TYPE:
+        values = np.flatnonzero(np.bincount(pixels.ravel(), minlength=256))
+        bit_depth = next(depth for depth in (1, 2, 4, 8) if np.all(values % (255 // (2 ** depth - 1)) == 0))
+        needs_palette = bit_depth == 8 and len(values) <= 16
+        if bit_depth < 8:
+            samples = pixels[:, :, 0] // (255 // (2 ** bit_depth - 1))
+            representations.append(
+                {"rows": pack_low_bit_depth_rows(samples, bit_depth), "bytes_per_pixel": 1, "bit_depth": bit_depth, "color_type": color_type}
+            )
+    representations.append(
+        {"rows": pixels.reshape(img.height, -1), "bytes_per_pixel": bands, "bit_depth": 8, "color_type": color_type}
+    )
+
+    # An exact palette, when the image has 256 colors or less.
+    if needs_palette:
+        packed_pixels = np.zeros(pixels.shape[:2], dtype="uint32")
+        for band in range(bands):
+            packed_pixels = (packed_pixels << 8) | pixels[:, :, band]
+        if len(np.unique(packed_pixels.ravel()[::COLOR_SAMPLE_STRIDE])) <= 256:
+            colors, indices = np.unique(packed_pixels.ravel(), return_inverse=True)
+            if len(colors) <= 256:
+                color_values = np.stack([(colors >> (8 * (bands - 1 - band))) & 255 for band in range(bands)], axis=1).astype("uint8")
+                if is_gray:
+                    color_values = np.concatenate([np.repeat(color_values[:, :1], 3, axis=1), color_values[:, 1:]], axis=1)
+                # Transparent colors come first, so the tRNS chunk stops at the last of them.
+                alpha = color_values[:, 3] if has_alpha else np.full(len(colors), 255, dtype="uint8")
+                order = np.argsort(alpha == 255, kind="stable")
+                color_values, alpha = color_values[order], alpha[order]
+                indices = np.argsort(order)[indices].reshape(pixels.shape[:2]).astype("uint8")
+                bit_depth = next(depth for depth in (1, 2, 4, 8) if len(colors) <= 2 ** depth)
+                rows = pack_low_bit_depth_rows(indices, bit_depth) if bit_depth < 8 else indices
+                number_of_transparent_colors = int(np.count_nonzero(alpha < 255))
+                representations.append(
+                    {
+                        "rows": rows,
+                        "bytes_per_pixel": 1,
+                        "bit_depth": bit_depth,
+                        "color_type": PALETTE_COLOR_TYPE,
+                        "palette": color_values[:, :3].tobytes(),
+                        "transparency": alpha[:number_of_transparent_colors].tobytes(),
+                    }
+                )
+    return representations
+
+
+def filter_png_rows(rows, bytes_per_pixel, filter_choice):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Applies the PNG row filter to every row at once : the predictors only use the unfiltered
+    bytes, so no row depends on the result of the previous one.
+    [2] For "adaptive", keeps for every row the filter with the smallest sum of absolute (signed) values.
+    [3] Returns the filtered rows, each prefixed with its filter type byte. [Output Format > Bytes]
+
+    """
+    # Time complexity : O(n), where n is the number of bytes of the image
+    rows = rows.astype("int16")
+    left = np.zeros_like(rows)
+    left[:, bytes_per_pixel:] = rows[:, :-bytes_per_pixel]
+    up = np.zeros_like(rows)
+    up[1:] = rows[:-1]
+    up_left = np.zeros_like(rows)
+    up_left[1:, bytes_per_pixel:] = rows[:-1, :-bytes_per_pixel]
+
+    def get_filtered_rows(filter_name):
+        if filter_name == "none":
+            return rows
+        if filter_name == "sub":
+            return rows - left
+        if filter_name == "up":
+            return rows - up
+        if filter_name == "average":
+            return rows - (left + up) // 2
+        estimate = left + up - up_left
+        left_distance, up_distance, up_left_distance = np.abs(estimate - left), np.abs(estimate - up), np.abs(estimate - up_left)
+        predictor = np.where(
+            (left_distance <= up_distance) & (left_distance <= up_left_distance),
+            left,
+            np.where(up_distance <= up_left_distance, up, up_left),
+        )
+        return rows - predictor
+
+    if filter_choice == "adaptive":
+        filter_names = list(PNG_FILTERS)
+        candidate_rows = np.stack([(get_filtered_rows(filter_name) & 255).astype("uint8") for filter_name in filter_names])
+        row_costs = np.abs(candidate_rows.view("int8").astype("int32")).sum(axis=2)
+        row_filters = row_costs.argmin(axis=0)
+        filtered_rows = candidate_rows[row_filters, np.arange(len(rows))]
+        filter_types = np.array([PNG_FILTERS[filter_name] for filter_name in filter_names], dtype="uint8")[row_filters]
+    else:
+        filtered_rows = (get_filtered_rows(filter_choice) & 255).astype("uint8")
+        filter_types = np.full(len(rows), PNG_FILTERS[filter_choice], dtype="uint8")
+    return np.concatenate([filter_types[:, None], filtered_rows], axis=1).tobytes()
+
+
+def get_png_color_chunks(img):
+    """
+    This function returns the gAMA, cHRM and sRGB chunks of the source, as decoded by Pillow into img.info,
+    in the form (chunk type, chunk data). [Output Format > List]
+    They change how the colors are rendered, so dropping them would not be lossless.
+    """
+    # Time complexity : O(1)
+    color_chunks = []
+    if img.info.get("gamma") is not None:
+        color_chunks.append((b"gAMA", struct.pack(">I", round(img.info["gamma"] * 100000))))
+    if img.info.get("chromaticity") is not None:
+        color_chunks.append((b"cHRM", struct.pack(">8I", *(round(value * 100000) for value in img.info["chromaticity"]))))
+    if img.info.get("srgb") is not None:
+        color_chunks.append((b"sRGB", struct.pack(">B", img.info["srgb"])))
+    return color_chunks
+
+
+def get_png_file_bytes(img, representation, image_data, icc_profile=None, color_chunks=()):
+    """
+    This function returns the bytes of a PNG file from a representation (see get_png_representations())
+    and its compressed image data, with the color chunks (see get_png_color_chunks()), the ICC profile
+    and the resolution of the source if any. [Output Format > Bytes]
+    """
+    # Time complexity : O(n), where n is the length of the image data
+    chunks = [
+        get_png_chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", img.width, img.height, representation["bit_depth"], representation["color_type"], 0, 0, 0),
+        )
+    ]
+    chunks.extend(get_png_chunk(chunk_type, data) for chunk_type, data in color_chunks)
+    if icc_profile:
+        chunks.append(get_png_chunk(b"iCCP", b"ICC profile\x00\x00" + zlib.compress(icc_profile, 9)))
+    if img.info.get("dpi"):
+        # Pillow decodes pHYs in pixels per meter to dots per inch.
+        chunks.append(get_png_chunk(b"pHYs", struct.pack(">IIB", *(int(dpi / 0.0254 + 0.5) for dpi in img.info["dpi"]), 1)))
+    if representation["color_type"] == PALETTE_COLOR_TYPE:
+        chunks.append(get_png_chunk(b"PLTE", representation["palette"]))
+        if representation["transparency"]:
+            chunks.append(get_png_chunk(b"tRNS", representation["transparency"]))
+    chunks.append(get_png_chunk(b"IDAT", image_data))
+    chunks.append(get_png_chunk(b"IEND", b""))
+    return PNG_SIGNATURE + b"".join(chunks)
+
+
+def optimize_png_image(img, time_budget=None, workers=None, start=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Builds the exact representations of an already decoded image (see get_png_representations()) :
+    reduced bit depth, no unused alpha or color channels, a palette for 256 colors or less.
+    [2] Evaluates every representation x filter choice (see PNG_FILTER_CHOICES) x zlib level and strategy
+    (see PNG_ZLIB_CONFIGURATIONS) in memory, on a thread pool.
+    [3] Stops starting candidates once time_budget (in seconds, counted from "start", now by default) is spent,
+    the first one always runs. The budget can be exceeded by the compressions already running,
+    one per worker (one per core by default).
+    [4] Returns the smallest of these, with the name of the candidate. [Output Format > Tuple]
+    Modes without an 8 bit representation (16 bit, 32 bit integer or float) and animated images
+    are encoded by Pillow with optimize=True instead, with every frame.
+
+    Every candidate decodes to the same pixels as the decoded image, only the representation changes.
+    Pillow decodes 16 bit RGB, RGBA and LA files to 8 bit modes, so optimize_png() keeps those files
+    as they are instead of passing them here (see is_kept_as_is()).
+    """
+    # Time complexity : O(r * f * z * n), where n is the number of pixels
+    start = time.perf_counter() if start is None else start
+    candidates = {}
+    icc_profile = img.info.get("icc_profile")
+    color_chunks = get_png_color_chunks(img)
+    representations = []
+    if img.mode in ("1", "L", "LA", "P", "PA", "RGB", "RGBA") and not getattr(img, "is_animated", False):
+        representations = get_png_representations(img)
+    else:
+        pnginfo = PngImagePlugin.PngInfo()
+        for chunk_type, data in color_chunks:
+            pnginfo.add(chunk_type, data)
+        buffer = io.BytesIO()
+        img.save(
+            buffer,
+            "PNG",
+            optimize=True,
+            icc_profile=icc_profile,
+            pnginfo=pnginfo,
+            save_all=getattr(img, "is_animated", False),
+            **({"dpi": img.info["dpi"]} if img.info.get("dpi") else {}),
+        )
+        candidates["pillow"] = buffer.getvalue()
+    tasks = [
+        (representation, filter_choice)
+        for representation in representations
+        # Low bit depth and palette rows rarely gain from filters, the usual ones are tried first there.
+        for filter_choice in (("none", "adaptive") if representation["bytes_per_pixel"] == 1 and representation["bit_depth"] < 8 else PNG_FILTER_CHOICES)
+    ]
+
+    def evaluate_task(task_index):
+        # Only the smallest encoding of every task is kept, so memory does not grow with the number of candidates.
+        representation, filter_choice = tasks[task_index]
+        smallest_candidate = {}
+        if task_index and time_budget is not None and time.perf_counter() - start > time_budget:
+            return smallest_candidate
+        filtered_rows = filter_png_rows(representation["rows"], representation["bytes_per_pixel"], filter_choice)
+        smallest_image_data = None
+        name = None
+        for configuration_index, (level, strategy) in enumerate(PNG_ZLIB_CONFIGURATIONS):
+            if configuration_index and time_budget is not None and time.perf_counter() - start > time_budget:
+                break
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+            image_data = compressor.compress(filtered_rows) + compressor.flush()
+            if smallest_image_data is None or len(image_data) < len(smallest_image_data):
+                smallest_image_data = image_data
+                name = f"{PNG_COLOR_TYPE_NAMES[representation['color_type']]} {representation['bit_depth']} bit, {filter_choice} filter, zlib level {level} strategy {strategy}"
+        smallest_candidate[name] = get_png_file_bytes(img, representation, smallest_image_data, icc_profile, color_chunks)
+        return smallest_candidate
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for smallest_candidate in executor.map(evaluate_task, range(len(tasks))):
+            candidates.update(smallest_candidate)
+
+    best_candidate = min(candidates, key=lambda name: len(candidates[name]))
+    return best_candidate, candidates[best_candidate]
+
+
+def optimize_png(image_input_file_path, time_budget=None, workers=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Decodes the PNG file once and optimizes it within time_budget (see optimize_png_image()),
+    the time spent reading and decoding the file counts towards the budget.
+    [2] Returns the smallest of the candidates and of the input file itself, with the name of the candidate. [Output Format > Tuple]
+    Animated and 16 bit PNG files are returned as they are (see is_kept_as_is()).
+
+    """
+    # Time complexity : O(r * f * z * n), where n is the number of pixels
+    start = time.perf_counter()
+    with open(image_input_file_path, "rb") as input_file:
+        original_png_bytes = input_file.read()
+
+    with Image.open(image_input_file_path) as img:
+        if is_kept_as_is(img, original_png_bytes):
+            return "original", original_png_bytes
+        img.load()
+        best_candidate, png_bytes = optimize_png_image(img, time_budget, workers, start)
+
+    if len(original_png_bytes) <= len(png_bytes):
+        return "original", original_png_bytes
+    return best_candidate, png_bytes
@@ -1,14 +1,41 @@
 # pylint: disable=line-too-long
+# pylint: disable=E1101
 """System Module"""
 import sys  # USE CASE: Forcefully exiting the program while in use.
 import tkinter as tk  # USE CASE: GUI for users preferred I/O Paths.
 from tkinter import filedialog  # USE CASE: GUI for users preferred I/O Paths.
 import os  # USE CASE: Read file names.
+import io  # USE CASE: Decoding single strips of compressed TIFF files in memory.
+import tempfile  # USE CASE: Scratch files for the tiled resize engine.
+import struct  # USE CASE: Skipping formats whose headers do not parse when opening huge images.
+import tracemalloc  # USE CASE: Measuring the peak memory of the tiled resize engine.
+from concurrent.futures import ThreadPoolExecutor  # USE CASE: Writing the responsive sizes in parallel.
 from PIL import Image  # USE CASE: Performing image conversions for majority formats.
 from PIL import UnidentifiedImageError  # USE CASE: Error handling for corrupted files.
+from PIL import TiffImagePlugin  # USE CASE: Wrapping single strips of compressed TIFF files for libtiff.
+from PIL import TiffTags  # USE CASE: Tag types of the single strip TIFF files.
+import numpy as np  # USE CASE: Resampling strips of pixels in the tiled resize engine.
+import image_manifest  # USE CASE: Skipping unchanged files on incremental re-runs.
+import image_cache  # USE CASE: Serving repeated requests from the content-addressed result cache.
 
-root = tk.Tk()
-root.withdraw()
+# The tkinter root is only created once a file dialog is opened, so headless runs never need a display.
+root = None
+
+
+def get_gui_root():
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Creates the hidden tkinter root window on first use and returns it.
+
+    """
+    # Time complexity : O(1)
+    global root  # pylint: disable=global-statement
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+    return root
 
 
 def validate_input(func):
@@ -47,9 +74,11 @@ Width (in pixels) : """
                 ).strip()
             )
 
-            if image_height == 0 or image_width == 0:
+            # A single 0 keeps the aspect ratio of every image (fit by the other dimension).
+            if image_height == 0 and image_width == 0:
                 print(header)
-                print("Warning : Height or Width can not be 0")
+                print("Warning : Height and Width can not both be 0")
+                print("Enter 0 for only one of them to keep the aspect ratio.")
                 print(header)
                 return user_preferred_image_dimensions_input()
 
@@ -78,6 +107,7 @@ def get_image_dimensions(image_dimensions=None):
     This function does the following task:
     --------------------------------------------
     It reads the user's preferred image width and image height.
+    Either of them can be 0 to keep the aspect ratio (see get_fitted_image_size()).
     """
     # Time complexity : O(1)
     return image_dimensions
@@ -106,6 +136,7 @@ def open_gui_for_individual_file_paths():
     ]
 
     filetypes_displayed_in_gui = (("Image Files", filetypes),)
+    get_gui_root()
     image_input_file_paths = list(
         filedialog.askopenfilenames(
             title="Select Image File/Files", filetypes=filetypes_displayed_in_gui
@@ -131,6 +162,7 @@ def open_gui_for_output_directory_path():
 
     """
     # Time complexity : O(1)
+    get_gui_root()
     output_image_directory_path = filedialog.askdirectory(title="Save To")
 
     # The following code checks if the user selected an output path,
@@ -150,6 +182,609 @@ def open_gui_for_output_directory_path():
     return pictures_folder
 
 
+# Shrink-on-load stops at this multiple of the target size, so the final LANCZOS resample
+# still has enough source pixels for a result that is visually identical to a full decode.
+DEFAULT_REDUCING_GAP = 3.0
+
+
+def shrink_image_on_load(img, img_size, reducing_gap=DEFAULT_REDUCING_GAP):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    [1] For a JPEG that is not decoded yet, asks the decoder for DCT scaling (1/2, 1/4 or 1/8),
+    so the full resolution image is never decoded when the target is far smaller.
+
+    It never shrinks below reducing_gap times the target size, and is a no-op for
+    already decoded images, other formats and upscales. [Output Format > PIL Image]
+    """
+    # Time complexity : O(1)
+    if reducing_gap and img.format == "JPEG":
+        img.draft(img.mode, (int(img_size[0] * reducing_gap), int(img_size[1] * reducing_gap)))
+    return img
+
+
+def get_fitted_image_size(source_size, image_dimensions):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    Converts the (height, width) returned by get_image_dimensions() into the (width, height) size used by Pillow,
+    for an image of source_size (width, height). A height or width of 0 is computed from the other
+    one, keeping the aspect ratio of the source. [Output Format > Tuple]
+
+    e.g. get_fitted_image_size((6000, 4000), (0, 400)) -> (400, 267)
+    """
+    # Time complexity : O(1)
+    source_width, source_height = source_size
+    image_height, image_width = image_dimensions
+    if not image_width:
+        image_width = max(1, round(source_width * image_height / source_height))
+    if not image_height:
+        image_height = max(1, round(source_height * image_width / source_width))
+    return (image_width, image_height)
+
+
+# Filters of every resize backend. OpenCV filters are named by their cv2 constant,
+# so cv2 is only imported once the OpenCV backend is used.
+RESIZE_FILTERS = {
+    "pillow": {
+        "lanczos": Image.Resampling.LANCZOS,
+        "bicubic": Image.Resampling.BICUBIC,
+        "box": Image.Resampling.BOX,
+    },
+    "opencv": {
+        "area": "INTER_AREA",
+        "lanczos4": "INTER_LANCZOS4",
+        "cubic": "INTER_CUBIC",
+    },
+}
+
+# Filter used by every backend when none is given : (downscaling filter, upscaling filter).
+DEFAULT_RESIZE_FILTERS = {
+    "pillow": ("lanczos", "lanczos"),
+    "opencv": ("area", "lanczos4"),
+}
+
+# Image modes resized by OpenCV, the others (palette, 16 bit, CMYK, ...) always use Pillow.
+OPENCV_RESIZE_MODES = ("L", "LA", "RGB", "RGBA")
+
+# Image modes that Image.frombuffer() shares with a NumPy array instead of copying it.
+SHARED_BUFFER_MODES = ("L", "RGBA")
+
+# Setting IFAMMS_RESIZE_BACKEND selects the resize backend of every process.
+RESIZE_BACKEND_ENVIRONMENT_VARIABLE = "IFAMMS_RESIZE_BACKEND"
+resize_backend = os.environ.get(RESIZE_BACKEND_ENVIRONMENT_VARIABLE, "pillow")
+
+
+def set_resize_backend(backend, threads=None):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    [1] Selects the resize backend ("pillow" or "opencv") used by resize_image() in this process.
+    [2] For OpenCV, sets the number of threads of its internal thread pool when given
+    (by default, OpenCV uses every core; use 1 in process pools to avoid oversubscription).
+    """
+    # Time complexity : O(1)
+    global resize_backend  # pylint: disable=global-statement
+    if backend not in RESIZE_FILTERS:
+        raise ValueError(f"Unknown resize backend {backend}, expected one of {sorted(RESIZE_FILTERS)}.")
+    resize_backend = backend
+    if backend == "opencv" and threads is not None:
+        import cv2  # pylint: disable=import-outside-toplevel
+
+        cv2.setNumThreads(threads)
+
+
+def get_resize_filter(backend, source_size, img_size, resize_filter=None):
+    """
+    This function returns the name of the filter of the backend for a resize from source_size
+    to img_size : the given one, or the default downscaling or upscaling filter. [Output Format > String]
+    """
+    # Time complexity : O(1)
+    if resize_filter is None:
+        downscaling_filter, upscaling_filter = DEFAULT_RESIZE_FILTERS[backend]
+        is_downscale = img_size[0] <= source_size[0] and img_size[1] <= source_size[1]
+        resize_filter = downscaling_filter if is_downscale else upscaling_filter
+    if resize_filter not in RESIZE_FILTERS[backend]:
+        raise ValueError(f"Unknown {backend} filter {resize_filter}, expected one of {sorted(RESIZE_FILTERS[backend])}.")
+    return resize_filter
+
+
+def resize_image_with_opencv(img, img_size, resize_filter):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    Resizes an image with cv2.resize(), which runs on OpenCV's internal thread pool.
+    The pixels are not converted between RGB and BGR, as resizing treats every channel the same way,
+    so the only copy going in is NumPy's view of the Pillow image, and the result is shared with
+    the output image without a copy for "L" and "RGBA" images. [Output Format > PIL Image]
+    """
+    # Time complexity : O(n), where n is the number of pixels
+    import cv2  # pylint: disable=import-outside-toplevel
+
+    pixels = np.asarray(img)
+    resized_pixels = cv2.resize(pixels, img_size, interpolation=getattr(cv2, RESIZE_FILTERS["opencv"][resize_filter]))
+    if img.mode in SHARED_BUFFER_MODES:
+        return Image.frombuffer(img.mode, img_size, resized_pixels, "raw", img.mode, 0, 1)
+    return Image.fromarray(resized_pixels)
+
+
+def resize_image(img, img_size, reducing_gap=DEFAULT_REDUCING_GAP, backend=None, resize_filter=None):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    It resizes an image to the given size, with LANCZOS resampling by default.
+    This is shared by ImageResize and the single-decode image pipeline.
+
+    For large downscales the image is first shrunk during decode (see shrink_image_on_load()),
+    then with Image.reduce() down to reducing_gap times the target size, before the final LANCZOS resample.
+    reducing_gap=None resizes the full resolution image directly.
+
+    backend is "pillow" or "opencv" (by default the one selected with set_resize_backend()),
+    resize_filter a key of RESIZE_FILTERS[backend] (by default, see DEFAULT_RESIZE_FILTERS).
+    """
+    # Time complexity : O(1)
+    backend = backend or resize_backend
+    img = shrink_image_on_load(img, img_size, reducing_gap)
+    if backend == "opencv" and img.mode in OPENCV_RESIZE_MODES:
+        return resize_image_with_opencv(img, img_size, get_resize_filter("opencv", img.size, img_size, resize_filter))
+    if backend == "opencv":
+        backend, resize_filter = "pillow", None
+    resize_filter = get_resize_filter(backend, img.size, img_size, resize_filter)
+    return img.resize(img_size, RESIZE_FILTERS["pillow"][resize_filter], reducing_gap=reducing_gap)
+
+
+# Memory budget of the tiled resize engine, in bytes.
+DEFAULT_RESIZE_MEMORY_BUDGET = 256 * 1024 ** 2
+
+# Working memory of the first pass per source row, in bytes per sample : the strip read from the file,
+# its float32 copy and the row/column block sums.
+TILED_SOURCE_BYTES_PER_SAMPLE = 13
+
+# Working memory of the resampling passes per output row, in bytes per sample : the gathered float32 rows,
+# the weighted copy and the accumulator.
+TILED_OUTPUT_BYTES_PER_SAMPLE = 12
+
+# Uncompressed pixel layouts that are read straight from the file, strip by strip, and the number of bands of each.
+RAW_STRIP_MODES = {"L": 1, "RGB": 3, "BGR": 3, "RGBA": 4}
+
+# TIFF tags copied into the single strip TIFF files decoded by get_tiff_strip_reader() : BitsPerSample, Compression,
+# PhotometricInterpretation, FillOrder, SamplesPerPixel, PlanarConfiguration, Predictor, ExtraSamples, SampleFormat,
+# JPEGTables, YCbCrSubSampling, YCbCrPositioning and ReferenceBlackWhite.
+TIFF_STRIP_COPIED_TAGS = (258, 259, 262, 266, 277, 284, 317, 338, 339, 347, 530, 531, 532)
+
+
+def get_lanczos_weights(input_size, output_size, box_size):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    Returns the input indices and the normalized weights of the antialiased Lanczos (a = 3) filter
+    used by Pillow, for resampling box_size input pixels (starting at 0) to output_size pixels.
+    Both have the shape (output_size, taps), indices past the end of a window have a weight of 0. [Output Format > Tuple]
+    """
+    # Time complexity : O(output_size * taps)
+    scale = box_size / output_size
+    filter_scale = max(scale, 1.0)
+    support = 3.0 * filter_scale
+    centers = (np.arange(output_size) + 0.5) * scale
+    first_indices = np.maximum((centers - support + 0.5).astype(int), 0)
+    last_indices = np.minimum((centers + support + 0.5).astype(int), input_size)
+    taps = int((last_indices - first_indices).max())
+
+    indices = first_indices[:, None] + np.arange(taps)[None, :]
+    distances = (indices - centers[:, None] + 0.5) / filter_scale
+    weights = np.sinc(distances) * np.sinc(distances / 3.0) * (np.abs(distances) < 3.0)
+    weights[indices >= last_indices[:, None]] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return np.minimum(indices, input_size - 1), weights.astype("float32")
+
+
+def get_raw_strip_reader(img):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    For uncompressed files (PPM, BMP, uncompressed TIFF), returns a function reading the rows [start, end)
+    of the image straight from the file, with a memory map of those rows only. [Output Format > Function]
+
+    Returns None for every other file, which has to be decoded whole.
+    """
+    # Time complexity : O(k), where k is the number of strips in the file
+    strips = []
+    for codec_name, extents, offset, args in img.tile:
+        args = (args,) if isinstance(args, str) else tuple(args)
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+        if (
+            codec_name != "raw"
+            or rawmode not in RAW_STRIP_MODES
+            or RAW_STRIP_MODES[rawmode] != len(img.mode)
+            or extents[0] != 0
+            or extents[2] != img.width
+        ):
+            return None
+        strips.append((extents[1], extents[3], offset, stride or img.width * len(img.mode), orientation, rawmode))
+
+    if not strips or img.mode not in ("L", "RGB", "RGBA"):
+        return None
+    image_input_file_path = img.filename
+    bands = len(img.mode)
+
+    def read_rows(start, end):
+        rows = []
+        for top, bottom, offset, stride, orientation, rawmode in strips:
+            if top >= end or bottom <= start:
+                continue
+            first_row, last_row = max(start, top) - top, min(end, bottom) - top
+            # Bottom-up files (BMP) store the last row first.
+            if orientation < 0:
+                first_row, last_row = bottom - top - last_row, bottom - top - first_row
+            data = np.memmap(
+                image_input_file_path,
+                dtype="uint8",
+                mode="r",
+                offset=offset + first_row * stride,
+                shape=(last_row - first_row, stride),
+            )[:, : img.width * bands].reshape(last_row - first_row, img.width, bands)
+            if orientation < 0:
+                data = data[::-1]
+            if rawmode == "BGR":
+                data = data[..., ::-1]
+            rows.append(np.array(data))
+        return np.concatenate(rows)
+
+    return read_rows
+
+
+def get_single_strip_tiff(img, width, height, strip_data):
+    """
+    This function returns the bytes of a TIFF file holding one compressed strip (or tile) of a TIFF image,
+    width x height pixels, with the compression and pixel layout tags of the image. [Output Format > Bytes]
+    """
+    # Time complexity : O(s), where s is the size of the strip
+    ifd = TiffImagePlugin.ImageFileDirectory_v2()
+    for tag in TIFF_STRIP_COPIED_TAGS:
+        if tag in img.tag_v2:
+            ifd[tag] = img.tag_v2[tag]
+            ifd.tagtype[tag] = img.tag_v2.tagtype[tag]
+    # ImageWidth, ImageLength, StripOffsets, RowsPerStrip and StripByteCounts, as LONG values.
+    for tag, value in ((256, width), (257, height), (273, 0), (278, height), (279, len(strip_data))):
+        ifd[tag] = value
+        ifd.tagtype[tag] = TiffTags.LONG
+    # tobytes() points StripOffsets past the directory and its data, where the strip follows.
+    return b"II*\x00" + struct.pack("<I", 8) + ifd.tobytes(8) + strip_data
+
+
+def get_tiff_strip_reader(img):
+    """
+    This function does the following task:
+    ----------------------------------------------
+
+    For compressed 8 bit TIFF files (LZW, Deflate, PackBits, JPEG...) organized in strips or tiles, returns
+    a function reading the rows [start, end) of the image, and the size in bytes of one decoded strip
+    (or row of tiles). [Output Format > Tuple]
+    Every strip is wrapped into a single strip TIFF file in memory (see get_single_strip_tiff()) and decoded
+    by libtiff on its own, as Pillow only decodes compressed TIFF files whole. The last strip read is kept,
+    as consecutive reads usually share one.
+
+    Returns None for every other file.
+    """
+    # Time complexity : O(k), where k is the number of strips in the file
+    if (
+        img.format != "TIFF"
+        or img.mode not in ("L", "RGB", "RGBA")
+        or img.tag_v2.get(284, 1) != 1
+        or any(bits != 8 for bits in img.tag_v2.get(258, (8,)))
+    ):
+        return None
+    width, height = img.size
+    if 324 in img.tag_v2 and 325 in img.tag_v2:
+        # Tiled : one row of tiles at a time, tiles are stored left to right then top to bottom.
+        chunk_width, chunk_height = img.tag_v2[322], img.tag_v2[323]
+        chunks_per_row = -(-width // chunk_width)
+        offsets, byte_counts = img.tag_v2[324], img.tag_v2[325]
+    elif 273 in img.tag_v2 and 279 in img.tag_v2:
+        chunk_width, chunk_height = width, min(height, img.tag_v2.get(278, height))
+        chunks_per_row = 1
+        offsets, byte_counts = img.tag_v2[273], img.tag_v2[279]
+    else:
+        return None
+    if len(offsets) < chunks_per_row * -(-height // chunk_height):
+        return None
+    image_input_file_path = img.filename
+    bands = len(img.mode)
+    last_chunk = {}
+
+    def read_chunk_row(chunk_row):
+        if chunk_row not in last_chunk:
+            last_chunk.clear()
+            top = chunk_row * chunk_height
+            # Strips hold their own rows only, tiles are always whole (and cropped here).
+            rows_in_chunk = chunk_height if chunks_per_row > 1 else min(chunk_height, height - top)
+            tiles = []
+            with open(image_input_file_path, "rb") as image_file:
+                for chunk in range(chunk_row * chunks_per_row, (chunk_row + 1) * chunks_per_row):
+                    image_file.seek(offsets[chunk])
+                    strip_data = image_file.read(byte_counts[chunk])
+                    with Image.open(io.BytesIO(get_single_strip_tiff(img, chunk_width, rows_in_chunk, strip_data))) as strip_img:
+                        tiles.append(np.asarray(strip_img.convert(img.mode) if strip_img.mode != img.mode else strip_img))
+            rows = np.concatenate(tiles, axis=1) if len(tiles) > 1 else tiles[0]
+            last_chunk[chunk_row] = rows[: min(height, top + chunk_height) - top, :width].reshape(-1, width, bands)
+        return last_chunk[chunk_row]
+
+    def read_rows(start, end):
+        rows = []
+        for chunk_row in range(start // chunk_height, (end - 1) // chunk_height + 1):
+            top = chunk_row * chunk_height
+            chunk_rows = read_chunk_row(chunk_row)
+            rows.append(chunk_rows[max(start, top) - top : min(end, top + len(chunk_rows)) - top])
+        return np.concatenate(rows)
+
+    return read_rows, chunks_per_row * chunk_width * chunk_height * bands
+
+
+class ScratchRows:
+    """
+    This class holds the rows of an intermediate float32 image of the tiled resize engine, in memory
+    or, when it is larger than the memory available for it, in a temporary file that is only
+    memory mapped for the rows being written or read.
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] write_rows
+    [2] read_rows
+    [3] close
+    """
+
+    def __init__(self, number_of_rows, row_shape, in_memory, scratch_dir_path=None):
+        self.row_shape = tuple(row_shape)
+        self.row_bytes = int(np.prod(self.row_shape)) * 4
+        self.rows = None
+        self.scratch_file = None
+        if in_memory:
+            self.rows = np.empty((number_of_rows,) + self.row_shape, dtype="float32")
+        else:
+            self.scratch_file = tempfile.TemporaryFile(dir=scratch_dir_path)
+            self.scratch_file.truncate(number_of_rows * self.row_bytes)
+
+    def get_memory_map(self, start, end):
+        """
+        This function returns a memory map of the rows [start, end) of the scratch file.
+        """
+        # Time complexity : O(1)
+        return np.memmap(
+            self.scratch_file,
+            dtype="float32",
+            mode="r+",
+            offset=start * self.row_bytes,
+            shape=(end - start,) + self.row_shape,
+        )
+
+    def write_rows(self, start, rows):
+        """
+        This function stores rows from the row index start.
+        """
+        # Time complexity : O(n), where n is the number of values in rows
+        if self.rows is not None:
+            self.rows[start : start + len(rows)] = rows
+            return
+        memory_map = self.get_memory_map(start, start + len(rows))
+        memory_map[:] = rows
+        memory_map.flush()
+
+    def read_rows(self, start, end):
+        """
+        This function returns a copy of the rows [start, end). [Output Format > NumPy Array]
+        """
+        # Time complexity : O(n), where n is the number of values read
+        if self.rows is not None:
+            return self.rows[start:end]
+        return np.array(self.get_memory_map(start, end))
+
+    def close(self):
+        """
+        This function releases the rows and deletes the scratch file.
+        """
+        # Time complexity : O(1)
+        self.rows = None
+        if self.scratch_file is not None:
+            self.scratch_file.close()
+
+
+def open_image_with_pixel_limit(image_input_file_path, max_image_pixels=None):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Opens the image like Image.open(), trying every registered format whose prefix matches.
+    [2] Checks the image size against max_image_pixels instead of Pillow's global Image.MAX_IMAGE_PIXELS,
+    which cannot be changed safely while other threads open images. None disables the check.
+    [3] Returns the opened (not yet decoded) image. [Output Format > PIL.ImageFile.ImageFile]
+
+    Raises a DecompressionBombError above max_image_pixels and an UnidentifiedImageError for unknown formats.
+    """
+    # Time complexity : O(f), where f is the number of registered formats
+    with open(image_input_file_path, "rb") as image_file:
+        prefix = image_file.read(16)
+
+    Image.init()
+    for image_format in Image.ID:
+        factory, accept = Image.OPEN[image_format]
+        # accept() returns a warning string for prefixes it recognizes but cannot open.
+        if accept is not None and accept(prefix) is not True:
+            continue
+        try:
+            # Opened from the path, the image owns its file handle and closes it with the image.
+            img = factory(image_input_file_path)
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+        if max_image_pixels is not None and img.width * img.height > max_image_pixels:
+            img.close()
+            raise Image.DecompressionBombError(
+                f"Image size ({img.width * img.height} pixels) exceeds the limit of {max_image_pixels} pixels."
+            )
+        return img
+
+    raise UnidentifiedImageError(f"cannot identify image file {image_input_file_path!r}")
+
+
+def resize_image_file_tiled(
+    image_input_file_path,
+    output_path,
+    img_size,
+    memory_budget=DEFAULT_RESIZE_MEMORY_BUDGET,
+    reducing_gap=DEFAULT_REDUCING_GAP,
+    scratch_dir_path=None,
+    max_image_pixels=None,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads the source in strips of rows sized by the memory budget : uncompressed files are memory mapped
+    strip by strip, compressed TIFF files are decoded one strip (or row of tiles) at a time
+    (see get_tiff_strip_reader()), other files (PNG, JPEG...) are shrunk on load (see shrink_image_on_load())
+    and decoded whole, as long as the decoded image fits the budget.
+    [2] Averages every strip by blocks down to reducing_gap times the target size (as Image.reduce() does)
+    and resamples its rows to the target width with the Lanczos filter.
+    [3] Keeps these rows in memory, or in a scratch file when they do not fit the budget (see ScratchRows).
+    [4] Resamples the columns to the target height, strip by strip, into the 8 bit output image and saves it.
+    [5] Returns the peak memory of the resize, in bytes. [Output Format > Integer]
+    This is the peak traced by tracemalloc (NumPy buffers) plus an estimate of the buffers Pillow and libtiff
+    decode into, which tracemalloc does not see. It is not the resident set size of the process.
+
+    The result matches resize_image() within rounding : same reduction factors, same Lanczos filter.
+    Raises a MemoryError when the output image (or a compressed source) alone does not fit the budget.
+    The memory budget replaces Pillow's decompression bomb limit, which rejects the very images this engine is for :
+    max_image_pixels only caps the source size when given (see open_image_with_pixel_limit()).
+    """
+    # Time complexity : O(n), where n is the number of pixels in the source image
+    target_width, target_height = img_size
+    img = open_image_with_pixel_limit(image_input_file_path, max_image_pixels)
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    intermediate_rows = None
+
+    try:
+        with img:
+            image_file_type = str(img.format)
+            read_rows = get_raw_strip_reader(img)
+            # decoded_bytes is the memory Pillow holds, which tracemalloc does not see, reader_bytes the rest held by the reader.
+            decoded_bytes = reader_bytes = 0
+            if read_rows is None:
+                tiff_strip_reader = get_tiff_strip_reader(img)
+                # Pillow's copy of the strip being decoded, the strip kept by the reader and the rows copied from it.
+                if tiff_strip_reader is not None and 3 * tiff_strip_reader[1] <= memory_budget // 2:
+                    read_rows, decoded_bytes = tiff_strip_reader
+                    reader_bytes = 2 * decoded_bytes
+            if read_rows is None:
+                img = shrink_image_on_load(img, img_size, reducing_gap)
+                mode = img.mode if img.mode in ("L", "RGB", "RGBA") else "RGB"
+                # Pillow's decoded image (and its converted copy), which tracemalloc does not see.
+                decoded_bytes = img.width * img.height * (len(mode) if img.mode == mode else len(img.mode) + len(mode))
+                if decoded_bytes > memory_budget // 2:
+                    raise MemoryError(
+                        f"Decoding {os.path.basename(image_input_file_path)} needs {decoded_bytes / 1024 ** 2:.1f} MB, "
+                        f"above half the memory budget of {memory_budget / 1024 ** 2:.1f} MB. "
+                        "Only PPM, BMP and 8 bit TIFF files with strips or tiles are read strip by strip."
+                    )
+                source_img = img.convert(mode) if img.mode != mode else img
+                source_img.load()
+
+                def read_rows(start, end):
+                    return np.asarray(source_img.crop((0, start, source_img.width, end))).reshape(end - start, source_img.width, len(mode))
+
+            else:
+                mode = img.mode
+            width, height = img.size
+            bands = len(mode)
+
+            output_bytes = target_width * target_height * bands
+            if output_bytes > memory_budget // 2:
+                raise MemoryError(
+                    f"A {target_width}x{target_height} output needs {output_bytes / 1024 ** 2:.1f} MB, "
+                    f"above half the memory budget of {memory_budget / 1024 ** 2:.1f} MB."
+                )
+
+            # Same reduction factors as Image.resize() with reducing_gap.
+            factor_x = int(width / target_width / reducing_gap) or 1 if reducing_gap else 1
+            factor_y = int(height / target_height / reducing_gap) or 1 if reducing_gap else 1
+            reduced_width, reduced_height = -(-width // factor_x), -(-height // factor_y)
+            column_starts = np.arange(0, width, factor_x)
+            column_counts = np.diff(np.append(column_starts, width)).astype("float32")
+            indices_x, weights_x = get_lanczos_weights(reduced_width, target_width, width / factor_x)
+            indices_y, weights_y = get_lanczos_weights(reduced_height, target_height, height / factor_y)
+
+            filter_bytes = indices_x.nbytes + weights_x.nbytes + indices_y.nbytes + weights_y.nbytes
+            available_bytes = memory_budget - output_bytes - decoded_bytes - reader_bytes - filter_bytes
+            intermediate_bytes = reduced_height * target_width * bands * 4
+            intermediate_rows = ScratchRows(
+                reduced_height,
+                (target_width, bands),
+                in_memory=intermediate_bytes <= available_bytes // 4,
+                scratch_dir_path=scratch_dir_path,
+            )
+            if intermediate_rows.rows is not None:
+                available_bytes -= intermediate_bytes
+
+            # First pass : block average and horizontal resampling, strip by strip.
+            source_row_bytes = width * bands * TILED_SOURCE_BYTES_PER_SAMPLE + target_width * bands * TILED_OUTPUT_BYTES_PER_SAMPLE
+            strip_height = available_bytes // source_row_bytes // factor_y * factor_y
+            if strip_height < factor_y:
+                raise MemoryError(
+                    f"A strip of {factor_y} rows of {width} pixels does not fit the memory budget of {memory_budget / 1024 ** 2:.1f} MB."
+                )
+            for strip_start in range(0, height, strip_height):
+                strip = read_rows(strip_start, min(height, strip_start + strip_height)).astype("float32")
+                if factor_y > 1:
+                    row_starts = np.arange(0, len(strip), factor_y)
+                    strip = np.add.reduceat(strip, row_starts, axis=0) / np.diff(np.append(row_starts, len(strip)))[:, None, None]
+                if factor_x > 1:
+                    strip = np.add.reduceat(strip, column_starts, axis=1) / column_counts[None, :, None]
+                resampled_strip = np.zeros((len(strip), target_width, bands), dtype="float32")
+                for tap in range(indices_x.shape[1]):
+                    resampled_strip += strip[:, indices_x[:, tap], :] * weights_x[None, :, tap, None]
+                intermediate_rows.write_rows(strip_start // factor_y, resampled_strip)
+                del strip, resampled_strip
+
+        # Second pass : vertical resampling, strip by strip, into the output image.
+        # Every output row reads up to (reduced_height / target_height) intermediate rows, plus the filter taps around the strip.
+        output_pixels = np.empty((target_height, target_width, bands), dtype="uint8")
+        output_row_bytes = target_width * bands * (TILED_OUTPUT_BYTES_PER_SAMPLE + 4 * -(-reduced_height // target_height))
+        output_strip_height = max(1, (available_bytes - indices_y.shape[1] * target_width * bands * 4) // output_row_bytes)
+        for output_start in range(0, target_height, output_strip_height):
+            output_end = min(target_height, output_start + output_strip_height)
+            strip_indices = indices_y[output_start:output_end]
+            first_row, last_row = int(strip_indices.min()), int(strip_indices.max()) + 1
+            rows = intermediate_rows.read_rows(first_row, last_row)
+            resampled_strip = np.zeros((output_end - output_start, target_width, bands), dtype="float32")
+            for tap in range(indices_y.shape[1]):
+                resampled_strip += rows[strip_indices[:, tap] - first_row] * weights_y[output_start:output_end, tap, None, None]
+            np.clip(np.rint(resampled_strip, out=resampled_strip), 0, 255, out=resampled_strip)
+            output_pixels[output_start:output_end] = resampled_strip
+            del rows, resampled_strip
+
+        Image.fromarray(output_pixels[:, :, 0] if bands == 1 else output_pixels).save(output_path, image_file_type)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        peak_memory += decoded_bytes
+    finally:
+        if intermediate_rows is not None:
+            intermediate_rows.close()
+        if started_tracing:
+            tracemalloc.stop()
+
+    return peak_memory
+
+
 class ImageResize:
     """
     This class creates an image object that requires the following parameters
@@ -164,6 +799,7 @@ class ImageResize:
 
     [1] get_image_file_type
     [2] resize_image_file
+    [3] resize_image_file_tiled
     """
 
     def __init__(
@@ -180,6 +816,7 @@ class ImageResize:
         ].lower()
         self.img_size = img_size
         self.image_file_name = image_file_name
+        self.output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
 
     def get_image_file_type(self):
         """
@@ -204,16 +841,111 @@ class ImageResize:
         [3] Saves the resized image file to the output path.
         """
         # Time complexity : O(1)
-        output_path = f"{self.image_output_dir_path}/{self.image_file_name}"
         with Image.open(self.image_input_file_path) as img:
-            resized_img = img.resize(self.img_size, Image.Resampling.LANCZOS)
-            resized_img.save(output_path, self.get_image_file_type())
+            # The format is read from the already opened image, instead of opening the file again in get_image_file_type().
+            image_file_type = str(img.format)
+            resized_img = resize_image(img, get_fitted_image_size(img.size, self.img_size))
+            resized_img.save(self.output_path, image_file_type)
             print("-" * 70)
-            print(f"Saved {self.image_file_name} to {output_path}.")
+            print(f"Saved {self.image_file_name} to {self.output_path}.")
             print("-" * 70)
 
+    def resize_image_file_tiled(self, memory_budget=DEFAULT_RESIZE_MEMORY_BUDGET):
+        """
+        This function does the following task:
+        ----------------------------------------------
+
+        Resizes the image file strip by strip within the memory budget (see resize_image_file_tiled()),
+        for images too large for resize_image_file().
+        """
+        # Time complexity : O(n), where n is the number of pixels in the source image
+        with open_image_with_pixel_limit(self.image_input_file_path) as img:
+            img_size = get_fitted_image_size(img.size, self.img_size)
+        peak_memory = resize_image_file_tiled(self.image_input_file_path, self.output_path, img_size, memory_budget)
+        print("-" * 70)
+        print(f"Saved {self.image_file_name} to {self.output_path}, peak memory {peak_memory / 1024 ** 2:.1f} MB (traced and estimated, not RSS).")
+        print("-" * 70)
+
+
+# Default file names of the responsive sizes, e.g. "photo-400w.jpg".
+# Available fields : {stem}, {extension}, {width} and {height}.
+DEFAULT_SRCSET_NAME_FORMAT = "{stem}-{width}w{extension}"
 
-def main():
+
+def resize_image_to_srcset(
+    image_input_file_path,
+    image_output_dir_path,
+    target_sizes,
+    fit="width",
+    name_format=DEFAULT_SRCSET_NAME_FORMAT,
+    workers=None,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Converts every target size (a width or a height, depending on fit) to an aspect-preserving size.
+    Sizes larger than the source are skipped, as upscaling adds bytes without adding detail.
+    [2] Decodes the input image once, shrinking it on load for the largest target size.
+    [3] Builds the sizes from the largest to the smallest, every size being resampled from the previous one
+    instead of the full resolution image.
+    [4] Saves every size on a thread pool as soon as it is built, while the next one is being resampled.
+    [5] Returns the output paths, from the largest to the smallest size. [Output Format > List]
+
+    e.g. resize_image_to_srcset("photo.jpg", "out", [1920, 1280, 960, 640, 320])
+    -> ["out/photo-1920w.jpg", "out/photo-1280w.jpg", ..., "out/photo-320w.jpg"]
+
+    """
+    # Time complexity : O(k), where k is the number of target sizes
+    if fit not in ("width", "height"):
+        raise ValueError(f'fit must be "width" or "height", got "{fit}".')
+
+    image_file_stem, image_file_extension = os.path.splitext(os.path.basename(image_input_file_path))
+    output_paths = []
+
+    with Image.open(image_input_file_path) as img:
+        image_file_type = str(img.format)
+        img_sizes = sorted(
+            {
+                get_fitted_image_size(img.size, (0, target_size) if fit == "width" else (target_size, 0))
+                for target_size in target_sizes
+            },
+            reverse=True,
+        )
+        skipped_sizes = [img_size for img_size in img_sizes if img_size[0] > img.width or img_size[1] > img.height]
+        img_sizes = [img_size for img_size in img_sizes if img_size not in skipped_sizes]
+        if skipped_sizes:
+            print(f"Skipped sizes larger than {img.width}x{img.height} : {skipped_sizes}")
+        if not img_sizes:
+            return output_paths
+
+        resized_img = shrink_image_on_load(img, img_sizes[0])
+        with ThreadPoolExecutor(max_workers=workers or len(img_sizes)) as executor:
+            futures = []
+            for img_size in img_sizes:
+                resized_img = resize_image(resized_img, img_size)
+                output_path = os.path.join(
+                    image_output_dir_path,
+                    name_format.format(
+                        stem=image_file_stem,
+                        extension=image_file_extension,
+                        width=img_size[0],
+                        height=img_size[1],
+                    ),
+                ).replace("\\", "/")
+                futures.append(executor.submit(resized_img.save, output_path, image_file_type))
+                output_paths.append(output_path)
+            # Re-raises the first error of the writes.
+            for future in futures:
+                future.result()
+
+    print("-" * 70)
+    print(f"Saved {len(output_paths)} sizes of {os.path.basename(image_input_file_path)} to {image_output_dir_path}.")
+    print("-" * 70)
+    return output_paths
+
+
+def main(incremental=False):
     """
     This function does the following tasks :
     --------------------------------------------------
@@ -226,26 +958,56 @@ def main():
     [5] Gets the filename from the path.
     [6] Uses the ImageResize class to create an instance.
     [7] Checks the image file type and resizes the image.
+
+    With incremental=True, files already processed with the same parameters
+    and unchanged since are skipped, using the manifest in the output directory.
     """
     # Time complexity : O(n + 1)
     img_size = get_image_dimensions()
     image_input_file_paths = open_gui_for_individual_file_paths()
     image_output_directory_path = open_gui_for_output_directory_path()
+    manifest = image_manifest.ImageManifest(image_output_directory_path) if incremental else None
+    parameters = {"size": list(img_size), "backend": resize_backend}
     for path in image_input_file_paths:
         image_file_name = os.path.basename(path)
         image_file = ImageResize(
             path, image_output_directory_path, img_size, image_file_name
         )
+        output_path = image_file.output_path
+
+        # Skips the file when the same resizing already ran on this unchanged source.
+        if manifest is not None and manifest.is_up_to_date(
+            path, "resizing", parameters, output_path
+        ):
+            print(f"Skipped {image_file_name}, unchanged since the last run.")
+            continue
+
         try:
-            image_file.resize_image_file()
+            # Served from the result cache instead, when the same bytes were already resized with these parameters.
+            image_cache.run_cached(
+                path, "resizing", parameters, output_path, image_file.resize_image_file
+            )
+
+            if manifest is not None:
+                manifest.record(path, "resizing", parameters, output_path)
 
         # This error is raised in heavy operations(for e.g. width and height of 200000000).
         # This error is raised when memory runs out of space for allocation of this program.
-        except MemoryError:
-            print(
-                "Failed to resize image. Please try again with a valid image height and width"
-            )
-            return main()
+        # Pillow raises DecompressionBombError instead for images above Image.MAX_IMAGE_PIXELS.
+        except (MemoryError, Image.DecompressionBombError):
+            # The image is resized again strip by strip within the memory budget. When even that does not fit
+            # (the output, or a source that can only be decoded whole), the file is reported and skipped.
+            try:
+                image_file.resize_image_file_tiled()
+            except MemoryError as error:
+                print("-" * 70)
+                print(f"{image_file_name} failed to resize.")
+                print(error)
+                print("-" * 70)
+                continue
+
+            if manifest is not None:
+                manifest.record(path, "resizing", parameters, output_path)
 
         # This error is raised when file is corrupted.
         # It is also applicable to files with unknown extension (which is not likely since we handle that possibility early in the input file selection gui itself.)
@@ -264,19 +1026,37 @@ def main():
 
         # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
         except KeyboardInterrupt:
+            if manifest is not None:
+                manifest.save()
             sys.exit()
 
+    if manifest is not None:
+        manifest.save()
+    image_cache.print_cache_statistics()
+
     return None
 
 
-def execute():
+def execute(incremental=False):
     """
     This function executes the entire program.
     """
     # Time complexity : O(1)
     try:
-        main()
+        main(incremental)
 
     # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
     except KeyboardInterrupt:
         sys.exit()
+
+
+if __name__ == "__main__":
+    # Headless responsive sizes : python image_resizing.py <input_file> <output_dir> <size[,size...]> [--fit-height]
+    # Interactive usage : python image_resizing.py [--incremental]
+    FIT = "height" if "--fit-height" in sys.argv else "width"
+    INCREMENTAL = "--incremental" in sys.argv
+    ARGUMENTS = [argument for argument in sys.argv[1:] if argument not in ("--fit-height", "--incremental")]
+    if len(ARGUMENTS) == 3:
+        resize_image_to_srcset(ARGUMENTS[0], ARGUMENTS[1], [int(size) for size in ARGUMENTS[2].split(",")], FIT)
+    else:
+        execute(INCREMENTAL)
@@ -2,18 +2,24 @@
 # pylint: disable=C0413
 """System Module."""
 import sys
+import importlib
 
 # This is to add the image_file_configurations.py file to the path temporarily.
 sys.path.append("./image_operations/")
 
-from image_operations import (
-    image_conversion,
-    image_compression,
-    image_resizing,
-    image_manager
-)
-
-import image_colorization
+# The applications are only imported once the user selects them, so a conversion-only
+# run never loads cv2, numpy or the colorization model (see image_benchmarks.py).
+APPLICATION_MODULES = {
+    1: "image_conversion",
+    2: "image_compression",
+    3: "image_resizing",
+    4: "image_colorization",
+    5: "image_manager",
+}
+# The applications whose execute() can skip files that are unchanged since the last run.
+INCREMENTAL_APPLICATIONS = (1, 2, 3)
+# Usage : python main.py [--incremental]
+INCREMENTAL = "--incremental" in sys.argv
 
 
 print(
@@ -100,23 +106,19 @@ def main():
     ---------------------------------------------
 
     [1] Reads the user input.
-    [2] Executes the user preferred program.
+    [2] Executes the user preferred program, in incremental mode when
+    main.py was started with --incremental and the program supports it.
 
     """
     # Time complexity : O(1)
     user_preferred_input = user_preferred_application_input()
     try:
-        # Checks for user input and runs the respective program.
-        if user_preferred_input == 1:
-            image_conversion.execute()
-        elif user_preferred_input == 2:
-            image_compression.execute()
-        elif user_preferred_input == 3:
-            image_resizing.execute()
-        elif user_preferred_input == 4:
-            image_colorization.execute()
-        elif user_preferred_input == 5:
-            image_manager.execute()
+        # Imports the respective program on first use and runs it.
+        application = importlib.import_module(APPLICATION_MODULES[user_preferred_input])
+        if user_preferred_input in INCREMENTAL_APPLICATIONS:
+            application.execute(INCREMENTAL)
+        else:
+            application.execute()
 
     # Exits the program when forcefully interupted, usually when pressed : Ctrl + C, Ctrl + D, Ctrl + Z.
     except KeyboardInterrupt:
@@ -0,0 +1,253 @@
+# pylint: disable=line-too-long
+# pylint: disable=C0103
+# pylint: disable=E1101
+"""System module."""
+import sys  # USE CASE: Reading the command line arguments.
+import os  # USE CASE: Listing frame directories and creating the output directory.
+import re  # USE CASE: Ordering numbered frame files by their numbers.
+import time  # USE CASE: Measuring the frames per second of a run.
+import numpy as np  # USE CASE: Comparing thumbnails and interpolating ab maps.
+import cv2  # USE CASE: Reading and writing videos and frames.
+import image_colorization  # USE CASE: The colorization net and its pre/postprocessing.
+
+
+# Extensions written as a video, any other output path is a directory of numbered frames.
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+DEFAULT_FPS = 25.0
+
+# Width of the grayscale thumbnails compared between frames.
+THUMBNAIL_WIDTH = 64
+
+# Mean absolute thumbnail difference (0 - 255) from the last keyframe that starts a new shot.
+SCENE_CHANGE_THRESHOLD = 30.0
+
+# Smaller difference that refreshes the ab map within a shot (motion, fades).
+REFRESH_THRESHOLD = 8.0
+
+# A frame goes through the net at least every KEYFRAME_INTERVAL frames.
+KEYFRAME_INTERVAL = 12
+
+
+def get_natural_sort_key(file_name):
+    """
+    This function returns a sort key comparing the numbers in a file name by value,
+    so "frame_2.png" comes before "frame_10.png". [Output Format > List]
+    """
+    # Time complexity : O(k), where k is the length of the file name
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", file_name.lower())]
+
+
+def read_frames(input_path):
+    """
+    This function does the following task:
+    ---------------------------------------------
+
+    [1] Yields the BGR frames of a video file (through cv2.VideoCapture) or of a
+    directory of numbered frames (in frame number order, padded or not, see get_natural_sort_key()).
+
+    """
+    # Time complexity : O(n log n) for directories, O(n) for videos
+    if os.path.isdir(input_path):
+        for frame_file_name in sorted(os.listdir(input_path), key=get_natural_sort_key):
+            if frame_file_name.lower().endswith(FRAME_EXTENSIONS):
+                frame = cv2.imread(os.path.join(input_path, frame_file_name))
+                if frame is not None:
+                    yield frame
+        return
+
+    capture = cv2.VideoCapture(input_path)
+    try:
+        while True:
+            has_frame, frame = capture.read()
+            if not has_frame:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def get_input_fps(input_path):
+    """
+    This function returns the frame rate of a video file, or DEFAULT_FPS for frame directories. [Output Format > Float]
+    """
+    # Time complexity : O(1)
+    if os.path.isdir(input_path):
+        return DEFAULT_FPS
+    capture = cv2.VideoCapture(input_path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return fps if fps and fps > 0 else DEFAULT_FPS
+
+
+def get_thumbnail(frame):
+    """
+    This function returns a small float32 grayscale copy of the frame, used to compare frames. [Output Format > Array]
+    """
+    # Time complexity : O(1)
+    height = max(1, round(frame.shape[0] * THUMBNAIL_WIDTH / frame.shape[1]))
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (THUMBNAIL_WIDTH, height), interpolation=cv2.INTER_AREA).astype("float32")
+
+
+class FrameWriter:
+    """
+    This class creates a frame writer that requires the following parameters
+    to function:
+    --------------------------------------------------------------------------------
+    [1] Output Path (a video file, or a directory for numbered frames)
+    [2] Frames Per Second (videos only)
+
+    The following are the methods that can be performed on an instance of this class:
+
+    [1] write
+    [2] release
+    """
+
+    def __init__(self, output_path, fps):
+        self.output_path = output_path
+        self.fps = fps
+        self.video_writer = None
+        self.frame_count = 0
+        self.is_video = output_path.lower().endswith(VIDEO_EXTENSIONS)
+        if not self.is_video:
+            os.makedirs(output_path, exist_ok=True)
+
+    def write(self, frame):
+        """
+        This function appends a frame to the video, or saves it as the next numbered frame.
+        """
+        # Time complexity : O(1)
+        if self.is_video:
+            if self.video_writer is None:
+                fourcc_name = "MJPG" if self.output_path.lower().endswith(".avi") else "mp4v"
+                fourcc = cv2.VideoWriter_fourcc(*fourcc_name)
+                self.video_writer = cv2.VideoWriter(
+                    self.output_path, fourcc, self.fps, (frame.shape[1], frame.shape[0])
+                )
+                # A writer that failed to open (codec missing from this OpenCV build, unwritable path) silently writes nothing.
+                if not self.video_writer.isOpened():
+                    self.video_writer = None
+                    raise OSError(
+                        f"Cannot write {self.output_path} with the {fourcc_name} codec : "
+                        "it is not supported by this OpenCV build, or the path is not writable."
+                    )
+            self.video_writer.write(frame)
+        else:
+            cv2.imwrite(os.path.join(self.output_path, f"frame_{self.frame_count:06d}.png"), frame)
+        self.frame_count += 1
+
+    def release(self):
+        """
+        This function closes the output video.
+        """
+        # Time complexity : O(1)
+        if self.video_writer is not None:
+            self.video_writer.release()
+
+
+def colorize_frame(frame, ab):
+    """
+    This function colorizes a frame from a low resolution ab map (H x W x 2) predicted by the net. [Output Format > uint8 Array]
+    """
+    # Time complexity : O(1)
+    lab = cv2.cvtColor(frame.astype("float32") / 255.0, cv2.COLOR_BGR2LAB)
+    return image_colorization.postprocess_colorized_image(lab, ab)
+
+
+def colorize_video(
+    input_path,
+    output_path,
+    scene_change_threshold=SCENE_CHANGE_THRESHOLD,
+    refresh_threshold=REFRESH_THRESHOLD,
+    keyframe_interval=KEYFRAME_INTERVAL,
+):
+    """
+    This function does the following tasks:
+    -----------------------------------------------
+
+    [1] Reads the frames of a video file or of a directory of numbered frames.
+    [2] Runs the net on keyframes only : the first frame of every shot (scene change),
+    and within a shot every "keyframe_interval" frames or once the picture drifted
+    by more than "refresh_threshold" from the last keyframe.
+    [3] Colorizes the frames between two keyframes of the same shot with the linear
+    interpolation of their low resolution ab maps, and the frames before a scene
+    change with the ab map of their own shot's last keyframe.
+    [4] Writes a video (.mp4, .avi, .mov, .mkv) or a directory of numbered frames.
+    [5] Prints and returns the frames per second and the share of frames that reached the net. [Output Format > Dictionary]
+    """
+    # Time complexity : O(n), with O(n / keyframe_interval) forward passes at best
+    net = image_colorization.get_colorization_net()
+    frame_writer = FrameWriter(output_path, get_input_fps(input_path))
+
+    start = time.perf_counter()
+    number_of_frames = 0
+    number_of_net_frames = 0
+    keyframe_thumbnail = None
+    keyframe_ab = None
+    pending_frames = []
+
+    def write_pending_frames(next_keyframe_ab):
+        # Interpolates towards the next keyframe of the same shot, or reuses the last ab map before a cut.
+        for idx, pending_frame in enumerate(pending_frames):
+            if next_keyframe_ab is None:
+                ab = keyframe_ab
+            else:
+                weight = (idx + 1) / (len(pending_frames) + 1)
+                ab = (1 - weight) * keyframe_ab + weight * next_keyframe_ab
+            frame_writer.write(colorize_frame(pending_frame, ab))
+        pending_frames.clear()
+
+    try:
+        for frame in read_frames(input_path):
+            number_of_frames += 1
+            thumbnail = get_thumbnail(frame)
+            difference = (
+                float(np.mean(np.abs(thumbnail - keyframe_thumbnail)))
+                if keyframe_thumbnail is not None and keyframe_thumbnail.shape == thumbnail.shape
+                else float("inf")
+            )
+
+            is_scene_change = difference > scene_change_threshold
+            is_refresh = difference > refresh_threshold or len(pending_frames) + 1 >= keyframe_interval
+            if not (is_scene_change or is_refresh):
+                pending_frames.append(frame)
+                continue
+
+            lab, L = image_colorization.preprocess_bw_image(frame)
+            ab = image_colorization.forward_colorization_batch(net, [L])[0]
+            number_of_net_frames += 1
+
+            write_pending_frames(None if is_scene_change else ab)
+            frame_writer.write(image_colorization.postprocess_colorized_image(lab, ab))
+            keyframe_thumbnail = thumbnail
+            keyframe_ab = ab
+
+        write_pending_frames(None)
+
+    finally:
+        frame_writer.release()
+
+    elapsed_time = time.perf_counter() - start
+    results = {
+        "frames": number_of_frames,
+        "net_frames": number_of_net_frames,
+        "net_frame_share": number_of_net_frames / max(1, number_of_frames),
+        "fps": number_of_frames / elapsed_time if elapsed_time else 0.0,
+    }
+    print("-" * 70)
+    print(f"Saved {number_of_frames} colorized frame(s) to {output_path}.")
+    print(
+        f"{results['fps']:.2f} frames per second, {number_of_net_frames} of {number_of_frames} frame(s) "
+        f"({100 * results['net_frame_share']:.1f}%) went through the net."
+    )
+    print("-" * 70)
+    return results
+
+
+if __name__ == "__main__":
+    # Usage : python video_colorization.py <input video or frame directory> <output video or frame directory>
+    if len(sys.argv) != 3:
+        print("Usage : python video_colorization.py <input video or frame directory> <output video or frame directory>")
+        sys.exit(1)
+    colorize_video(sys.argv[1], sys.argv[2])